@@ -4,15 +4,28 @@ from Auth.serializers import LoginRequest, RefreshRequest
 from django.contrib.auth import aauthenticate
 from django_bolt.auth import create_jwt_pair_for_user, IsAuthenticated
 from core.utils import jwt_auth, store
+from core.revocation import ttl_until
+from core.principal import PRINCIPAL_CLAIMS
 from organization.models import Organization, Branch
 
 from django.conf import settings
 import jwt
 from django.contrib.auth import get_user_model
 import uuid
+import logging
+
+logger = logging.getLogger(__name__)
 
 api = BoltAPI(django_middleware=False, prefix="/api")
 
+def revocation_unavailable():
+    """503 when the revocation store is down: the tokens would stay valid, so do not report success."""
+    return response(
+        status=503,
+        message="Token revocation unavailable",
+        error="Could not revoke the token; please try again shortly"
+    )
+
 @api.post("/auth/token")
 async def login(credentials: LoginRequest):
     user = await aauthenticate(
@@ -29,6 +42,8 @@ async def login(credentials: LoginRequest):
         
     # check the type    
     login_type = credentials.login_type
+    organization_id = None
+    branch_id = None
     if login_type == "organization":
         # get the organization and check if the user is the owner or not 
         organization = await user.organization.afirst()
@@ -38,6 +53,7 @@ async def login(credentials: LoginRequest):
                 message="Unauthorized",
                 error="Invalid username or password"
             )
+        organization_id = organization.id
     if login_type == "branch":
         branch = await user.branch.afirst()
         if branch is None or branch.owner_id != user.id:
@@ -46,9 +62,17 @@ async def login(credentials: LoginRequest):
                 message="Unauthorized",
                 error="Invalid username or password"
             )       
+        branch_id = branch.id
+        organization_id = branch.organization_id
 
 
-    tokens = create_jwt_pair_for_user(user, extra_claims={"permissions": list(await user.aget_all_permissions()), "login_type": login_type})
+    # Identity claims let core.utils.get_current_user build the caller without a query
+    tokens = create_jwt_pair_for_user(user, extra_claims={
+        "permissions": list(await user.aget_all_permissions()),
+        "login_type": login_type,
+        "branch_id": branch_id,
+        "organization_id": organization_id,
+    })
     return response(
         status=200,
         message="Login successful",
@@ -69,9 +93,14 @@ async def profile(request):
 
 @api.post("/auth/logout", auth=[jwt_auth], guards=[IsAuthenticated()])
 async def logout(request):    
-    token_jti = request.context.get("auth_claims", {}).get("jti")
+    claims = request.context.get("auth_claims", {})
+    token_jti = claims.get("jti")
     if token_jti:
-        await store.revoke(token_jti)
+        try:
+            await store.revoke(token_jti, ttl=ttl_until(claims.get("exp")))
+        except Exception as e:
+            logger.warning(f"Could not revoke {token_jti} on logout: {e}")
+            return revocation_unavailable()
     return response(
         status=200,
         message="Logged out",
@@ -98,12 +127,20 @@ async def refresh_token(credentials: RefreshRequest):
                 message="Refresh token revoked",
                 error="Refresh token has already been revoked"
             )
-        # Revoke both tokens by jti
-        await store.revoke(payload_access["jti"])
-        await store.revoke(payload_refresh["jti"])
+        # Revoke both tokens by jti in one round trip
+        try:
+            await store.revoke_many({
+                payload_access["jti"]: ttl_until(payload_access.get("exp")),
+                payload_refresh["jti"]: ttl_until(payload_refresh.get("exp")),
+            })
+        except Exception as e:
+            logger.warning(f"Could not revoke tokens on refresh: {e}")
+            return revocation_unavailable()
         User = get_user_model()
         user = await User.objects.aget(pk=payload_refresh["sub"])
-        tokens = create_jwt_pair_for_user(user)
+        # Carry the login claims over to the new pair
+        claims = {key: payload_access[key] for key in PRINCIPAL_CLAIMS if key in payload_access}
+        tokens = create_jwt_pair_for_user(user, extra_claims=claims)
         return response(
             status=200,
             message="Token refreshed",
@@ -1,3 +1,26 @@
-from django.test import TestCase
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from Auth.api import logout, store
+
+
+class LogoutTests(SimpleTestCase):
+
+    def request(self):
+        return SimpleNamespace(context={"auth_claims": {"jti": "jti-1", "exp": None}})
+
+    def test_logout_revokes_the_token(self):
+        with mock.patch.object(store, "revoke", new=mock.AsyncMock()) as revoke:
+            result = asyncio.run(logout(self.request()))
+
+        self.assertEqual(result.status_code, 200)
+        revoke.assert_awaited_once()
+
+    def test_unreachable_store_is_reported(self):
+        with mock.patch.object(store, "revoke", new=mock.AsyncMock(side_effect=ConnectionError("Cache unreachable"))):
+            result = asyncio.run(logout(self.request()))
+
+        self.assertEqual(result.status_code, 503)
@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import Message
+from .models import Message, NotificationOutbox
 
 # Register your models here
 
 admin.site.register(Message)
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'channel', 'status', 'attempts', 'available_at', 'organization')
+    list_filter = ('status', 'channel')
@@ -1,14 +1,51 @@
-from django_bolt import BoltAPI, Depends
+from django.utils import timezone
+from django_bolt import BoltAPI, Depends, StreamingResponse
+from core.events import event_stream, organization_channel, branch_channel, user_channel
+from core.pagination import keyset_page
 from core.utils import response, get_current_user, jwt_auth
 from organization.middleware import OrganizationMiddleware
 from .models import Message
-from .serializers import MessageSerializer
+from .serializers import MessageSerializer, MarkReadSerializer
 from django_bolt.auth import IsAuthenticated
 
 api = BoltAPI(django_middleware=False, middleware=[OrganizationMiddleware], prefix="/api")
 
+# The inbox is paginated by (created_at, id) cursor
+INBOX_PAGE_SIZE = 50
+MAX_INBOX_PAGE_SIZE = 200
+
+def inbox(organization, user_id):
+    """A user's messages, loading only the columns the inbox renders."""
+    return Message.objects.filter(organization=organization, user_id=user_id).only(
+        'id', 'content', 'is_read', 'created_at'
+    )
+
+async def unread_count(organization, user_id) -> int:
+    # Counted on the partial index of unread messages, so read history costs nothing
+    return await inbox(organization, user_id).filter(is_read=False).acount()
+
+async def inbox_page(query, cursor: str | None, page_size: int) -> dict:
+    page_size = min(max(page_size, 1), MAX_INBOX_PAGE_SIZE)
+    messages, next_cursor, prev_cursor = await keyset_page(query, cursor, page_size)
+    return {
+        "results": [MessageSerializer.from_model(message) for message in messages],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+
+async def mark_read(organization, user_id, ids: list[int] | None = None) -> int:
+    """Mark the given messages (or all of them) read with one UPDATE. Returns how many changed."""
+    query = inbox(organization, user_id).filter(is_read=False)
+    if ids is not None:
+        query = query.filter(id__in=ids)
+    return await query.aupdate(is_read=True, updated_at=timezone.now())
+
 @api.get("/messages/", auth=[jwt_auth], guards=[IsAuthenticated()])
-async def list_messages(request, user=Depends(get_current_user)):
+async def list_messages(request, cursor: str | None = None, page_size: int = INBOX_PAGE_SIZE, unread: bool = False, user=Depends(get_current_user)):
+    """
+    Newest messages first, a page at a time.
+    Query params: cursor (from a previous page), page_size, unread (only unread messages).
+    """
     organization = request.state.get("organization")
     if not organization:
         return response(
@@ -17,31 +54,100 @@ async def list_messages(request, user=Depends(get_current_user)):
             error="Organization context missing"
         )
     
-    messages = []
-    async for msg in Message.objects.filter(
-        organization=organization,
-        user=user
-    ).order_by('-created_at'):
-        # Manual serialization for now as we want to format date
-        messages.append({
-            "id": msg.id,
-            "content": msg.content,
-            "is_read": msg.is_read,
-            "created_at": msg.created_at.isoformat()
-        })
+    query = inbox(organization, user.id)
+    if unread:
+        query = query.filter(is_read=False)
+    try:
+        data = await inbox_page(query, cursor, page_size)
+    except ValueError as e:
+        return response(status=400, message="Invalid cursor", error=str(e))
     
     return response(
         status=200,
         message="Messages fetched successfully",
-        data=messages
+        data=data
+    )
+
+@api.get("/messages/unread_count/", auth=[jwt_auth], guards=[IsAuthenticated()])
+async def get_unread_count(request, user=Depends(get_current_user)):
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    
+    return response(
+        status=200,
+        message="Unread count fetched successfully",
+        data={"unread_count": await unread_count(organization, user.id)}
+    )
+
+@api.post("/messages/read/", auth=[jwt_auth], guards=[IsAuthenticated()])
+async def mark_many_as_read(request, payload: MarkReadSerializer, user=Depends(get_current_user)):
+    """Mark the messages in `ids` read, or every unread message when `all` is true."""
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    if not payload.all and not payload.ids:
+        return response(
+            status=400,
+            message="Nothing to mark",
+            error="Pass message ids, or all=true"
+        )
+    
+    updated = await mark_read(organization, user.id, None if payload.all else payload.ids)
+    return response(
+        status=200,
+        message="Messages marked as read",
+        data={"updated": updated, "unread_count": await unread_count(organization, user.id)}
     )
 
 @api.patch("/messages/{message_id}/read/", auth=[jwt_auth], guards=[IsAuthenticated()])
 async def mark_as_read(request, message_id: int, user=Depends(get_current_user)):
-    try:
-        message = await Message.objects.aget(id=message_id, user=user)
-        message.is_read = True
-        await message.asave()
+    organization = request.state.get("organization")
+    if await mark_read(organization, user.id, [message_id]):
+        return response(status=200, message="Message marked as read")
+    if await inbox(organization, user.id).filter(id=message_id).aexists():
+        # Already read
         return response(status=200, message="Message marked as read")
-    except Message.DoesNotExist:
-        return response(status=404, message="Message not found")
+    return response(status=404, message="Message not found")
+
+@api.get("/events/", auth=[jwt_auth], guards=[IsAuthenticated()])
+async def stream_events(request, user=Depends(get_current_user)):
+    """
+    Server-sent events for the caller: `shipment.created` and
+    `shipment.status_changed` for their branch (the whole organization for
+    organization admins) and `message.created` for their inbox. After a
+    reconnect or a `resync` event, refetch lists with their `since` watermark.
+    """
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    if user.organization_id != organization.id:
+        return response(
+            status=403,
+            message="Access denied",
+            error="User does not belong to this organization"
+        )
+    
+    channels = [user_channel(organization.id, user.id)]
+    if user.has_perm("organization.is_organization_admin"):
+        channels.append(organization_channel(organization.id))
+    elif user.branch_id:
+        channels.append(branch_channel(organization.id, user.branch_id))
+    
+    return StreamingResponse(
+        event_stream(channels),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,43 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.sms_service import aclose_sms_client
+from Messaging.outbox import drain_once, run_worker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications (in-app messages and SMS) from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Entries claimed per batch (default: OUTBOX_BATCH_SIZE)")
+        parser.add_argument('--poll-interval', type=float, help="Seconds to wait when the outbox is empty (default: OUTBOX_POLL_INTERVAL)")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now and exit")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = asyncio.run(self.drain(options['batch_size']))
+            self.stdout.write(self.style.SUCCESS(f"Processed {total} outbox entries"))
+            return
+        self.stdout.write("Draining notification outbox (Ctrl+C to stop)")
+        asyncio.run(self.run(options['batch_size'], options['poll_interval']))
+
+    async def drain(self, batch_size):
+        total = 0
+        try:
+            while claimed := await drain_once(batch_size):
+                total += claimed
+        finally:
+            await aclose_sms_client()
+        return total
+
+    async def run(self, batch_size, poll_interval):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await run_worker(batch_size, poll_interval, stop)
+        finally:
+            await aclose_sms_client()
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Messaging', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['organization', 'user', '-created_at'], name='message_org_user_created_idx'),
+        ),
+    ]
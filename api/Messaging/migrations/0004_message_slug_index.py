@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:00
+
+import core.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Messaging', '0003_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='slug',
+            field=models.CharField(db_index=True, default=core.utils.generate_unique_hash, max_length=32),
+        ),
+    ]
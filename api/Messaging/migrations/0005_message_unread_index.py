@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Messaging', '0004_message_slug_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['organization', 'user'], name='message_unread_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.models import User
 from core.models import BaseModel
 from organization.models import Organization
@@ -10,5 +12,52 @@ class Message(BaseModel):
     content = models.TextField()
     is_read = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # A user's inbox, newest first
+            models.Index(fields=['organization', 'user', '-created_at'], name='message_org_user_created_idx'),
+            # Unread counts and "mark all read" touch only unread rows
+            models.Index(fields=['organization', 'user'], name='message_unread_idx', condition=Q(is_read=False)),
+        ]
+    
     def __str__(self):
         return f"Message to {self.user.username if self.user else self.phone_number}"
+
+
+class OutboxChannel(models.TextChoices):
+    MESSAGE = 'MESSAGE', 'In-app message'
+    SMS = 'SMS', 'SMS'
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    SENT = 'SENT', 'Sent'
+    FAILED = 'FAILED', 'Failed'
+
+
+class NotificationOutbox(models.Model):
+    """
+    A notification to deliver, written in the same transaction as the change
+    that caused it and delivered later by the outbox worker (Messaging/outbox.py).
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='outbox')
+    channel = models.CharField(max_length=10, choices=OutboxChannel.choices)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    phone_number = models.CharField(max_length=20, null=True, blank=True)
+    content = models.TextField()
+    status = models.CharField(max_length=10, choices=OutboxStatus.choices, default=OutboxStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Notification Outbox"
+        indexes = [
+            # The worker only ever scans pending entries that are due
+            models.Index(fields=['available_at', 'id'], name='outbox_pending_idx', condition=Q(status='PENDING')),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.user_id or self.phone_number} ({self.status})"
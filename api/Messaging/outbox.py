@@ -0,0 +1,176 @@
+"""
+Transactional outbox for notifications.
+
+Writers call `enqueue_notifications` inside their own transaction, so a
+notification exists if and only if the change that caused it committed. The
+worker (`manage.py drain_outbox`) claims due entries in batches with
+SELECT ... FOR UPDATE SKIP LOCKED, so several workers can run side by side:
+
+- in-app entries become `Message` rows in the same transaction that marks
+  them sent (exactly once);
+- SMS entries are sent with `SMSClient.send_many` (pooled, concurrency-capped,
+  circuit-broken) and retried across batches with exponential backoff (at
+  least once: a worker that dies after sending but before recording it will
+  send again once the claim expires). Entries skipped because the circuit is
+  open wait for the breaker's reset timeout without using up an attempt, so
+  a gateway outage cannot exhaust OUTBOX_MAX_ATTEMPTS.
+"""
+import asyncio
+import logging
+import random
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.events import publish_on_commit, user_channel
+from core.sms_service import get_sms_client, CIRCUIT_OPEN
+from .models import Message, NotificationOutbox, OutboxChannel, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_notifications(organization, messages=(), sms=()) -> list[NotificationOutbox]:
+    """
+    Queue in-app messages (`(user_id, content)` pairs) and SMS (`(phone_number, content)`
+    pairs) with a single INSERT. Call inside the transaction of the triggering write.
+    """
+    entries = [
+        NotificationOutbox(organization=organization, channel=OutboxChannel.MESSAGE, user_id=user_id, content=content)
+        for user_id, content in messages
+    ] + [
+        NotificationOutbox(organization=organization, channel=OutboxChannel.SMS, phone_number=phone_number, content=content)
+        for phone_number, content in sms if phone_number
+    ]
+    if entries:
+        NotificationOutbox.objects.bulk_create(entries)
+    return entries
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter, capped at OUTBOX_MAX_BACKOFF."""
+    ceiling = min(settings.OUTBOX_MAX_BACKOFF, settings.OUTBOX_BASE_BACKOFF * 2 ** max(attempts - 1, 0))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+@transaction.atomic
+def claim_batch(limit: int) -> list[NotificationOutbox]:
+    """
+    Lock up to `limit` due entries and push their `available_at` past the claim
+    timeout, so that a crashed worker's entries become due again on their own.
+    """
+    now = timezone.now()
+    entries = list(
+        NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+            status=OutboxStatus.PENDING,
+            available_at__lte=now
+        ).order_by('available_at', 'id')[:limit]
+    )
+    if entries:
+        NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            available_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT),
+            attempts=F('attempts') + 1
+        )
+        for entry in entries:
+            entry.attempts += 1
+    return entries
+
+
+@transaction.atomic
+def deliver_messages(entries: list[NotificationOutbox]) -> None:
+    """Create the in-app messages and mark their entries sent, atomically; push `message.created` on commit."""
+    messages = Message.objects.bulk_create([
+        Message(organization_id=entry.organization_id, user_id=entry.user_id, content=entry.content)
+        for entry in entries
+    ])
+    for message in messages:
+        publish_on_commit([user_channel(message.organization_id, message.user_id)], "message.created", {
+            "id": message.id,
+            "content": message.content,
+            "created_at": message.created_at.isoformat()
+        })
+    NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+        status=OutboxStatus.SENT,
+        processed_at=timezone.now()
+    )
+
+
+def mark_sent(entries: list[NotificationOutbox]) -> None:
+    if entries:
+        NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            status=OutboxStatus.SENT,
+            processed_at=timezone.now(),
+            last_error=None
+        )
+
+
+def mark_failed(failures: list[tuple[NotificationOutbox, str]]) -> None:
+    """Schedule a retry, or give up after OUTBOX_MAX_ATTEMPTS."""
+    now = timezone.now()
+    for entry, error in failures:
+        if entry.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Giving up on outbox entry {entry.pk} after {entry.attempts} attempts: {error}")
+            changes = {'status': OutboxStatus.FAILED, 'processed_at': now}
+        else:
+            changes = {'available_at': now + retry_delay(entry.attempts)}
+        NotificationOutbox.objects.filter(pk=entry.pk).update(last_error=error[:1000], **changes)
+
+
+def defer(entries: list[NotificationOutbox], seconds: float, reason: str) -> None:
+    """Retry after `seconds` without using up an attempt (the claim's increment is undone)."""
+    if entries:
+        NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            available_at=timezone.now() + timedelta(seconds=seconds),
+            attempts=F('attempts') - 1,
+            last_error=reason
+        )
+        for entry in entries:
+            entry.attempts -= 1
+
+
+async def deliver_sms(entries: list[NotificationOutbox], client=None) -> None:
+    client = client or get_sms_client()
+    results = await client.send_many((entry.phone_number, entry.content) for entry in entries)
+    sent = [entry for entry, (success, _) in zip(entries, results) if success]
+    # Not tried because the gateway is known to be down: wait for the breaker instead
+    deferred = [entry for entry, (success, detail) in zip(entries, results) if not success and detail == CIRCUIT_OPEN]
+    failed = [(entry, str(detail)) for entry, (success, detail) in zip(entries, results) if not success and detail != CIRCUIT_OPEN]
+    await sync_to_async(mark_sent)(sent)
+    await sync_to_async(defer)(deferred, client.breaker.reset_timeout, CIRCUIT_OPEN)
+    await sync_to_async(mark_failed)(failed)
+
+
+async def drain_once(batch_size: int | None = None, client=None) -> int:
+    """Deliver one batch of due entries. Returns how many were claimed."""
+    entries = await sync_to_async(claim_batch)(batch_size or settings.OUTBOX_BATCH_SIZE)
+    messages = [entry for entry in entries if entry.channel == OutboxChannel.MESSAGE]
+    sms = [entry for entry in entries if entry.channel == OutboxChannel.SMS]
+    if messages:
+        try:
+            await sync_to_async(deliver_messages)(messages)
+        except Exception as e:
+            logger.exception("Failed to deliver in-app messages")
+            await sync_to_async(mark_failed)([(entry, str(e)) for entry in messages])
+    if sms:
+        await deliver_sms(sms, client=client)
+    return len(entries)
+
+
+async def run_worker(batch_size: int | None = None, poll_interval: float | None = None, stop: asyncio.Event | None = None):
+    """Drain the outbox until `stop` is set, sleeping only when a batch comes back empty."""
+    poll_interval = settings.OUTBOX_POLL_INTERVAL if poll_interval is None else poll_interval
+    stop = stop or asyncio.Event()
+    while not stop.is_set():
+        try:
+            claimed = await drain_once(batch_size)
+        except Exception:
+            logger.exception("Outbox batch failed")
+            claimed = 0
+        if not claimed:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
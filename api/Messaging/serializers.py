@@ -1,7 +1,13 @@
+from typing import Annotated
 from django_bolt.serializers import Serializer
+from msgspec import Meta
 
 class MessageSerializer(Serializer):
     id: int
     content: str
     is_read: bool
     created_at: str
+
+class MarkReadSerializer(Serializer):
+    ids: Annotated[list[int], Meta(max_length=500)] = []
+    all: bool = False
@@ -1,3 +1,154 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.sms_gateway import LocalSMSGateway
+from core.sms_service import SMSClient, CircuitBreaker
+from Messaging.api import inbox, inbox_page, mark_read, unread_count
+from Messaging.models import Message, NotificationOutbox, OutboxChannel, OutboxStatus
+from Messaging.outbox import claim_batch, enqueue_notifications, drain_once
+from organization.models import Organization
+
+
+class InboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="inbox-user")
+        cls.other = User.objects.create(username="inbox-other")
+        cls.organization = Organization.objects.create(title="Inbox Org", subdomain="inbox")
+        cls.messages = Message.objects.bulk_create([
+            Message(organization=cls.organization, user=cls.user, content=f"Message {i}") for i in range(5)
+        ])
+        Message.objects.create(organization=cls.organization, user=cls.other, content="Not yours")
+
+    def test_pages_cover_the_inbox_once(self):
+        query = inbox(self.organization, self.user.id)
+        first = async_to_sync(inbox_page)(query, None, 3)
+        second = async_to_sync(inbox_page)(query, first["next_cursor"], 3)
+
+        ids = [message.id for message in first["results"] + second["results"]]
+        self.assertEqual(sorted(ids), sorted(message.id for message in self.messages))
+        self.assertIsNone(second["next_cursor"])
+
+    def test_mark_selected_read_in_one_update(self):
+        with self.assertNumQueries(1):
+            updated = async_to_sync(mark_read)(self.organization, self.user.id, [self.messages[0].id, self.messages[1].id])
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(async_to_sync(unread_count)(self.organization, self.user.id), 3)
+
+    def test_mark_all_read_leaves_other_users_alone(self):
+        self.assertEqual(async_to_sync(mark_read)(self.organization, self.user.id), 5)
+
+        self.assertEqual(async_to_sync(unread_count)(self.organization, self.user.id), 0)
+        self.assertEqual(async_to_sync(unread_count)(self.organization, self.other.id), 1)
+
+
+class OutboxWorkerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="outbox-user")
+        cls.organization = Organization.objects.create(title="Outbox Org", subdomain="outbox")
+
+    def sms_client(self, gateway, **options):
+        options.setdefault("backoff", 0)
+        options.setdefault("retries", 0)
+        return SMSClient(url="http://sms-gateway.local/send_sms", transport=gateway.transport(), **options)
+
+    def drain(self, client):
+        async def run():
+            try:
+                return await drain_once(client=client)
+            finally:
+                await client.aclose()
+        return async_to_sync(run)()
+
+    def make_due(self):
+        NotificationOutbox.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_batch_creates_messages_and_sends_sms(self):
+        gateway = LocalSMSGateway()
+        enqueue_notifications(
+            self.organization,
+            messages=[(self.user.id, "Shipment booked"), (self.user.id, "Shipment arrived")],
+            sms=[("9000000001", "Booked"), ("9000000002", "On its way")]
+        )
+
+        self.assertEqual(self.drain(self.sms_client(gateway)), 4)
+
+        self.assertEqual(
+            sorted(Message.objects.filter(user=self.user).values_list('content', flat=True)),
+            ["Shipment arrived", "Shipment booked"]
+        )
+        self.assertEqual(sorted(gateway.sent), [("9000000001", "Booked"), ("9000000002", "On its way")])
+        entries = NotificationOutbox.objects.all()
+        self.assertEqual({entry.status for entry in entries}, {OutboxStatus.SENT})
+        self.assertTrue(all(entry.processed_at for entry in entries))
+
+    def test_failed_sms_is_retried_later(self):
+        gateway = LocalSMSGateway(down=True)
+        enqueue_notifications(self.organization, sms=[("9000000000", "Hello")])
+        before = timezone.now()
+
+        self.drain(self.sms_client(gateway, breaker=CircuitBreaker(failure_threshold=100)))
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, OutboxStatus.PENDING)
+        self.assertEqual(entry.attempts, 1)
+        self.assertGreater(entry.available_at, before)
+        self.assertTrue(entry.last_error)
+        # Not due again until the backoff has passed
+        self.assertEqual(self.drain(self.sms_client(gateway)), 0)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=3)
+    def test_sms_fails_after_max_attempts(self):
+        gateway = LocalSMSGateway(down=True)
+        enqueue_notifications(self.organization, sms=[("9000000000", "Hello")])
+
+        for _ in range(3):
+            self.make_due()
+            self.drain(self.sms_client(gateway, breaker=CircuitBreaker(failure_threshold=100)))
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, OutboxStatus.FAILED)
+        self.assertEqual(entry.attempts, 3)
+        self.assertIsNotNone(entry.processed_at)
+        self.assertEqual(gateway.requests, 3)
+        self.make_due()
+        self.assertEqual(self.drain(self.sms_client(gateway)), 0)
+
+    def test_expired_claim_is_claimed_again(self):
+        gateway = LocalSMSGateway()
+        enqueue_notifications(self.organization, sms=[("9000000000", "Hello")])
+        # A worker claims the entry and dies before delivering it
+        self.assertEqual(len(claim_batch(10)), 1)
+        self.assertEqual(claim_batch(10), [])
+
+        # Once the claim timeout has passed the entry is due again
+        self.make_due()
+        self.assertEqual(self.drain(self.sms_client(gateway)), 1)
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.channel, OutboxChannel.SMS)
+        self.assertEqual(entry.status, OutboxStatus.SENT)
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(gateway.sent, [("9000000000", "Hello")])
+
+    def test_open_circuit_defers_sms_without_using_an_attempt(self):
+        gateway = LocalSMSGateway()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        enqueue_notifications(self.organization, sms=[("9000000000", "Hello")])
+
+        self.drain(self.sms_client(gateway, breaker=breaker))
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(gateway.requests, 0)
+        self.assertEqual(entry.status, OutboxStatus.PENDING)
+        self.assertEqual(entry.attempts, 0)
+        self.assertGreater(entry.available_at, timezone.now() + timedelta(seconds=50))
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_bolt',
     'core',
     'Auth',
@@ -103,6 +104,72 @@ CACHES = {
     }
 }
 
+# Tenant resolution cache (organization/cache.py), in seconds
+TENANT_CACHE_TTL = int(os.getenv('TENANT_CACHE_TTL', 300))
+TENANT_CACHE_LOCAL_TTL = int(os.getenv('TENANT_CACHE_LOCAL_TTL', 10))
+TENANT_CACHE_NEGATIVE_TTL = int(os.getenv('TENANT_CACHE_NEGATIVE_TTL', 30))
+
+# Branch rows behind core.principal.Principal.abranch(), in seconds
+PRINCIPAL_BRANCH_CACHE_TTL = int(os.getenv('PRINCIPAL_BRANCH_CACHE_TTL', 60))
+PRINCIPAL_BRANCH_CACHE_LOCAL_TTL = int(os.getenv('PRINCIPAL_BRANCH_CACHE_LOCAL_TTL', 5))
+
+# Token revocation (core/revocation.py): per-worker memory of revoked JTIs and of
+# recent misses, in seconds. A logout reaches other workers within the miss TTL.
+TOKEN_REVOCATION_LOCAL_TTL = int(os.getenv('TOKEN_REVOCATION_LOCAL_TTL', 300))
+TOKEN_REVOCATION_MISS_TTL = int(os.getenv('TOKEN_REVOCATION_MISS_TTL', 5))
+# When the revocation store cannot be reached, tokens are treated as revoked
+# unless this is set, which keeps users signed in but honours no logouts.
+TOKEN_REVOCATION_FAIL_OPEN = os.getenv('TOKEN_REVOCATION_FAIL_OPEN', 'False') == 'True'
+
+# Cached catalog responses (core/response_cache.py), in seconds. Another worker
+# may serve a response for up to RESPONSE_CACHE_TAG_LOCAL_TTL after it is invalidated.
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+RESPONSE_CACHE_LOCAL_TTL = int(os.getenv('RESPONSE_CACHE_LOCAL_TTL', 10))
+RESPONSE_CACHE_TAG_LOCAL_TTL = int(os.getenv('RESPONSE_CACHE_TAG_LOCAL_TTL', 2))
+
+# Server-push events (core/events.py). Events fan out across workers over Redis
+# pub/sub when EVENTS_REDIS_URL is set. Heartbeat in seconds; the queue size is
+# how many events a slow stream may lag before it is told to resync.
+EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL', f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/1" if os.getenv('REDIS_HOST') else '')
+EVENTS_HEARTBEAT = int(os.getenv('EVENTS_HEARTBEAT', 15))
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+
+# Public tracking payloads (shipment/cache.py), in seconds. TRACKING_MAX_AGE is
+# the Cache-Control max-age a reverse proxy may serve a tracking response for.
+TRACKING_CACHE_TTL = int(os.getenv('TRACKING_CACHE_TTL', 3600))
+TRACKING_CACHE_LOCAL_TTL = int(os.getenv('TRACKING_CACHE_LOCAL_TTL', 5))
+TRACKING_CACHE_NEGATIVE_TTL = int(os.getenv('TRACKING_CACHE_NEGATIVE_TTL', 10))
+TRACKING_MAX_AGE = int(os.getenv('TRACKING_MAX_AGE', 10))
+
+# Notification outbox worker (Messaging/outbox.py, `manage.py drain_outbox`).
+# Backoff and timeouts in seconds.
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 1))
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv('OUTBOX_CLAIM_TIMEOUT', 120))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_BASE_BACKOFF = int(os.getenv('OUTBOX_BASE_BACKOFF', 5))
+OUTBOX_MAX_BACKOFF = int(os.getenv('OUTBOX_MAX_BACKOFF', 1800))
+
+# SMS gateway client (core/sms_service.py). SMS_CONCURRENCY caps requests in
+# flight per process; the circuit opens after SMS_BREAKER_THRESHOLD consecutive
+# failures and retries after SMS_BREAKER_RESET_TIMEOUT seconds.
+# SMS_USE_LOCAL_GATEWAY sends to the in-process stand-in (core/sms_gateway.py).
+SMS_GATEWAY_URL = os.getenv('SMS_GATEWAY_URL', 'https://sms-gateway.mnv-dev.site/send_sms')
+SMS_USE_LOCAL_GATEWAY = os.getenv('SMS_USE_LOCAL_GATEWAY', 'False') == 'True'
+SMS_TIMEOUT = float(os.getenv('SMS_TIMEOUT', 10))
+SMS_CONCURRENCY = int(os.getenv('SMS_CONCURRENCY', 20))
+SMS_RETRIES = int(os.getenv('SMS_RETRIES', 2))
+SMS_BREAKER_THRESHOLD = int(os.getenv('SMS_BREAKER_THRESHOLD', 5))
+SMS_BREAKER_RESET_TIMEOUT = float(os.getenv('SMS_BREAKER_RESET_TIMEOUT', 30))
+
+# Tracking ids (shipment/tracking.py): numbers each process reserves per
+# database round trip
+TRACKING_ID_BLOCK_SIZE = int(os.getenv('TRACKING_ID_BLOCK_SIZE', 1000))
+
+# X-API-Key for the operational metrics endpoints (core/api.py). Keep it apart
+# from SECRET_KEY so it can be handed to monitoring; unset disables them.
+METRICS_API_KEY = os.getenv('METRICS_API_KEY', '')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
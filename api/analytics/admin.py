@@ -1,3 +1,6 @@
 from django.contrib import admin
+from .models import DailyShipmentRollup
 
 # Register your models here.
+
+admin.site.register(DailyShipmentRollup)
@@ -1,8 +1,9 @@
-from django_bolt import BoltAPI, Depends
+from django_bolt import BoltAPI, Depends, StreamingResponse
 from core.utils import response, get_current_user, jwt_auth
 from organization.middleware import OrganizationMiddleware
 from .serializers import (
     AnalyticsFilterSerializer, 
+    AnalyticsExportSerializer,
     AnalyticsSummarySerializer, 
     AnalyticsDataSerializer,
     AnalyticsResponseSerializer,
@@ -11,28 +12,26 @@ from .serializers import (
     BranchCountSerializer
 )
 from shipment.models import Shipment, ShipmentStatus, PaymentMode
+from .models import DailyShipmentRollup
+from .export import stream_export, CONTENT_TYPES
+from .search import apply_search, ranked_search, SEARCH_RESULT_LIMIT
 from organization.models import Branch, Bus
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q, F, Count, Sum, Avg, DecimalField, ExpressionWrapper
+from django.db.models.functions import Cast, NullIf
 from django_bolt.auth import IsAuthenticated, HasPermission
+from core.pagination import keyset_page, encode_cursor
+from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal
 
 # Protected Routes - uses OrganizationMiddleware to get organization from subdomain
 api = BoltAPI(django_middleware=False, middleware=[OrganizationMiddleware], prefix="/api")
 
-def build_shipment_query(organization, filters: AnalyticsFilterSerializer, user_branch=None):
+def filter_by_dimensions(query, filters: AnalyticsFilterSerializer, user_branch=None, status_field='current_status'):
     """
-    Build a query for filtering shipments based on filters.
-    Returns a queryset that can be further filtered.
+    Apply the filters shared by raw shipment queries and the daily rollup:
+    branch restriction, date range, status, branches and payment mode.
     """
-    # Base query - filter by organization
-    query = Shipment.objects.select_related(
-        'source_branch__owner',
-        'destination_branch__owner',
-        'organization',
-        'bus'
-    ).filter(organization=organization)
-    
     # If branch admin, only show shipments related to their branch
     if user_branch:
         query = query.filter(
@@ -62,11 +61,9 @@ def build_shipment_query(organization, filters: AnalyticsFilterSerializer, user_
     
     # Status filter
     if filters.status and len(filters.status) > 0:
-        query = query.filter(current_status__in=filters.status)
+        query = query.filter(**{f'{status_field}__in': filters.status})
     
-    # Branch filter (for org admin) - handle async lookup
-    # Note: This will be handled in the endpoint before calling this function
-    # For now, we'll filter by branch_slug directly
+    # Branch filter (for org admin) - either source or destination
     if filters.branch_slug and not user_branch:
         query = query.filter(
             Q(source_branch__slug=filters.branch_slug) | Q(destination_branch__slug=filters.branch_slug)
@@ -80,87 +77,120 @@ def build_shipment_query(organization, filters: AnalyticsFilterSerializer, user_
     if filters.destination_branch_slug:
         query = query.filter(destination_branch__slug=filters.destination_branch_slug)
     
-    # Bus filter
-    if filters.bus_slug:
-        query = query.filter(bus__slug=filters.bus_slug)
-    
     # Payment mode filter
     if filters.payment_mode:
         query = query.filter(payment_mode=filters.payment_mode)
     
+    return query
+
+def build_shipment_query(organization, filters: AnalyticsFilterSerializer, user_branch=None):
+    """
+    Build a query for filtering shipments based on filters.
+    Returns a queryset that can be further filtered.
+    """
+    # Base query - filter by organization
+    query = Shipment.objects.select_related(
+        'source_branch__owner',
+        'destination_branch__owner',
+        'organization',
+        'bus'
+    ).filter(organization=organization)
+    
+    query = filter_by_dimensions(query, filters, user_branch=user_branch)
+    
+    # Bus filter
+    if filters.bus_slug:
+        query = query.filter(bus__slug=filters.bus_slug)
+    
     # Price range filter
     if filters.min_price is not None:
         query = query.filter(price__gte=Decimal(str(filters.min_price)))
     if filters.max_price is not None:
         query = query.filter(price__lte=Decimal(str(filters.max_price)))
     
-    # Search filter (tracking_id, sender_name, receiver_name)
-    if filters.search:
-        search_term = filters.search.strip()
-        query = query.filter(
-            Q(tracking_id__icontains=search_term) |
-            Q(sender_name__icontains=search_term) |
-            Q(receiver_name__icontains=search_term)
-        )
+    # Search filter: tracking_id prefix or substring, fuzzy sender/receiver name (analytics/search.py)
+    query = apply_search(query, filters.search)
     
     return query
 
-async def calculate_summary(query, organization, user_branch=None):
+def can_use_rollup(filters: AnalyticsFilterSerializer) -> bool:
+    """The daily rollup has no bus, price or per-shipment text, so those filters need raw scans."""
+    return not (
+        filters.search
+        or filters.min_price is not None
+        or filters.max_price is not None
+        or filters.bus_slug
+    )
+
+def build_rollup_query(organization, filters: AnalyticsFilterSerializer, user_branch=None):
+    query = DailyShipmentRollup.objects.filter(organization=organization)
+    return filter_by_dimensions(query, filters, user_branch=user_branch, status_field='status')
+
+async def _summarize(query, organization, user_branch, count, revenue, average, status_field):
     """
-    Calculate summary statistics from a shipment query.
+    Summary statistics in a constant number of queries: one conditional
+    aggregate for totals, status and payment mode counts, plus (for org admins)
+    one GROUP BY per branch direction.
+    `count(**extra)` builds the count aggregate; `revenue` and `status_field`
+    name the amount and status columns.
     """
-    # Total shipments
-    total_shipments = await query.acount()
-    
-    # Total revenue
-    revenue_result = await query.aaggregate(total_revenue=Sum('price'))
-    total_revenue = revenue_result.get('total_revenue') or Decimal('0')
-    
-    # Average price
-    avg_result = await query.aaggregate(avg_price=Avg('price'))
-    average_price = avg_result.get('avg_price') or Decimal('0')
-    
-    # Count by status
-    status_counts = []
+    query = query.order_by()
+
+    aggregates = {
+        'total_shipments': count(),
+        'total_revenue': Sum(revenue),
+        'average_price': average,
+    }
     for status_code, status_label in ShipmentStatus.choices:
-        count = await query.filter(current_status=status_code).acount()
-        if count > 0:
-            status_counts.append({
-                'status': status_code,
-                'count': count
-            })
+        aggregates[f'status_{status_code}'] = count(filter=Q(**{status_field: status_code}))
+    for pm_code, pm_label in PaymentMode.choices:
+        aggregates[f'payment_{pm_code}'] = count(filter=Q(payment_mode=pm_code))
+    result = await query.aaggregate(**aggregates)
+
+    total_revenue = result['total_revenue'] or Decimal('0')
+    average_price = result['average_price'] or Decimal('0')
+
+    # Count by status
+    status_counts = [
+        {'status': status_code, 'count': result[f'status_{status_code}']}
+        for status_code, status_label in ShipmentStatus.choices
+        if result[f'status_{status_code}']
+    ]
     
     # Count by payment mode
-    payment_counts = []
-    for pm_code, pm_label in PaymentMode.choices:
-        count = await query.filter(payment_mode=pm_code).acount()
-        if count > 0:
-            payment_counts.append({
-                'payment_mode': pm_code,
-                'count': count
-            })
-    
-    # Count by branch (only for org admin)
+    payment_counts = [
+        {'payment_mode': pm_code, 'count': result[f'payment_{pm_code}']}
+        for pm_code, pm_label in PaymentMode.choices
+        if result[f'payment_{pm_code}']
+    ]
+    
+    # Count by branch (only for org admin). A branch counts shipments where it is
+    # the source or the destination, so shipments to the same branch are only
+    # counted on the source side.
     by_branch = None
     if not user_branch:
-        branch_counts = []
-        async for branch in Branch.objects.filter(organization=organization):
-            branch_query = query.filter(
-                Q(source_branch=branch) | Q(destination_branch=branch)
-            )
-            count = await branch_query.acount()
-            if count > 0:
-                branch_revenue = await branch_query.aaggregate(total=Sum('price'))
-                total = branch_revenue.get('total') or Decimal('0')
-                branch_counts.append({
-                    'branch': {'slug': branch.slug, 'title': branch.title},
-                    'count': count,
-                    'total_revenue': str(total)
+        branch_counts = defaultdict(int)
+        branch_revenue = defaultdict(lambda: Decimal('0'))
+        grouped = [
+            query.values(branch_id=F('source_branch_id')),
+            query.exclude(source_branch_id=F('destination_branch_id')).values(branch_id=F('destination_branch_id')),
+        ]
+        for group in grouped:
+            async for row in group.annotate(count=count(), total=Sum(revenue)):
+                branch_counts[row['branch_id']] += row['count'] or 0
+                branch_revenue[row['branch_id']] += row['total'] or Decimal('0')
+
+        by_branch = []
+        async for branch in Branch.objects.filter(organization=organization).values('id', 'slug', 'title'):
+            if branch_counts[branch['id']] > 0:
+                by_branch.append({
+                    'branch': {'slug': branch['slug'], 'title': branch['title']},
+                    'count': branch_counts[branch['id']],
+                    'total_revenue': str(branch_revenue[branch['id']])
                 })
-        by_branch = branch_counts if branch_counts else []
     
     return {
-        'total_shipments': total_shipments,
+        'total_shipments': result['total_shipments'] or 0,
         'total_revenue': str(total_revenue),
         'average_price': str(average_price),
         'by_status': status_counts,
@@ -168,6 +198,110 @@ async def calculate_summary(query, organization, user_branch=None):
         'by_branch': by_branch
     }
 
+async def calculate_summary(query, organization, user_branch=None):
+    """
+    Calculate summary statistics from a shipment query.
+    """
+    return await _summarize(
+        query, organization, user_branch,
+        count=lambda **extra: Count('id', **extra),
+        revenue='price',
+        average=Avg('price'),
+        status_field='current_status',
+    )
+
+async def calculate_rollup_summary(query, organization, user_branch=None):
+    """
+    Same summary as calculate_summary, answered from the daily rollup.
+    The average is computed in SQL as revenue / count so it matches AVG(price).
+    """
+    return await _summarize(
+        query, organization, user_branch,
+        count=lambda **extra: Sum('shipment_count', **extra),
+        revenue='revenue',
+        average=ExpressionWrapper(
+            Sum('revenue') / NullIf(Sum(Cast('shipment_count', DecimalField(max_digits=20, decimal_places=0))), 0),
+            output_field=DecimalField(),
+        ),
+        status_field='status',
+    )
+
+async def summarize(organization, filters: AnalyticsFilterSerializer, query, user_branch=None):
+    """Answer from the rollup whenever the filters allow it, else from the raw query."""
+    if can_use_rollup(filters):
+        rollup_query = build_rollup_query(organization, filters, user_branch=user_branch)
+        return await calculate_rollup_summary(rollup_query, organization, user_branch=user_branch)
+    return await calculate_summary(query, organization, user_branch=user_branch)
+
+def serialize_analytics_row(shipment) -> dict:
+    """Row of the analytics shipment table."""
+    # Handle both None and empty string descriptions
+    desc = shipment.description
+    description_value = desc if desc and desc.strip() else ''
+    
+    return {
+        'slug': shipment.slug,
+        'tracking_id': shipment.tracking_id,
+        'sender_name': shipment.sender_name,
+        'sender_phone': shipment.sender_phone,
+        'receiver_name': shipment.receiver_name,
+        'receiver_phone': shipment.receiver_phone,
+        'description': description_value,
+        'source_branch': {'slug': shipment.source_branch.slug, 'title': shipment.source_branch.title},
+        'destination_branch': {'slug': shipment.destination_branch.slug, 'title': shipment.destination_branch.title},
+        'bus': {'slug': shipment.bus.slug, 'bus_number': shipment.bus.bus_number, 'preferred_days': shipment.bus.preferred_days} if shipment.bus else None,
+        'price': str(shipment.price),
+        'payment_mode': shipment.payment_mode,
+        'current_status': shipment.current_status,
+        'created_at': shipment.created_at.isoformat(),
+        'day': shipment.day.isoformat() if shipment.day else shipment.created_at.date().isoformat()
+    }
+
+async def build_analytics_data(organization, filters: AnalyticsFilterSerializer, query, user_branch=None) -> dict:
+    """
+    Summary plus one page of the shipment table. Pages are read with a
+    (created_at, id) keyset when `filters.cursor` is set and by page number
+    otherwise; both return next/prev cursors. Raises ValueError for a bad cursor.
+    """
+    # Calculate summary (from the daily rollup when the filters allow it)
+    summary = None
+    if filters.include_summary:
+        summary = await summarize(organization, filters, query, user_branch=user_branch)
+    
+    page = filters.page or 1
+    page_size = filters.page_size or 50
+    
+    # Total count is optional; it is free when the summary was computed
+    total = None
+    total_pages = None
+    if filters.include_total:
+        total = summary['total_shipments'] if summary else await query.acount()
+        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
+    
+    if filters.cursor or page == 1:
+        rows, next_cursor, prev_cursor = await keyset_page(query, filters.cursor, page_size)
+    else:
+        # Page-number access for existing clients; cursors let them continue by keyset
+        offset = (page - 1) * page_size
+        rows = [shipment async for shipment in query.order_by('-created_at', '-id')[offset:offset + page_size + 1]]
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1], "next") if rows and has_more else None
+        prev_cursor = encode_cursor(rows[0], "prev") if rows else None
+    
+    return {
+        'summary': summary,
+        'data': [serialize_analytics_row(shipment) for shipment in rows],
+        'pagination': {
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'total_pages': total_pages,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+    }
+
 @api.post("/analytics/organization/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_organization_admin")])
 async def get_organization_analytics(request, filters: AnalyticsFilterSerializer):
     """
@@ -184,58 +318,17 @@ async def get_organization_analytics(request, filters: AnalyticsFilterSerializer
     # Build query (no branch restriction for org admin)
     query = build_shipment_query(organization, filters, user_branch=None)
     
-    # Calculate summary
-    summary = await calculate_summary(query, organization, user_branch=None)
-    
-    # Get paginated data
-    page = filters.page or 1
-    page_size = filters.page_size or 50
-    total = await query.acount()
-    total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-    
-    # Apply pagination
-    offset = (page - 1) * page_size
-    shipments = []
-    async for shipment in query.order_by('-created_at')[offset:offset + page_size]:
-        # Get description - access the field directly
-        # Handle both None and empty string cases
-        desc = shipment.description
-        description_value = desc if desc and desc.strip() else ''
-        
-        shipments.append({
-            'slug': shipment.slug,
-            'tracking_id': shipment.tracking_id,
-            'sender_name': shipment.sender_name,
-            'sender_phone': shipment.sender_phone,
-            'receiver_name': shipment.receiver_name,
-            'receiver_phone': shipment.receiver_phone,
-            'description': description_value,
-            'source_branch': {'slug': shipment.source_branch.slug, 'title': shipment.source_branch.title},
-            'destination_branch': {'slug': shipment.destination_branch.slug, 'title': shipment.destination_branch.title},
-            'bus': {'slug': shipment.bus.slug, 'bus_number': shipment.bus.bus_number, 'preferred_days': shipment.bus.preferred_days} if shipment.bus else None,
-            'price': str(shipment.price),
-            'payment_mode': shipment.payment_mode,
-            'current_status': shipment.current_status,
-            'created_at': shipment.created_at.isoformat(),
-            'day': shipment.day.isoformat() if shipment.day else shipment.created_at.date().isoformat()
-        })
-    
-    response_data = {
-        'summary': summary,
-        'data': shipments,
-        'pagination': {
-            'page': page,
-            'page_size': page_size,
-            'total': total,
-            'total_pages': total_pages
-        }
-    }
+    try:
+        response_data = await build_analytics_data(organization, filters, query, user_branch=None)
+    except ValueError as e:
+        return response(status=400, message="Invalid cursor", error=str(e))
     
     return response(
         status=200,
         message="Analytics data retrieved successfully",
         data=response_data
     )
+
 @api.post("/analytics/branch/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
 async def get_branch_analytics(request, filters: AnalyticsFilterSerializer, user=Depends(get_current_user)):
     """
@@ -250,7 +343,7 @@ async def get_branch_analytics(request, filters: AnalyticsFilterSerializer, user
         )
     
     # Get branch from authenticated user
-    branch = await user.branch.afirst()
+    branch = user.branch_id
     if not branch:
         return response(
             status=403,
@@ -259,7 +352,7 @@ async def get_branch_analytics(request, filters: AnalyticsFilterSerializer, user
         )
     
     # Verify branch belongs to the organization
-    if branch.organization_id != organization.id:
+    if user.organization_id != organization.id:
         return response(
             status=403,
             message="Branch access denied",
@@ -269,55 +362,112 @@ async def get_branch_analytics(request, filters: AnalyticsFilterSerializer, user
     # Build query (restricted to user's branch)
     query = build_shipment_query(organization, filters, user_branch=branch)
     
-    # Calculate summary
-    summary = await calculate_summary(query, organization, user_branch=branch)
-    
-    # Get paginated data
-    page = filters.page or 1
-    page_size = filters.page_size or 50
-    total = await query.acount()
-    total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-    
-    # Apply pagination
-    offset = (page - 1) * page_size
-    shipments = []
-    async for shipment in query.order_by('-created_at')[offset:offset + page_size]:
-        # Get description - access the field directly
-        # Handle both None and empty string cases
-        desc = shipment.description
-        description_value = desc if desc and desc.strip() else ''
-        
-        shipments.append({
-            'slug': shipment.slug,
-            'tracking_id': shipment.tracking_id,
-            'sender_name': shipment.sender_name,
-            'sender_phone': shipment.sender_phone,
-            'receiver_name': shipment.receiver_name,
-            'receiver_phone': shipment.receiver_phone,
-            'description': description_value,
-            'source_branch': {'slug': shipment.source_branch.slug, 'title': shipment.source_branch.title},
-            'destination_branch': {'slug': shipment.destination_branch.slug, 'title': shipment.destination_branch.title},
-            'bus': {'slug': shipment.bus.slug, 'bus_number': shipment.bus.bus_number, 'preferred_days': shipment.bus.preferred_days} if shipment.bus else None,
-            'price': str(shipment.price),
-            'payment_mode': shipment.payment_mode,
-            'current_status': shipment.current_status,
-            'created_at': shipment.created_at.isoformat(),
-            'day': shipment.day.isoformat() if shipment.day else shipment.created_at.date().isoformat()
-        })
-    
-    response_data = {
-        'summary': summary,
-        'data': shipments,
-        'pagination': {
-            'page': page,
-            'page_size': page_size,
-            'total': total,
-            'total_pages': total_pages
-        }
-    }
+    try:
+        response_data = await build_analytics_data(organization, filters, query, user_branch=branch)
+    except ValueError as e:
+        return response(status=400, message="Invalid cursor", error=str(e))
     
     return response(
         status=200,
         message="Branch analytics data retrieved successfully",
         data=response_data
     )
+
+def export_response(query, filters: AnalyticsExportSerializer, filename: str):
+    """Stream the filtered shipments as CSV or NDJSON; no summary or pagination is computed."""
+    return StreamingResponse(
+        stream_export(query, filters.format),
+        media_type=CONTENT_TYPES[filters.format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{filters.format}"'}
+    )
+
+@api.post("/analytics/organization/export/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_organization_admin")])
+async def export_organization_analytics(request, filters: AnalyticsExportSerializer):
+    """
+    Export all filtered shipments in the organization.
+    """
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    
+    query = build_shipment_query(organization, filters, user_branch=None)
+    return export_response(query, filters, filename=f"{organization.subdomain}-shipments")
+
+@api.post("/analytics/branch/export/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
+async def export_branch_analytics(request, filters: AnalyticsExportSerializer, user=Depends(get_current_user)):
+    """
+    Export filtered shipments related to the branch admin's branch.
+    """
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    
+    if not user.branch_id:
+        return response(
+            status=403,
+            message="Branch access denied",
+            error="User does not have an associated branch"
+        )
+    
+    if user.organization_id != organization.id:
+        return response(
+            status=403,
+            message="Branch access denied",
+            error="Branch does not belong to this organization"
+        )
+    
+    query = build_shipment_query(organization, filters, user_branch=user.branch_id)
+    return export_response(query, filters, filename=f"{organization.subdomain}-branch-shipments")
+
+@api.get("/analytics/search/", auth=[jwt_auth], guards=[IsAuthenticated()])
+async def search_shipments(request, q: str = "", limit: int = SEARCH_RESULT_LIMIT, user=Depends(get_current_user)):
+    """
+    Ranked shipment search for the analytics search box: tracking id prefix
+    matches first, then ids containing the term, then sender/receiver names
+    by similarity.
+    Organization admins search the organization, branch admins their branch.
+    """
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    
+    if user.organization_id != organization.id:
+        return response(
+            status=403,
+            message="Access denied",
+            error="User does not belong to this organization"
+        )
+    
+    query = Shipment.objects.select_related(
+        'source_branch',
+        'destination_branch',
+        'bus'
+    ).filter(organization=organization)
+    if not user.has_perm("organization.is_organization_admin"):
+        if not user.branch_id:
+            return response(
+                status=403,
+                message="Branch access denied",
+                error="User does not have an associated branch"
+            )
+        query = query.filter(Q(source_branch_id=user.branch_id) | Q(destination_branch_id=user.branch_id))
+    
+    results = [serialize_analytics_row(shipment) async for shipment in ranked_search(query, q, limit)]
+    
+    return response(
+        status=200,
+        message="Search results retrieved successfully",
+        data=results
+    )
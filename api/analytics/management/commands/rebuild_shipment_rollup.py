@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollup import rebuild_rollup
+from organization.models import Organization
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily shipment rollup from raw shipments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', help="Subdomain of a single organization to rebuild")
+
+    def handle(self, *args, **options):
+        organization_id = None
+        if options['organization']:
+            try:
+                organization_id = Organization.objects.get(subdomain=options['organization']).id
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organization '{options['organization']}' not found")
+
+        buckets = rebuild_rollup(organization_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt shipment rollup: {buckets} buckets"))
@@ -0,0 +1,49 @@
+# Generated manually for the daily shipment rollup
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollup(apps, schema_editor):
+    """Build the rollup from existing shipments"""
+    Shipment = apps.get_model('shipment', 'Shipment')
+    DailyShipmentRollup = apps.get_model('analytics', 'DailyShipmentRollup')
+    rows = Shipment.objects.order_by().values(
+        'organization_id', 'source_branch_id', 'destination_branch_id', 'day', 'payment_mode',
+        status=models.F('current_status'),
+    ).annotate(shipment_count=models.Count('id'), revenue=models.Sum('price'))
+    DailyShipmentRollup.objects.bulk_create(
+        (DailyShipmentRollup(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('organization', '0008_branch_current_operational_date_and_more'),
+        ('shipment', '0004_merge_20260131_0758'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyShipmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('BOOKED', 'Booked'), ('IN_TRANSIT', 'In Transit'), ('ARRIVED', 'Arrived at Destination')], max_length=20)),
+                ('payment_mode', models.CharField(choices=[('SENDER_PAYS', 'Prepaid (Sender)'), ('RECEIVER_PAYS', 'COD (Receiver)')], max_length=20)),
+                ('shipment_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('destination_branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organization.branch')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shipment_rollups', to='organization.organization')),
+                ('source_branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organization.branch')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('organization', 'day', 'source_branch', 'destination_branch', 'status', 'payment_mode'), name='unique_shipment_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,33 @@
 from django.db import models
+from organization.models import Organization, Branch
+from shipment.models import ShipmentStatus, PaymentMode
 
 # Create your models here.
+
+class DailyShipmentRollup(models.Model):
+    """
+    Shipment counts and revenue per organization, branch pair, day, status and
+    payment mode. Maintained by analytics.rollup in the same transaction as the
+    shipment writes (shipment.api and the Django admin). Writes that bypass it
+    - raw SQL, other `queryset.update()` calls, cascades from deleting a branch -
+    are reconciled by running `manage.py rebuild_shipment_rollup` nightly.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='shipment_rollups')
+    source_branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='+')
+    destination_branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=ShipmentStatus.choices)
+    payment_mode = models.CharField(max_length=20, choices=PaymentMode.choices)
+    shipment_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'day', 'source_branch', 'destination_branch', 'status', 'payment_mode'],
+                name='unique_shipment_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.payment_mode}: {self.shipment_count}"
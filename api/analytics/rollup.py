@@ -0,0 +1,141 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F, Count, Sum
+
+from analytics.models import DailyShipmentRollup
+from shipment.models import Shipment
+
+BUCKET_FIELDS = ('organization_id', 'source_branch_id', 'destination_branch_id', 'day', 'status', 'payment_mode')
+
+
+def bucket_for(shipment, status=None) -> tuple:
+    return (
+        shipment.organization_id,
+        shipment.source_branch_id,
+        shipment.destination_branch_id,
+        shipment.day,
+        status or shipment.current_status,
+        shipment.payment_mode,
+    )
+
+
+def apply_rollup_deltas(deltas: dict) -> None:
+    """
+    Add `{bucket: (count, revenue)}` deltas to the rollup in one upsert. Must
+    run inside the transaction that writes the shipments so both commit or
+    roll back together.
+    """
+    deltas = {bucket: delta for bucket, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return _apply_rollup_deltas_per_bucket(deltas)
+
+    meta = DailyShipmentRollup._meta
+    fields = [meta.get_field(name) for name in BUCKET_FIELDS + ('shipment_count', 'revenue')]
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    totals = ', '.join(
+        f'{quote(name)} = {table}.{quote(name)} + EXCLUDED.{quote(name)}' for name in ('shipment_count', 'revenue')
+    )
+    params = [
+        field.get_db_prep_save(value, connection)
+        for bucket, delta in deltas.items()
+        for field, value in zip(fields, bucket + delta)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) VALUES {", ".join([row] * len(deltas))} '
+            f'ON CONFLICT ({", ".join(quote(field.column) for field in fields[:len(BUCKET_FIELDS)])}) '
+            f'DO UPDATE SET {totals}',
+            params,
+        )
+
+
+def _apply_rollup_deltas_per_bucket(deltas: dict) -> None:
+    for bucket, (count, revenue) in deltas.items():
+        key = dict(zip(BUCKET_FIELDS, bucket))
+        changes = {'shipment_count': F('shipment_count') + count, 'revenue': F('revenue') + revenue}
+        if DailyShipmentRollup.objects.filter(**key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DailyShipmentRollup.objects.create(**key, shipment_count=count, revenue=revenue)
+        except IntegrityError:
+            # Created concurrently by another booking
+            DailyShipmentRollup.objects.filter(**key).update(**changes)
+
+
+def count_shipment(deltas, shipment, sign=1) -> None:
+    """Add (or with sign=-1, remove) one shipment's count and revenue in `deltas`."""
+    count, revenue = deltas[bucket_for(shipment)]
+    deltas[bucket_for(shipment)] = (count + sign, revenue + sign * Decimal(str(shipment.price)))
+
+
+def record_shipment_created(*shipments) -> None:
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    for shipment in shipments:
+        count_shipment(deltas, shipment)
+    apply_rollup_deltas(deltas)
+
+
+def record_shipment_deleted(*shipments) -> None:
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    for shipment in shipments:
+        count_shipment(deltas, shipment, -1)
+    apply_rollup_deltas(deltas)
+
+
+def record_shipment_edited(previous, shipment) -> None:
+    """Move a shipment edited outside shipment.api from `previous` (the row before the edit) to its current bucket."""
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    count_shipment(deltas, previous, -1)
+    count_shipment(deltas, shipment)
+    apply_rollup_deltas(deltas)
+
+
+def record_status_change(shipment, previous_status: str) -> None:
+    record_status_changes([(shipment, previous_status)])
+
+
+def record_status_changes(changes) -> None:
+    """Move each `(shipment, previous_status)` from its old bucket to its current one, netting per bucket."""
+    deltas = defaultdict(lambda: (0, Decimal('0')))
+    for shipment, previous_status in changes:
+        if previous_status == shipment.current_status:
+            continue
+        price = Decimal(str(shipment.price))
+        for bucket, sign in ((bucket_for(shipment, previous_status), -1), (bucket_for(shipment), 1)):
+            count, revenue = deltas[bucket]
+            deltas[bucket] = (count + sign, revenue + sign * price)
+    apply_rollup_deltas(deltas)
+
+
+@transaction.atomic
+def rebuild_rollup(organization_id=None) -> int:
+    """Recompute the rollup from raw shipments. Returns the number of buckets written."""
+    if connection.vendor == 'postgresql':
+        # Block concurrent rollup writers until the rebuild commits
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {DailyShipmentRollup._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+
+    rollups = DailyShipmentRollup.objects.all()
+    shipments = Shipment.objects.all()
+    if organization_id:
+        rollups = rollups.filter(organization_id=organization_id)
+        shipments = shipments.filter(organization_id=organization_id)
+    rollups.delete()
+
+    rows = shipments.order_by().values(
+        'organization_id', 'source_branch_id', 'destination_branch_id', 'day', 'payment_mode',
+        status=F('current_status'),
+    ).annotate(shipment_count=Count('id'), revenue=Sum('price'))
+    created = DailyShipmentRollup.objects.bulk_create(
+        (DailyShipmentRollup(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+    return len(created)
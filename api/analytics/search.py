@@ -0,0 +1,81 @@
+"""
+Shipment search for the analytics UI.
+
+On PostgreSQL names are matched with pg_trgm word similarity, served by the GIN
+trigram indexes on sender_name / receiver_name. Tracking ids match by prefix
+(varchar_pattern_ops index) and, for terms of MIN_TRIGRAM_LENGTH or more
+characters, anywhere in the id (trigram index), so a code typed without its
+destination prefix is still found; shorter terms only match the start of an
+id. The indexes are created by shipment migration 0006. Other databases
+(SQLite test runs) fall back to LIKE with the same tracking id semantics and
+substring matching for names.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q, Case, When, Value, FloatField
+from django.db.models.functions import Greatest
+
+# pg_trgm cannot say much about shorter terms; they only match tracking id prefixes
+MIN_TRIGRAM_LENGTH = 3
+SEARCH_RESULT_LIMIT = 20
+MAX_SEARCH_RESULT_LIMIT = 100
+
+
+def normalize_term(term: str | None) -> str:
+    return re.sub(r"\s+", " ", (term or "").strip())
+
+
+def use_trigrams() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def search_filter(term: str) -> Q:
+    """Predicate matching shipments whose tracking id contains, or names resemble, `term`."""
+    condition = Q(tracking_id__startswith=term.upper())
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return condition
+    condition |= Q(tracking_id__contains=term.upper())
+    if use_trigrams():
+        return condition | Q(sender_name__trigram_word_similar=term) | Q(receiver_name__trigram_word_similar=term)
+    return condition | Q(sender_name__icontains=term) | Q(receiver_name__icontains=term)
+
+
+def apply_search(query, term: str | None):
+    """Filter `query` by the analytics `search` term, keeping its ordering."""
+    term = normalize_term(term)
+    if not term:
+        return query
+    return query.filter(search_filter(term))
+
+
+def ranked_search(query, term: str | None, limit: int = SEARCH_RESULT_LIMIT):
+    """
+    Best matches first: tracking id prefix matches rank 1.0, matches elsewhere
+    in the id 0.9, names by trigram word similarity (or 0.5 for a substring
+    match without pg_trgm), newest first within a rank.
+    """
+    term = normalize_term(term)
+    if not term:
+        return query.none()
+    limit = min(max(limit, 1), MAX_SEARCH_RESULT_LIMIT)
+
+    tracking_rank = When(tracking_id__startswith=term.upper(), then=Value(1.0))
+    tracking_substring_rank = When(tracking_id__contains=term.upper(), then=Value(0.9))
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        rank = Case(tracking_rank, default=Value(0.0), output_field=FloatField())
+    elif use_trigrams():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        rank = Case(
+            tracking_rank,
+            tracking_substring_rank,
+            default=Greatest(TrigramWordSimilarity(term, 'sender_name'), TrigramWordSimilarity(term, 'receiver_name')),
+            output_field=FloatField(),
+        )
+    else:
+        rank = Case(tracking_rank, tracking_substring_rank, default=Value(0.5), output_field=FloatField())
+
+    return query.filter(search_filter(term)).annotate(
+        search_rank=rank
+    ).order_by('-search_rank', '-created_at', '-id')[:limit]
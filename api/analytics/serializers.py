@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Literal
 from django_bolt.serializers import Serializer, Nested
 from msgspec import Meta
 from shipment.models import ShipmentStatus, PaymentMode
@@ -19,6 +19,13 @@ class AnalyticsFilterSerializer(Serializer):
     search: str | None = None  # Search in tracking_id, sender_name, receiver_name
     page: int = 1  # Page number for pagination
     page_size: int = 50  # Items per page
+    cursor: str | None = None  # Opaque next/prev cursor from a previous page; takes precedence over page
+    include_total: bool = True  # Set False to skip the total count when only next/prev is needed
+    include_summary: bool = True  # Set False to skip summary computation
+
+class AnalyticsExportSerializer(AnalyticsFilterSerializer):
+    """Analytics filters plus the export format; pagination and summary fields are ignored"""
+    format: Literal['csv', 'ndjson'] = 'csv'
 
 class StatusCountSerializer(Serializer):
     """Count of shipments by status"""
@@ -63,4 +70,4 @@ class AnalyticsResponseSerializer(Serializer):
     """Complete analytics response with summary and data"""
     summary: Annotated[AnalyticsSummarySerializer, Nested(AnalyticsSummarySerializer)]
     data: list[AnalyticsDataSerializer]
-    pagination: dict  # { page: int, page_size: int, total: int, total_pages: int }
+    pagination: dict  # { page, page_size, total, total_pages, next_cursor, prev_cursor }
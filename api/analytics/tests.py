@@ -1,3 +1,251 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.db.models import Q, Sum, Avg
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from analytics.api import calculate_summary, get_organization_analytics
+from analytics.export import EXPORT_COLUMNS, stream_export
+from analytics.models import DailyShipmentRollup
+from analytics.rollup import rebuild_rollup
+from analytics.serializers import AnalyticsFilterSerializer
+from core.pagination import keyset_page
+from organization.models import Organization, Branch
+from shipment.admin import ShipmentAdmin
+from shipment.api import book_shipment, transition_shipment
+from shipment.models import Shipment, ShipmentStatus, PaymentMode
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RollupParityTests(TestCase):
+    """The incrementally maintained rollup equals a rebuild from raw shipments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Rollup Org", subdomain="rollup")
+        cls.source = Branch.objects.create(organization=cls.organization, title="Surat")
+        cls.destination = Branch.objects.create(organization=cls.organization, title="Rajkot")
+
+    def book(self, price, payment_mode=PaymentMode.values[0]):
+        return book_shipment(
+            organization=self.organization, source_branch=self.source, destination_branch=self.destination,
+            sender_name="Ramesh Patel", sender_phone="9000000000",
+            receiver_name="Sunita Shah", receiver_phone="9000000001",
+            price=Decimal(price), payment_mode=payment_mode, current_status=ShipmentStatus.BOOKED,
+        )
+
+    def rollup(self):
+        return sorted(DailyShipmentRollup.objects.filter(organization=self.organization).exclude(shipment_count=0).values_list(
+            'status', 'payment_mode', 'shipment_count', 'revenue'
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.rollup()
+        rebuild_rollup(self.organization.id)
+        self.assertEqual(incremental, self.rollup())
+
+    def test_single_booking(self):
+        self.book("120.50")
+
+        self.assertEqual(self.rollup(), [(ShipmentStatus.BOOKED, PaymentMode.values[0], 1, Decimal("120.50"))])
+        self.assertMatchesRebuild()
+
+    def test_single_transition(self):
+        shipment = self.book("120.50")
+        self.book("80.00", PaymentMode.values[1])
+
+        transition_shipment(shipment, ShipmentStatus.IN_TRANSIT, self.source.title)
+
+        self.assertMatchesRebuild()
+
+    def test_admin_edits_and_deletes(self):
+        shipment_admin = ShipmentAdmin(Shipment, admin.site)
+        edited, deleted, kept = self.book("100.00"), self.book("60.00"), self.book("40.00")
+
+        edited.price = Decimal("150.00")
+        edited.payment_mode = PaymentMode.values[1]
+        edited.current_status = ShipmentStatus.ARRIVED
+        shipment_admin.save_model(None, edited, None, change=True)
+        shipment_admin.delete_model(None, deleted)
+        self.assertMatchesRebuild()
+
+        shipment_admin.delete_queryset(None, Shipment.objects.filter(pk=kept.pk))
+        self.assertMatchesRebuild()
+
+
+async def per_query_summary(query, organization, user_branch=None):
+    """calculate_summary as it was before conditional aggregation: one query per status, mode and branch."""
+    total_revenue = (await query.aaggregate(total=Sum('price')))['total'] or Decimal('0')
+    average_price = (await query.aaggregate(average=Avg('price')))['average'] or Decimal('0')
+    by_status = []
+    for status, label in ShipmentStatus.choices:
+        if count := await query.filter(current_status=status).acount():
+            by_status.append({'status': status, 'count': count})
+    by_payment_mode = []
+    for payment_mode, label in PaymentMode.choices:
+        if count := await query.filter(payment_mode=payment_mode).acount():
+            by_payment_mode.append({'payment_mode': payment_mode, 'count': count})
+    by_branch = None
+    if not user_branch:
+        by_branch = []
+        async for branch in Branch.objects.filter(organization=organization):
+            branch_query = query.filter(Q(source_branch=branch) | Q(destination_branch=branch))
+            if count := await branch_query.acount():
+                total = (await branch_query.aaggregate(total=Sum('price')))['total'] or Decimal('0')
+                by_branch.append({'branch': {'slug': branch.slug, 'title': branch.title}, 'count': count, 'total_revenue': str(total)})
+    return {
+        'total_shipments': await query.acount(),
+        'total_revenue': str(total_revenue),
+        'average_price': str(average_price),
+        'by_status': by_status,
+        'by_payment_mode': by_payment_mode,
+        'by_branch': by_branch,
+    }
+
+
+class SummaryParityTests(TestCase):
+    """calculate_summary answers exactly what the per-query version did."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Summary Org", subdomain="summary")
+        cls.empty = Organization.objects.create(title="Empty Org", subdomain="summary-empty")
+        Branch.objects.create(organization=cls.empty, title="Idle")
+        cls.branches = [Branch.objects.create(organization=cls.organization, title=title) for title in ("Surat", "Rajkot", "Vapi")]
+        statuses, payment_modes = ShipmentStatus.values, PaymentMode.values
+        Shipment.objects.bulk_create([
+            Shipment(
+                organization=cls.organization,
+                source_branch=cls.branches[i % 3], destination_branch=cls.branches[(i * 2) % 3],
+                sender_name="Ramesh Patel", sender_phone="9000000000",
+                receiver_name="Sunita Shah", receiver_phone="9000000001",
+                price=Decimal(75) + Decimal(i) / 4, payment_mode=payment_modes[i % len(payment_modes)],
+                current_status=statuses[(i // 2) % len(statuses)],
+            )
+            for i in range(23)
+        ])
+
+    def assertSameSummary(self, query, organization, user_branch=None):
+        self.assertEqual(
+            async_to_sync(calculate_summary)(query, organization, user_branch),
+            async_to_sync(per_query_summary)(query, organization, user_branch),
+        )
+
+    def test_empty_organization(self):
+        self.assertSameSummary(Shipment.objects.filter(organization=self.empty), self.empty)
+
+    def test_mixed_statuses_and_payment_modes(self):
+        query = Shipment.objects.filter(organization=self.organization)
+        self.assertSameSummary(query, self.organization)
+        self.assertSameSummary(query.filter(payment_mode=PaymentMode.values[0]), self.organization)
+
+    def test_branch_user(self):
+        branch = self.branches[1]
+        query = Shipment.objects.filter(Q(source_branch=branch) | Q(destination_branch=branch))
+        self.assertSameSummary(query, self.organization, user_branch=branch)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Pages Org", subdomain="pages")
+        branch = Branch.objects.create(organization=cls.organization, title="Surat")
+        shipments = Shipment.objects.bulk_create([
+            Shipment(
+                organization=cls.organization, source_branch=branch, destination_branch=branch,
+                sender_name="Ramesh Patel", sender_phone="9000000000",
+                receiver_name="Sunita Shah", receiver_phone="9000000001",
+                price=Decimal(100), payment_mode=PaymentMode.values[0],
+            )
+            for _ in range(8)
+        ])
+        # Five rows share one created_at, so pages must break ties on id
+        now = timezone.now()
+        for i, shipment in enumerate(shipments):
+            Shipment.objects.filter(pk=shipment.pk).update(created_at=now - timedelta(minutes=max(i - 4, 0)))
+        cls.query = Shipment.objects.filter(organization=cls.organization)
+        cls.newest_first = list(cls.query.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def page(self, cursor, page_size=3):
+        rows, next_cursor, prev_cursor = async_to_sync(keyset_page)(self.query, cursor, page_size)
+        return [row.id for row in rows], next_cursor, prev_cursor
+
+    def test_cursors_walk_every_row_once_in_both_directions(self):
+        pages, cursor = [], None
+        while True:
+            ids, cursor, prev_cursor = self.page(cursor)
+            pages.append((ids, prev_cursor))
+            if cursor is None:
+                break
+        self.assertEqual([id for ids, _ in pages for id in ids], self.newest_first)
+        self.assertIsNone(pages[0][1])
+
+        # Walking back from the last page returns the same pages
+        back, cursor = [], pages[-1][1]
+        while cursor is not None:
+            ids, _, cursor = self.page(cursor)
+            back.append(ids)
+        self.assertEqual(back, [ids for ids, _ in reversed(pages[:-1])])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        request = SimpleNamespace(headers={}, state={"organization": self.organization})
+        filters = AnalyticsFilterSerializer(cursor="not-a-cursor", include_summary=False)
+
+        result = async_to_sync(get_organization_analytics)(request, filters)
+
+        self.assertEqual(result.status_code, 400)
+
+
+@mock.patch('analytics.export.EXPORT_CHUNK_SIZE', 2)
+class ExportStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Export Org", subdomain="export")
+        branch = Branch.objects.create(organization=cls.organization, title="Surat")
+        Shipment.objects.bulk_create([
+            Shipment(
+                organization=cls.organization, source_branch=branch, destination_branch=branch,
+                sender_name=name, sender_phone="9000000000",
+                receiver_name="Sunita Shah", receiver_phone="9000000001",
+                price=Decimal(100 + i), payment_mode=PaymentMode.values[0],
+            )
+            for i, name in enumerate(["Ramesh Patel", "=HYPERLINK(\"http://x\")", "@SUM(A1)", "-2+3", "Kiran Desai"])
+        ])
+        cls.query = Shipment.objects.filter(organization=cls.organization)
+
+    def export(self, export_format):
+        async def collect():
+            return [chunk async for chunk in stream_export(self.query, export_format)]
+        return async_to_sync(collect)()
+
+    def test_csv_streams_in_chunks_with_one_header(self):
+        chunks = self.export('csv')
+
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 6)
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        rows = list(csv.DictReader(io.StringIO(b"".join(self.export('csv')).decode())))
+
+        self.assertEqual(
+            sorted(row['sender_name'] for row in rows),
+            ["'-2+3", "'=HYPERLINK(\"http://x\")", "'@SUM(A1)", "Kiran Desai", "Ramesh Patel"],
+        )
+
+    def test_ndjson_has_one_object_per_line(self):
+        lines = b"".join(self.export('ndjson')).decode().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertIn("=HYPERLINK(\"http://x\")", [json.loads(line)['sender_name'] for line in lines])
@@ -1,4 +1,7 @@
+from django.conf import settings
 from django_bolt import BoltAPI
+from django_bolt.auth import APIKeyAuthentication, IsAuthenticated
+from core.response_cache import stats as response_cache_stats
 from core.utils import response
 
 api = BoltAPI(django_middleware=False, prefix="/api")
@@ -9,4 +12,23 @@ async def health_check():
         status=200,
         message="API is healthy",
         data={"status": "ok"}
-    )
\ No newline at end of file
+    )
+
+@api.get(
+    "/metrics/response_cache/",
+    auth=[APIKeyAuthentication(api_keys={settings.METRICS_API_KEY} - {''})],
+    guards=[IsAuthenticated()]
+    )
+async def response_cache_metrics():
+    """Hit and miss counts of the response cache in this worker process."""
+    if not settings.METRICS_API_KEY:
+        return response(
+            status=404,
+            message="Metrics are disabled",
+            error="METRICS_API_KEY is not configured"
+        )
+    return response(
+        status=200,
+        message="Response cache metrics",
+        data=response_cache_stats.snapshot()
+    )
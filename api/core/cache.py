@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned on a cache miss, so that ``None`` can be cached as a value
+# (e.g. negative lookups).
+MISSING = object()
+
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after `ttl` seconds.
+    Values are shared between requests, so callers must treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    Two-tier cache: a per-process `LocalTTLCache` in front of the configured
+    Django cache. Reads fall through local -> remote and back-fill the local
+    tier; writes and deletes go to both. Remote failures are logged and treated
+    as misses so an unavailable Redis never takes a request down.
+
+    Deletes only clear the local tier of the current process, so `local_ttl`
+    bounds how long other workers may keep serving a stale value.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        remote_ttl: int = 300,
+        local_ttl: float = 10,
+        local_maxsize: int = 1024,
+        cache_alias: str = "default",
+    ):
+        self.namespace = namespace
+        self.remote_ttl = remote_ttl
+        self.local = LocalTTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self.cache_alias = cache_alias
+
+    @property
+    def remote(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def aget(self, key, default=MISSING):
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        try:
+            value = await self.remote.aget(self.make_key(key), MISSING)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {self.make_key(key)}: {e}")
+            return default
+        if value is MISSING:
+            return default
+        self.local.set(key, value)
+        return value
+
+    async def aset(self, key, value, ttl: int | None = None):
+        ttl = self.remote_ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=min(ttl, self.local.ttl))
+        try:
+            await self.remote.aset(self.make_key(key), value, timeout=ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {self.make_key(key)}: {e}")
+
+    async def adelete(self, key):
+        self.local.delete(key)
+        try:
+            await self.remote.adelete(self.make_key(key))
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {self.make_key(key)}: {e}")
+
+    def delete(self, key):
+        """Synchronous delete, for use from signal receivers."""
+        self.local.delete(key)
+        try:
+            self.remote.delete(self.make_key(key))
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {self.make_key(key)}: {e}")
@@ -0,0 +1,176 @@
+"""
+Server-push events (GET /api/events/, Messaging/api.py).
+
+Write paths call `publish_on_commit(channels, event_type, data)` inside their
+transaction; once it commits the event is encoded once as an SSE frame and
+handed to every local subscriber of any of its channels. With EVENTS_REDIS_URL
+set, it is also PUBLISHed on Redis, and each worker relays events from other
+workers to its own subscribers, so a terminal sees writes made anywhere.
+
+Channels are tenant-scoped strings from `organization_channel`,
+`branch_channel` and `user_channel`. Events carry just enough to update a
+list in place; a client that falls behind (its queue fills up) gets a
+`resync` event and should refetch with its `since` watermark.
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from collections import defaultdict
+
+import msgspec
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # Redis fan-out is optional; events then stay within the process
+    redis = aioredis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = "events"
+RESYNC = "resync"
+
+
+def organization_channel(organization_id) -> str:
+    return f"org:{organization_id}"
+
+
+def branch_channel(organization_id, branch_id) -> str:
+    return f"org:{organization_id}:branch:{branch_id}"
+
+
+def user_channel(organization_id, user_id) -> str:
+    return f"org:{organization_id}:user:{user_id}"
+
+
+def encode_event(event_type: str, data) -> bytes:
+    return b"event: " + event_type.encode() + b"\ndata: " + msgspec.json.encode(data) + b"\n\n"
+
+
+class Subscription:
+    """One stream's bounded queue of encoded events, bound to the loop it was created on."""
+
+    def __init__(self, channels, maxsize: int):
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, frame: bytes):
+        """Queue `frame`; runs on the subscription's loop."""
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(encode_event(RESYNC, {}))
+
+    async def next(self, timeout: float) -> bytes | None:
+        """The next frame, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """In-process pub/sub. `publish` is thread-safe; subscribers live on event loops."""
+
+    def __init__(self, redis_url: str | None = None, queue_size: int = 100):
+        self.redis_url = redis_url if redis is not None else None
+        self.queue_size = queue_size
+        self.origin = uuid.uuid4().hex
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener = None
+
+    def subscribe(self, channels) -> Subscription:
+        subscription = Subscription(channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def deliver_local(self, channels, frame: bytes):
+        with self._lock:
+            targets = set().union(*(self._subscribers.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, frame)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+    def publish(self, channels, event_type: str, data):
+        channels = list(channels)
+        self.deliver_local(channels, encode_event(event_type, data))
+        if self.redis_url:
+            message = msgspec.json.encode({"origin": self.origin, "channels": channels, "type": event_type, "data": data})
+            try:
+                if self._redis is None:
+                    self._redis = redis.Redis.from_url(self.redis_url)
+                self._redis.publish(REDIS_CHANNEL, message)
+            except Exception as e:
+                logger.warning(f"Publishing {event_type} to Redis failed: {e}")
+
+    def _ensure_listener(self):
+        if not self.redis_url:
+            return
+        loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self):
+        """Relay other workers' events to local subscribers, reconnecting on errors."""
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.redis_url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(REDIS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        event = msgspec.json.decode(message["data"])
+                        if event["origin"] != self.origin:
+                            self.deliver_local(event["channels"], encode_event(event["type"], event["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event relay from Redis failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+
+broker = EventBroker(redis_url=settings.EVENTS_REDIS_URL or None, queue_size=settings.EVENTS_QUEUE_SIZE)
+
+
+def publish_on_commit(channels, event_type: str, data):
+    """Publish once the current transaction commits (immediately outside one)."""
+    channels = list(channels)
+    transaction.on_commit(lambda: broker.publish(channels, event_type, data))
+
+
+async def event_stream(channels, heartbeat: float | None = None):
+    """SSE byte stream for `channels`, with a comment line every `heartbeat` seconds to keep proxies from timing out."""
+    heartbeat = settings.EVENTS_HEARTBEAT if heartbeat is None else heartbeat
+    subscription = broker.subscribe(channels)
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            frame = await subscription.next(timeout=heartbeat)
+            yield frame if frame is not None else b": keepalive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
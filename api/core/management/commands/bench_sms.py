@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+from core.sms_gateway import LocalSMSGateway
+from core.sms_service import SMSClient, CircuitBreaker
+
+
+async def send_per_call(gateway, url, messages, concurrency):
+    """The old behaviour: a fresh AsyncClient (and connection) per message."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(to_number, body):
+        async with semaphore:
+            transport = gateway.transport() if gateway else None
+            async with httpx.AsyncClient(timeout=10, transport=transport) as client:
+                try:
+                    response = await client.post(url, params={"to": to_number, "message": body})
+                    return response.is_success
+                except httpx.RequestError:
+                    return False
+
+    return await asyncio.gather(*(send(to_number, body) for to_number, body in messages))
+
+
+async def send_pooled(gateway, url, messages, concurrency):
+    client = SMSClient(
+        url=url,
+        concurrency=concurrency,
+        max_connections=concurrency,
+        breaker=CircuitBreaker(failure_threshold=10 ** 9),
+        transport=gateway.transport() if gateway else None,
+    )
+    try:
+        return [success for success, _ in await client.send_many(messages)]
+    finally:
+        await client.aclose()
+
+
+class Command(BaseCommand):
+    help = "Messages per second through the SMS client: a client per call vs. the pooled SMSClient"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--latency', type=float, default=0.02, help="Simulated gateway latency per request (s)")
+        parser.add_argument('--connect-latency', type=float, default=0.05, help="Simulated handshake per new connection (s)")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests the stand-in answers with 503")
+        parser.add_argument('--url', help="Benchmark a real gateway at this URL instead of the local stand-in")
+
+    def handle(self, *args, **options):
+        messages = [(f"90000{i:05d}", f"Benchmark message {i}") for i in range(options['messages'])]
+        url = options['url'] or "http://sms-gateway.local/send_sms"
+
+        self.stdout.write(f"{'mode':<10} {'messages':>9} {'ok':>7} {'seconds':>9} {'msg/s':>9}")
+        for mode, run in (("per-call", send_per_call), ("pooled", send_pooled)):
+            gateway = None if options['url'] else LocalSMSGateway(
+                latency=options['latency'],
+                connect_latency=options['connect_latency'],
+                failure_rate=options['failure_rate'],
+                seed=1,
+            )
+            started = time.perf_counter()
+            results = asyncio.run(run(gateway, url, messages, options['concurrency']))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{mode:<10} {len(messages):>9} {sum(results):>7} {elapsed:>9.2f} {len(messages) / elapsed:>9.0f}"
+            )
@@ -6,7 +6,7 @@ from .utils import generate_unique_hash
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    slug = models.CharField(max_length=32)
+    slug = models.CharField(max_length=32, default=generate_unique_hash, db_index=True)
     
     class Meta:
         abstract = True
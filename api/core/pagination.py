@@ -0,0 +1,59 @@
+import base64
+from datetime import datetime
+
+import msgspec
+from django.db.models import Q
+
+
+def encode_cursor(row, direction: str = "next") -> str:
+    """Opaque cursor pointing at `row` on the (created_at, id) key."""
+    raw = msgspec.json.encode([row.created_at.isoformat(), row.id, direction])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int, str]:
+    """Raises ValueError for anything that is not a cursor from encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, pk, direction = msgspec.json.decode(raw)
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(pk), direction
+    except (ValueError, TypeError, msgspec.DecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def keyset_page(query, cursor: str | None, page_size: int):
+    """
+    Newest-first page of `query` ordered by (created_at, id), seeking from
+    `cursor` instead of using OFFSET, so deep pages cost the same as the first.
+
+    Returns (rows, next_cursor, prev_cursor); cursors are None at either end.
+    """
+    direction = "next"
+    if cursor:
+        created_at, pk, direction = decode_cursor(cursor)
+        if direction == "next":
+            query = query.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('-created_at', '-id')
+        else:
+            query = query.filter(created_at__gte=created_at).filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+    else:
+        query = query.order_by('-created_at', '-id')
+
+    rows = [row async for row in query[:page_size + 1]]
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if direction == "prev":
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    next_cursor = encode_cursor(rows[-1], "next") if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0], "prev") if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
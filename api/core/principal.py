@@ -0,0 +1,86 @@
+from django.conf import settings
+
+from core.cache import TieredCache, MISSING
+
+# Claims added to every token pair at login and carried over on refresh
+PRINCIPAL_CLAIMS = ("permissions", "login_type", "branch_id", "organization_id")
+
+# Short-lived cache of Branch rows for handlers that need more than the id
+# (title, operational date). Evicted by organization/signals.py on save/delete.
+branch_cache = TieredCache(
+    "principal_branch",
+    remote_ttl=settings.PRINCIPAL_BRANCH_CACHE_TTL,
+    local_ttl=settings.PRINCIPAL_BRANCH_CACHE_LOCAL_TTL,
+)
+
+
+class Principal:
+    """
+    The authenticated caller, built from JWT claims without touching the
+    database. Claims are fixed for the lifetime of the token, so a branch
+    reassignment takes effect on the next login or refresh.
+    """
+
+    __slots__ = ("user_id", "branch_id", "organization_id", "permissions", "login_type")
+
+    def __init__(self, user_id: int, branch_id: int | None = None, organization_id: int | None = None,
+                 permissions: frozenset[str] = frozenset(), login_type: str | None = None):
+        self.user_id = user_id
+        self.branch_id = branch_id
+        self.organization_id = organization_id
+        self.permissions = permissions
+        self.login_type = login_type
+
+    @property
+    def id(self):
+        return self.user_id
+
+    pk = id
+
+    def has_perm(self, permission: str) -> bool:
+        return permission in self.permissions
+
+    @classmethod
+    async def from_context(cls, context: dict) -> "Principal":
+        user_id = int(context["user_id"])
+        claims = context.get("auth_claims") or {}
+        if "organization_id" not in claims:
+            # Token issued before these claims existed
+            return await cls.from_database(user_id, claims)
+        return cls(
+            user_id=user_id,
+            branch_id=claims.get("branch_id"),
+            organization_id=claims.get("organization_id"),
+            permissions=frozenset(claims.get("permissions") or ()),
+            login_type=claims.get("login_type"),
+        )
+
+    @classmethod
+    async def from_database(cls, user_id: int, claims: dict | None = None) -> "Principal":
+        from organization.models import Organization, Branch
+
+        claims = claims or {}
+        branch = await Branch.objects.filter(owner_id=user_id).values('id', 'organization_id').afirst()
+        if branch:
+            organization_id = branch['organization_id']
+        else:
+            organization_id = await Organization.objects.filter(owner_id=user_id).values_list('id', flat=True).afirst()
+        return cls(
+            user_id=user_id,
+            branch_id=branch['id'] if branch else None,
+            organization_id=organization_id,
+            permissions=frozenset(claims.get("permissions") or ()),
+            login_type=claims.get("login_type"),
+        )
+
+    async def abranch(self):
+        """Full Branch row of the caller (None for organization admins)."""
+        from organization.models import Branch
+
+        if not self.branch_id:
+            return None
+        branch = await branch_cache.aget(self.branch_id)
+        if branch is MISSING:
+            branch = await Branch.objects.filter(pk=self.branch_id).afirst()
+            await branch_cache.aset(self.branch_id, branch)
+        return branch
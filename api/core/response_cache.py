@@ -0,0 +1,178 @@
+"""
+Response cache for read-mostly endpoints (organization info, branch and bus lists).
+
+`cached_response` stores the encoded JSON body of a successful response in a
+`TieredCache`, so a hit costs no queries, no serialization and no encoding.
+Entries are keyed by handler, organization, path parameters (and caller, for
+per-user endpoints) plus the current version of each tag the handler depends
+on. Tags are scoped to the organization: `invalidate_tags(org_id, "buses")`
+gives the tag a new version, which orphans every entry built from the old
+one; orphans simply expire.
+
+Tag versions are kept in the shared cache and remembered per process for
+RESPONSE_CACHE_TAG_LOCAL_TTL seconds, which bounds how long another worker
+may serve a response from before an invalidation.
+"""
+import functools
+import logging
+import threading
+import time
+
+import msgspec
+from django.conf import settings
+from django.db import transaction
+from django_bolt import JSON, Response
+
+from core.cache import TieredCache, LocalTTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+response_cache = TieredCache(
+    "response",
+    remote_ttl=settings.RESPONSE_CACHE_TTL,
+    local_ttl=settings.RESPONSE_CACHE_LOCAL_TTL,
+)
+
+_tag_versions = LocalTTLCache(maxsize=4096, ttl=settings.RESPONSE_CACHE_TAG_LOCAL_TTL)
+
+# Path parameters and other plain arguments that become part of the key;
+# injected dependencies (the caller, the tenant) are covered separately.
+_KEY_TYPES = (str, int, float, bool)
+
+
+class ResponseCacheStats:
+    """Per-endpoint hit and miss counters for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, endpoint: str, hit: bool):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = {endpoint: tuple(pair) for endpoint, pair in self._counts.items()}
+        endpoints = {
+            endpoint: {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4)}
+            for endpoint, (hits, misses) in sorted(counts.items())
+        }
+        hits = sum(hits for hits, _ in counts.values())
+        misses = sum(misses for _, misses in counts.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "endpoints": endpoints,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = ResponseCacheStats()
+
+
+def tag_key(organization_id, tag: str) -> str:
+    return f"response_tag:{organization_id}:{tag}"
+
+
+async def aget_tag_versions(organization_id, tags) -> list:
+    """Current version of each tag. A tag seen for the first time gets a fresh version."""
+    keys = [tag_key(organization_id, tag) for tag in tags]
+    versions = {key: _tag_versions.get(key) for key in keys}
+    missing = [key for key, version in versions.items() if version is MISSING]
+    if missing:
+        remote = response_cache.remote
+        try:
+            found = await remote.aget_many(missing)
+            for key in missing:
+                version = found.get(key)
+                if version is None:
+                    # Never reuse an old version number, even if the key was evicted
+                    version = time.time_ns()
+                    if not await remote.aadd(key, version, timeout=None):
+                        version = await remote.aget(key, version)
+                versions[key] = version
+                _tag_versions.set(key, version)
+        except Exception as e:
+            logger.warning(f"Reading response cache tags {missing} failed: {e}")
+            return None
+    return [versions[key] for key in keys]
+
+
+def bump_tags(organization_id, *tags: str):
+    """Give `tags` new versions now. Synchronous, for signal receivers."""
+    for tag in tags:
+        key = tag_key(organization_id, tag)
+        _tag_versions.delete(key)
+        try:
+            response_cache.remote.set(key, time.time_ns(), timeout=None)
+        except Exception as e:
+            logger.warning(f"Invalidating response cache tag {key} failed: {e}")
+
+
+def invalidate_tags(organization_id, *tags: str):
+    """Invalidate `tags` for an organization once the current transaction commits."""
+    if organization_id is None or not tags:
+        return
+    transaction.on_commit(lambda: bump_tags(organization_id, *tags))
+
+
+def _request_from(args, kwargs):
+    return kwargs["request"] if "request" in kwargs else args[0]
+
+
+def cached_response(*tags: str, per_user: bool = False, vary=None, ttl: int | None = None):
+    """
+    Cache a handler's 200 responses under tenant-scoped `tags`. Place it below
+    the route decorator:
+
+        @api.get("/bus/list/", auth=[jwt_auth], guards=[IsAuthenticated()])
+        @cached_response("buses")
+        async def list_buses(request): ...
+
+    `per_user` adds the caller's id to the key, for endpoints whose body depends
+    on who asks. `vary(request)` may return extra key material (e.g. today's
+    date). Responses carry `X-Cache: HIT` or `MISS`.
+    """
+    def decorator(handler):
+        endpoint = f"{handler.__module__}.{handler.__qualname__}"
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            request = _request_from(args, kwargs)
+            organization = request.state.get("organization")
+            versions = await aget_tag_versions(organization.id, tags) if organization else None
+            if versions is None:
+                return await handler(*args, **kwargs)
+
+            parts = [endpoint, organization.id, *versions]
+            if per_user:
+                parts.append(request.get("context", {}).get("user_id"))
+            if vary is not None:
+                parts.append(vary(request))
+            parts.extend(
+                f"{name}={value}" for name, value in sorted(kwargs.items())
+                if name != "request" and isinstance(value, _KEY_TYPES)
+            )
+            key = ":".join(str(part) for part in parts)
+
+            body = await response_cache.aget(key)
+            if body is not MISSING:
+                stats.record(endpoint, hit=True)
+                return Response(content=body, status_code=200, media_type="application/json", headers={"X-Cache": "HIT"})
+
+            stats.record(endpoint, hit=False)
+            result = await handler(*args, **kwargs)
+            if not isinstance(result, JSON) or result.status_code != 200:
+                return result
+            body = msgspec.json.encode(result.data)
+            await response_cache.aset(key, body, ttl=ttl)
+            return Response(content=body, status_code=200, media_type="application/json", headers={**(result.headers or {}), "X-Cache": "MISS"})
+
+        return wrapper
+    return decorator
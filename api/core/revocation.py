@@ -0,0 +1,77 @@
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_bolt.auth import DjangoCacheRevocation
+
+from core.cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def ttl_until(exp: int | float | None, default: int = 86400 * 30) -> int:
+    """Seconds until a token's `exp` claim, so revocations expire with the token."""
+    if not exp:
+        return default
+    return max(1, int(exp - time.time()))
+
+
+class RedisRevocation(DjangoCacheRevocation):
+    """
+    Revocation store on the configured (Redis) cache, shared by all workers.
+    Entries expire when the token itself would have expired.
+
+    Every authenticated request calls `is_revoked`, so each worker keeps:
+    - the JTIs it knows are revoked, and
+    - a short-lived cache of recent misses (`TOKEN_REVOCATION_MISS_TTL`),
+    which means a logout on another worker takes effect here within that window.
+
+    If the cache cannot be reached, unknown tokens count as revoked (fail
+    closed) unless TOKEN_REVOCATION_FAIL_OPEN is set.
+    """
+
+    def __init__(self, cache_alias: str = 'default', key_prefix: str = 'revoked:'):
+        super().__init__(cache_alias=cache_alias, key_prefix=key_prefix)
+        self._revoked = LocalTTLCache(maxsize=10000, ttl=settings.TOKEN_REVOCATION_LOCAL_TTL)
+        self._misses = LocalTTLCache(maxsize=100000, ttl=settings.TOKEN_REVOCATION_MISS_TTL)
+
+    async def is_revoked(self, jti: str) -> bool:
+        if self._revoked.get(jti, False):
+            return True
+        if self._misses.get(jti, False):
+            return False
+        try:
+            revoked = await self.cache.aget(f"{self.key_prefix}{jti}") is not None
+        except Exception as e:
+            fail_open = settings.TOKEN_REVOCATION_FAIL_OPEN
+            logger.warning(f"Revocation lookup failed for {jti}, treating it as {'valid' if fail_open else 'revoked'}: {e}")
+            return not fail_open
+        if revoked:
+            self._revoked.set(jti, True)
+        else:
+            self._misses.set(jti, True)
+        return revoked
+
+    async def revoke(self, jti: str, ttl: int | None = None) -> None:
+        await self.revoke_many({jti: ttl})
+
+    async def revoke_many(self, tokens: dict[str, int | None]) -> None:
+        """Revoke several JTIs (jti -> ttl in seconds) in one round trip."""
+        tokens = {jti: ttl or 86400 * 30 for jti, ttl in tokens.items()}
+        for jti, ttl in tokens.items():
+            self._misses.delete(jti)
+            self._revoked.set(jti, True, ttl=ttl)
+        await sync_to_async(self._write)(tokens)
+
+    def _write(self, tokens: dict[str, int]) -> None:
+        client_factory = getattr(self.cache, '_cache', None)
+        if not hasattr(client_factory, 'get_client'):
+            # Not a Redis backend: fall back to the generic cache API
+            for jti, ttl in tokens.items():
+                self.cache.set(f"{self.key_prefix}{jti}", 1, timeout=ttl)
+            return
+        pipeline = client_factory.get_client(write=True).pipeline(transaction=False)
+        for jti, ttl in tokens.items():
+            pipeline.set(self.cache.make_and_validate_key(f"{self.key_prefix}{jti}"), 1, ex=ttl)
+        pipeline.execute()
@@ -0,0 +1,60 @@
+import asyncio
+import itertools
+import random
+
+import httpx
+
+
+class LocalSMSGateway:
+    """
+    In-process stand-in for the SMS gateway, for tests, local development
+    (SMS_USE_LOCAL_GATEWAY) and `manage.py bench_sms`. Plug it into a client
+    with `transport()`; it answers like the real gateway and records what it
+    was asked to send.
+
+    `latency` (seconds) is simulated per request and `connect_latency` once per
+    transport, standing in for the TCP/TLS handshake of a new client.
+    `failure_rate` is the share of requests answered with a 503, and
+    `down=True` fails every request at the transport level, as an unreachable
+    gateway would.
+    """
+
+    def __init__(self, latency: float = 0.0, connect_latency: float = 0.0, failure_rate: float = 0.0,
+                 down: bool = False, seed: int | None = None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.failure_rate = failure_rate
+        self.down = down
+        self.sent = []
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down:
+            raise httpx.ConnectError("SMS gateway unreachable", request=request)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            return httpx.Response(503, json={"status": "error", "message": "Gateway busy"})
+
+        to_number = request.url.params.get("to")
+        message = request.url.params.get("message")
+        if not to_number or not message:
+            return httpx.Response(400, json={"status": "error", "message": "Missing 'to' or 'message'"})
+        self.sent.append((to_number, message))
+        return httpx.Response(200, json={"status": "success", "message_id": next(self._ids)})
+
+    def transport(self) -> httpx.MockTransport:
+        connected = False
+
+        async def handler(request):
+            nonlocal connected
+            if not connected:
+                connected = True
+                if self.connect_latency:
+                    await asyncio.sleep(self.connect_latency)
+            return await self.handle(request)
+
+        return httpx.MockTransport(handler)
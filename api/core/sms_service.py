@@ -1,29 +1,236 @@
+import asyncio
 import logging
-from typing import Any, Tuple
+import random
+import threading
+import time
+from typing import Any, Iterable, Tuple
 
 import httpx
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-SMS_GATEWAY_URL = "https://sms-gateway.mnv-dev.site/send_sms"
+SMS_GATEWAY_URL = settings.SMS_GATEWAY_URL
+
+# Worth retrying: the gateway is overloaded or briefly unavailable
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Error returned without calling the gateway while the circuit is open
+CIRCUIT_OPEN = "SMS gateway circuit open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling the gateway after `failure_threshold` consecutive failures.
+    After `reset_timeout` seconds one trial call is let through (half-open);
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"SMS gateway circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+def response_data(response: httpx.Response) -> Any:
+    """The gateway's JSON reply, or its raw text if it is not JSON."""
+    if not response.content:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+class SMSClient:
+    """
+    Long-lived SMS gateway client: one pooled `httpx.AsyncClient` (reused
+    connections, no handshake per message), at most `concurrency` requests in
+    flight, retries with exponential backoff and full jitter for transport
+    errors and retryable statuses, and a circuit breaker that fails fast while
+    the gateway is down.
+
+    The async client is bound to the event loop it was created on and is
+    recreated if used from another loop (e.g. a management command).
+    """
+
+    def __init__(
+        self,
+        url: str = SMS_GATEWAY_URL,
+        timeout: float = 10,
+        concurrency: int = 20,
+        max_connections: int = 20,
+        retries: int = 2,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+        breaker: CircuitBreaker | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+        self._client = None
+        self._loop = None
+        self._semaphore = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    def _delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def send(self, to_number: str, message_body: str) -> Tuple[bool, Any]:
+        """Send one SMS. Returns (success, data_or_error); never raises."""
+        client = self._ensure_client()
+        async with self._semaphore:
+            error = None
+            for attempt in range(self.retries + 1):
+                if not self.breaker.allow():
+                    return False, CIRCUIT_OPEN
+                try:
+                    response = await client.post(self.url, params={"to": to_number, "message": message_body})
+                except httpx.RequestError as e:
+                    error = str(e) or e.__class__.__name__
+                    self.breaker.record_failure()
+                else:
+                    if response.is_success:
+                        # Accepted: never resend, whatever the body looks like
+                        self.breaker.record_success()
+                        data = response_data(response)
+                        logger.info(f"SMS sent successfully to {to_number}: {data}")
+                        return True, data
+                    error = f"Gateway returned {response.status_code}"
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        # The gateway is up but rejected this message
+                        self.breaker.record_success()
+                        logger.error(f"Failed to send SMS to {to_number}: {error}; Gateway Response: {response.text}")
+                        return False, error
+                    self.breaker.record_failure()
+                if attempt < self.retries:
+                    await asyncio.sleep(self._delay(attempt))
+            logger.error(f"Failed to send SMS to {to_number} after {self.retries + 1} attempts: {error}")
+            return False, error
+
+    async def send_many(self, messages: Iterable[Tuple[str, str]]) -> list[Tuple[bool, Any]]:
+        """Send `(to_number, message_body)` pairs concurrently; results keep the input order."""
+        return await asyncio.gather(*(self.send(to_number, body) for to_number, body in messages))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+_sms_client = None
+_sync_client = None
+_sync_client_lock = threading.Lock()
+
+
+def build_sms_client(**overrides) -> SMSClient:
+    """SMSClient configured from settings; SMS_USE_LOCAL_GATEWAY routes it to LocalSMSGateway."""
+    options = {
+        "url": settings.SMS_GATEWAY_URL,
+        "timeout": settings.SMS_TIMEOUT,
+        "concurrency": settings.SMS_CONCURRENCY,
+        "max_connections": settings.SMS_CONCURRENCY,
+        "retries": settings.SMS_RETRIES,
+        "breaker": CircuitBreaker(settings.SMS_BREAKER_THRESHOLD, settings.SMS_BREAKER_RESET_TIMEOUT),
+    }
+    if settings.SMS_USE_LOCAL_GATEWAY:
+        from core.sms_gateway import LocalSMSGateway
+        options["transport"] = LocalSMSGateway().transport()
+    options.update(overrides)
+    return SMSClient(**options)
+
+
+def get_sms_client() -> SMSClient:
+    """The process-wide SMS client, created on first use."""
+    global _sms_client
+    if _sms_client is None:
+        _sms_client = build_sms_client()
+    return _sms_client
+
+
+async def aclose_sms_client():
+    """Close the process-wide client's connections (on worker shutdown)."""
+    if _sms_client is not None:
+        await _sms_client.aclose()
+
+
+def _get_sync_client() -> httpx.Client:
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(
+                timeout=settings.SMS_TIMEOUT,
+                limits=httpx.Limits(max_connections=settings.SMS_CONCURRENCY),
+            )
+        return _sync_client
 
 
 def send_sms(to_number: str, message_body: str, timeout: int = 10) -> Tuple[bool, Any]:
     """
-    Synchronous SMS send using `httpx.Client` as a drop-in replacement for `requests`.
+    Synchronous SMS send on a shared, pooled `httpx.Client`.
     Returns (success, data_or_error).
     """
     try:
-        with httpx.Client(timeout=timeout) as client:
-            # Keep using `params` to match the existing gateway behavior.
-            response = client.post(
-                SMS_GATEWAY_URL,
-                params={"to": to_number, "message": message_body},
-            )
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"SMS sent successfully to {to_number}: {data}")
-            return True, data
+        # Keep using `params` to match the existing gateway behavior.
+        response = _get_sync_client().post(
+            SMS_GATEWAY_URL,
+            params={"to": to_number, "message": message_body},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        data = response_data(response)
+        logger.info(f"SMS sent successfully to {to_number}: {data}")
+        return True, data
     except httpx.HTTPStatusError as e:
         logger.error(f"Failed to send SMS to {to_number}: {str(e)}")
         try:
@@ -39,28 +246,13 @@ def send_sms(to_number: str, message_body: str, timeout: int = 10) -> Tuple[bool
 
 async def async_send_sms(to_number: str, message_body: str, timeout: int = 10) -> Tuple[bool, Any]:
     """
-    Asynchronous SMS send using `httpx.AsyncClient`. Use this for concurrent/bulk sends
-    or when running inside async Django/ASGI code paths.
-    Returns (success, data_or_error).
+    Asynchronous SMS send through the shared `SMSClient` (pooled, retried,
+    circuit-broken). `timeout` is kept for compatibility; the client's
+    SMS_TIMEOUT applies. Returns (success, data_or_error).
     """
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                SMS_GATEWAY_URL,
-                params={"to": to_number, "message": message_body},
-            )
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"Async SMS sent successfully to {to_number}: {data}")
-            return True, data
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Failed to send async SMS to {to_number}: {str(e)}")
-        try:
-            if e.response is not None:
-                logger.error(f"Gateway Response: {e.response.text}")
-        except Exception:
-            pass
-        return False, str(e)
-    except httpx.RequestError as e:
-        logger.error(f"Failed to send async SMS to {to_number}: {str(e)}")
-        return False, str(e)
+    return await get_sms_client().send(to_number, message_body)
+
+
+async def async_send_many(messages: Iterable[Tuple[str, str]]) -> list[Tuple[bool, Any]]:
+    """Send `(to_number, message_body)` pairs concurrently through the shared client."""
+    return await get_sms_client().send_many(messages)
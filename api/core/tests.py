@@ -1,3 +1,326 @@
-from django.test import TestCase
+import asyncio
+import os
+import threading
 
-# Create your tests here.
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+import httpx
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, override_settings
+
+from core import response_cache
+from core.api import response_cache_metrics
+from core.events import EventBroker, encode_event
+from core.response_cache import cached_response, bump_tags
+from core.revocation import RedisRevocation
+from core.sms_gateway import LocalSMSGateway
+from core.sms_service import SMSClient, CircuitBreaker
+from core.utils import CROCKFORD_ALPHABET, SlugGenerator, _slug_generator, response
+
+
+class SMSClientTests(SimpleTestCase):
+    """SMSClient against the in-process gateway stand-in."""
+
+    def client_for(self, gateway, **options):
+        options.setdefault("backoff", 0)
+        return SMSClient(url="http://sms-gateway.local/send_sms", transport=gateway.transport(), **options)
+
+    def run_with(self, client, coroutine):
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    def test_send_many_delivers_every_message_in_order(self):
+        gateway = LocalSMSGateway()
+        client = self.client_for(gateway, concurrency=5)
+        messages = [(f"900000000{i}", f"Message {i}") for i in range(10)]
+
+        results = self.run_with(client, client.send_many(messages))
+
+        self.assertTrue(all(success for success, _ in results))
+        self.assertEqual(sorted(gateway.sent), sorted(messages))
+
+    def test_retries_transient_gateway_errors(self):
+        gateway = LocalSMSGateway(failure_rate=0.5, seed=3)
+        client = self.client_for(gateway, retries=10, breaker=CircuitBreaker(failure_threshold=100))
+
+        results = self.run_with(client, client.send_many([("9000000000", f"Message {i}") for i in range(20)]))
+
+        self.assertTrue(all(success for success, _ in results))
+        self.assertGreater(gateway.requests, 20)
+
+    def test_accepted_message_with_non_json_body_is_not_resent(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, text="OK")
+
+        client = SMSClient(url="http://sms-gateway.local/send_sms", transport=httpx.MockTransport(handler), retries=3, backoff=0)
+
+        success, data = self.run_with(client, client.send("9000000000", "Hello"))
+
+        self.assertTrue(success)
+        self.assertEqual(data, "OK")
+        self.assertEqual(len(requests), 1)
+        self.assertFalse(client.breaker.is_open)
+
+    def test_rejected_message_is_not_retried(self):
+        gateway = LocalSMSGateway()
+        client = self.client_for(gateway, retries=3)
+
+        success, _ = self.run_with(client, client.send("9000000000", ""))
+
+        self.assertFalse(success)
+        self.assertEqual(gateway.requests, 1)
+        self.assertFalse(client.breaker.is_open)
+
+    def test_circuit_opens_and_fails_fast_while_gateway_is_down(self):
+        gateway = LocalSMSGateway(down=True)
+        client = self.client_for(gateway, retries=0, concurrency=1, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+        results = self.run_with(client, client.send_many([("9000000000", f"Message {i}") for i in range(10)]))
+
+        self.assertFalse(any(success for success, _ in results))
+        self.assertTrue(client.breaker.is_open)
+        self.assertEqual(gateway.requests, 3)
+
+    def test_half_open_circuit_closes_after_a_successful_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+
+        self.assertFalse(breaker.is_open)
+
+
+def slug_millisecond(slug: str) -> int:
+    value = 0
+    for char in slug:
+        value = value * 32 + CROCKFORD_ALPHABET.index(char)
+    return value >> SlugGenerator.RANDOM_BITS
+
+
+class SlugGeneratorTests(SimpleTestCase):
+
+    NOW_NS = 1_792_000_000_123_456_789
+
+    def frozen_clock(self, ns=NOW_NS):
+        return mock.patch("core.utils.time.time_ns", return_value=ns)
+
+    def test_slugs_are_fixed_length_crockford(self):
+        slug = SlugGenerator()()
+        self.assertEqual(len(slug), SlugGenerator.LENGTH)
+        self.assertTrue(all(char in CROCKFORD_ALPHABET for char in slug))
+
+    def test_slugs_increase_within_one_millisecond(self):
+        generate = SlugGenerator()
+        with self.frozen_clock():
+            slugs = [generate() for _ in range(1000)]
+
+        self.assertEqual(slugs, sorted(slugs))
+        self.assertEqual(len(set(slugs)), len(slugs))
+        self.assertEqual({slug_millisecond(slug) for slug in slugs}, {self.NOW_NS // 1_000_000})
+
+    def test_exhausted_random_part_carries_into_the_next_millisecond(self):
+        generate = SlugGenerator()
+        with self.frozen_clock():
+            first = generate()
+            generate._last_random = (1 << SlugGenerator.RANDOM_BITS) - 1
+            second = generate()
+
+        self.assertLess(first, second)
+        self.assertEqual(slug_millisecond(second), self.NOW_NS // 1_000_000 + 1)
+
+    def test_clock_going_back_keeps_order(self):
+        generate = SlugGenerator()
+        with self.frozen_clock():
+            first = generate()
+        with self.frozen_clock(self.NOW_NS - 5_000_000):
+            second = generate()
+
+        self.assertLess(first, second)
+
+    @skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_forked_child_is_reseeded(self):
+        read_end, write_end = os.pipe()
+        with self.frozen_clock():
+            _slug_generator()
+            pid = os.fork()
+            if pid == 0:
+                # Same millisecond and, without the reseed, the same state as the parent
+                os.write(write_end, _slug_generator().encode())
+                os._exit(0)
+            parent_slug = _slug_generator()
+        os.waitpid(pid, 0)
+        os.close(write_end)
+        with os.fdopen(read_end) as pipe:
+            child_slug = pipe.read()
+
+        self.assertEqual(len(child_slug), SlugGenerator.LENGTH)
+        self.assertNotEqual(child_slug, parent_slug)
+
+
+class UnreachableCache(LocMemCache):
+    """A cache backend whose reads fail, as Redis does when it is down."""
+
+    async def aget(self, key, default=None, version=None):
+        raise ConnectionError("Cache unreachable")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "core.tests.UnreachableCache", "LOCATION": "revocation-tests"}})
+class RevocationTests(SimpleTestCase):
+
+    def test_unreachable_store_fails_closed(self):
+        store = RedisRevocation()
+
+        self.assertTrue(asyncio.run(store.is_revoked("jti-1")))
+
+    @override_settings(TOKEN_REVOCATION_FAIL_OPEN=True)
+    def test_fail_open_is_opt_in(self):
+        store = RedisRevocation()
+
+        self.assertFalse(asyncio.run(store.is_revoked("jti-1")))
+
+    @override_settings(TOKEN_REVOCATION_FAIL_OPEN=True)
+    def test_locally_known_revocations_survive_an_outage(self):
+        store = RedisRevocation()
+        store._revoked.set("jti-1", True)
+
+        self.assertTrue(asyncio.run(store.is_revoked("jti-1")))
+
+
+class FakeRequest(dict):
+    def __init__(self, organization_id, user_id=None):
+        super().__init__(context={"user_id": user_id})
+        self.state = {"organization": SimpleNamespace(id=organization_id)}
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "response-cache-tests"}})
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        response_cache.response_cache.remote.clear()
+        response_cache.response_cache.local.clear()
+        response_cache._tag_versions.clear()
+        response_cache.stats.reset()
+        self.calls = 0
+
+    def handler(self, *tags, status=200, **options):
+        @cached_response(*tags, **options)
+        async def list_things(request, slug: str = "all"):
+            self.calls += 1
+            return response(status=status, message="Things", data=[{"slug": slug, "call": self.calls}])
+        return list_things
+
+    def test_second_call_is_served_from_cache(self):
+        handler = self.handler("things")
+
+        first = asyncio.run(handler(FakeRequest(1)))
+        second = asyncio.run(handler(FakeRequest(1)))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(first.content, second.content)
+
+    def test_bumping_a_tag_invalidates_only_that_organization(self):
+        handler = self.handler("things")
+        asyncio.run(handler(FakeRequest(1)))
+        asyncio.run(handler(FakeRequest(2)))
+
+        bump_tags(1, "things")
+        asyncio.run(handler(FakeRequest(1)))
+        asyncio.run(handler(FakeRequest(2)))
+
+        self.assertEqual(self.calls, 3)
+
+    def test_key_includes_path_parameters_and_user(self):
+        handler = self.handler("things", per_user=True)
+
+        asyncio.run(handler(FakeRequest(1, user_id=1), slug="a"))
+        asyncio.run(handler(FakeRequest(1, user_id=1), slug="b"))
+        asyncio.run(handler(FakeRequest(1, user_id=2), slug="a"))
+        asyncio.run(handler(FakeRequest(1, user_id=1), slug="a"))
+
+        self.assertEqual(self.calls, 3)
+
+    def test_errors_are_not_cached(self):
+        handler = self.handler("things", status=404)
+
+        asyncio.run(handler(FakeRequest(1)))
+        asyncio.run(handler(FakeRequest(1)))
+
+        self.assertEqual(self.calls, 2)
+
+    def test_stats_report_hit_rate(self):
+        handler = self.handler("things")
+        for _ in range(4):
+            asyncio.run(handler(FakeRequest(1)))
+
+        snapshot = response_cache.stats.snapshot()
+
+        self.assertEqual((snapshot["hits"], snapshot["misses"]), (3, 1))
+        self.assertEqual(snapshot["hit_rate"], 0.75)
+
+    def test_metrics_need_their_own_key(self):
+        with override_settings(METRICS_API_KEY=""):
+            self.assertEqual(asyncio.run(response_cache_metrics()).status_code, 404)
+        with override_settings(METRICS_API_KEY="monitoring"):
+            self.assertEqual(asyncio.run(response_cache_metrics()).status_code, 200)
+
+
+class EventBrokerTests(SimpleTestCase):
+
+    def test_events_reach_only_subscribers_of_their_channels(self):
+        broker = EventBroker(queue_size=10)
+
+        async def run():
+            branch = broker.subscribe(["org:1:branch:1"])
+            other = broker.subscribe(["org:1:branch:2"])
+            broker.publish(["org:1", "org:1:branch:1"], "shipment.created", {"tracking_id": "A-1"})
+            return await branch.next(timeout=1), await other.next(timeout=0.01)
+
+        received, missed = asyncio.run(run())
+
+        self.assertEqual(received, encode_event("shipment.created", {"tracking_id": "A-1"}))
+        self.assertIsNone(missed)
+
+    def test_publish_from_another_thread(self):
+        broker = EventBroker(queue_size=10)
+
+        async def run():
+            subscription = broker.subscribe(["org:1"])
+            thread = threading.Thread(target=broker.publish, args=(["org:1"], "message.created", {"id": 1}))
+            thread.start()
+            frame = await subscription.next(timeout=1)
+            thread.join()
+            return frame
+
+        self.assertEqual(asyncio.run(run()), encode_event("message.created", {"id": 1}))
+
+    def test_slow_subscriber_is_told_to_resync(self):
+        broker = EventBroker(queue_size=2)
+
+        async def run():
+            subscription = broker.subscribe(["org:1"])
+            for i in range(5):
+                broker.publish(["org:1"], "shipment.status_changed", {"i": i})
+            await asyncio.sleep(0)
+            frames = []
+            while (frame := await subscription.next(timeout=0.01)) is not None:
+                frames.append(frame)
+            return frames
+
+        frames = asyncio.run(run())
+
+        self.assertIn(encode_event("resync", {}), frames)
+        self.assertLessEqual(len(frames), 2)
@@ -1,22 +1,64 @@
+import hashlib
+import os
+import random
+import threading
 import time
-import uuid
-from django_bolt import JSON
-from django_bolt.auth import JWTAuthentication, InMemoryRevocation, DjangoCacheRevocation
-from django.contrib.auth.models import User
+from django_bolt import JSON, Response
+from django_bolt.auth import JWTAuthentication
 from django_bolt.exceptions import HTTPException
+from core.principal import Principal
+from core.revocation import RedisRevocation
+
+# Crockford base32: no I, L, O or U, so codes are easy to read out and type
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+class SlugGenerator:
+    """
+    ULID-like slugs: 20 Crockford base32 characters holding a 48-bit
+    millisecond timestamp and 50 random bits, so slugs sort in creation order.
+    Randomness comes from a PRNG seeded once per process (reseeded after fork)
+    rather than a urandom call per slug. Within one millisecond the random part
+    is incremented, which keeps a process's slugs strictly increasing.
+    """
+
+    RANDOM_BITS = 50
+    LENGTH = 20
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reseed()
+
+    def reseed(self):
+        self._random = random.Random(int.from_bytes(os.urandom(16), "big"))
+        self._last_ms = -1
+        self._last_random = 0
+
+    def __call__(self) -> str:
+        ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if ms > self._last_ms:
+                entropy = self._random.getrandbits(self.RANDOM_BITS)
+            else:
+                ms = self._last_ms
+                entropy = self._last_random + 1
+                if entropy >> self.RANDOM_BITS:
+                    # Random part exhausted within this millisecond: borrow the next one
+                    ms += 1
+                    entropy = self._random.getrandbits(self.RANDOM_BITS)
+            self._last_ms, self._last_random = ms, entropy
+        value = (ms << self.RANDOM_BITS) | entropy
+        return "".join(CROCKFORD_ALPHABET[(value >> shift) & 31] for shift in range(5 * (self.LENGTH - 1), -1, -5))
+
+_slug_generator = SlugGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_slug_generator.reseed)
 
 def generate_unique_hash():
     """
-    Generates a more robust unique slug using a larger portion of UUID and timestamp.
+    Generates a unique, time-ordered slug (see SlugGenerator). Slugs created
+    before this format (32-char hex + "_" + timestamp) remain valid.
     """
-    # Use a larger part of UUID (32 characters) and append a timestamp for uniqueness
-    random_hash = str(uuid.uuid4().hex)[:16]  # Using 16 characters from the UUID
-    timestamp = str(int(time.time() * 1000))  # Millisecond precision timestamp
-    
-    # Combine UUID and timestamp for a more robust unique hash
-    unique_hash = f"{random_hash}_{timestamp}"
-    
-    return unique_hash
+    return _slug_generator()
 
 def response(status: int, message: str, data=None, error: str | None = None, headers=None) -> dict:
     """
@@ -38,14 +80,28 @@ def response(status: int, message: str, data=None, error: str | None = None, hea
         headers=headers
     )
     
+def make_etag(*parts) -> str:
+    """Weak ETag from the values that determine a response body."""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def is_not_modified(request, etag: str) -> bool:
+    """True when the request's If-None-Match already names `etag`."""
+    if_none_match = request.headers.get("if-none-match") or ""
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+def not_modified(etag: str, headers: dict | None = None):
+    """Empty 304 response for a conditional GET."""
+    return Response(content=b"", status_code=304, headers={**(headers or {}), "ETag": etag}, media_type="application/octet-stream")
+    
 async def get_current_user(request):
-    """Dependency that extracts the current user."""
-    user_id = request.get("context", {}).get("user_id")
-    if not user_id:
+    """Dependency that extracts the current user as a claims-based Principal (no query)."""
+    context = request.get("context", {})
+    if not context.get("user_id"):
         raise HTTPException(status_code=401, detail="Not authenticated")        
-    return await User.objects.prefetch_related('branch','organization').aget(id=user_id)
+    return await Principal.from_context(context)
 
     
-# Revocation store for blacklisting tokens (use DjangoCacheRevocation or DjangoORMRevocation for production)
-store=InMemoryRevocation()
+# Revocation store for blacklisting tokens, shared by all workers through the configured cache
+store=RedisRevocation()
 jwt_auth = JWTAuthentication(revocation_store=store, require_jti=True)
\ No newline at end of file
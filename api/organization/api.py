@@ -1,15 +1,20 @@
 from django_bolt import BoltAPI, Depends
 from core.utils import response, get_current_user
 from organization.middleware import OrganizationMiddleware
+from organization.tenant import TenantScope, require_tenant
+from organization.cache import aget_buses
+from core.response_cache import cached_response
 from organization.serializers import OrganizationSerializer, OrganizationCreateSerializer, BranchSerializer, BranchCreateSerializer, BranchSerializerForOrganization, BusSerializer, BusCreateSerializer
 from django.conf import settings
 from django_bolt.auth import APIKeyAuthentication, IsAuthenticated, HasPermission
 from django_bolt.middleware import skip_middleware
 from django.contrib.auth.models import User
-from organization.models import Organization, Branch, Bus
+from organization.models import Organization, Branch, Bus, weekday_mask
+from django.db.models import F
 from django.contrib.auth.models import Permission
 from core.utils import jwt_auth, store
 from asgiref.sync import sync_to_async
+from datetime import date
 
 
 open_api = BoltAPI(django_middleware=False)
@@ -57,8 +62,8 @@ api = BoltAPI(django_middleware=False, middleware=[OrganizationMiddleware], pref
 api.mount("/api/open", open_api)
 
 @api.get("/organization/info/")
-async def get_organization_info(request):        
-    organization = request.state.get("organization")
+@cached_response("organization", "branches")
+async def get_organization_info(request, organization=Depends(require_tenant(TenantScope.BRANCHES))):
     organization_serialized = OrganizationSerializer.fields("minimal").from_model(organization)
     return response(    
         status=200,
@@ -102,6 +107,7 @@ async def add_branch(request, credentials: BranchCreateSerializer):
     )
     
 @api.get("/branch/list/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_organization_admin")])
+@cached_response("branches")
 async def list_branches(request):        
     organization = request.state.get("organization")            
     branches = []
@@ -136,10 +142,11 @@ async def delete_branch(request, branch_slug: str):
 
 
 @api.get('/branch/get_other_braches/', auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
+@cached_response("branches", per_user=True)
 async def get_other_branches(request, user=Depends(get_current_user)):
     organization = request.state.get("organization")    
     branches = []
-    async for branch in Branch.objects.select_related('owner').filter(organization=organization).exclude(owner=user):
+    async for branch in Branch.objects.select_related('owner').filter(organization=organization).exclude(owner_id=user.id):
         branch_serialized = BranchSerializerForOrganization.from_model(branch)
         branches.append(branch_serialized)
     return response(    
@@ -149,8 +156,9 @@ async def get_other_branches(request, user=Depends(get_current_user)):
     )
 
 @api.get("/branch/me/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
+@cached_response("branches", per_user=True)
 async def get_my_branch(request, user=Depends(get_current_user)):
-    branch = await Branch.objects.select_related('owner').filter(owner=user).afirst()
+    branch = await Branch.objects.select_related('owner').filter(owner_id=user.id).afirst()
     if not branch:
         return response(status=404, message="Branch not found")
     branch_serialized = BranchSerializerForOrganization.from_model(branch)
@@ -166,7 +174,7 @@ async def branch_day_end(request, user=Depends(get_current_user)):
     from datetime import timedelta
     
     # Get the branch of the current user
-    branch = await Branch.objects.select_related('owner','organization').filter(owner=user).afirst()
+    branch = await Branch.objects.select_related('owner','organization').filter(owner_id=user.id).afirst()
     if not branch:
         return response(status=404, message="Branch not found for this user")
     
@@ -237,6 +245,7 @@ async def add_bus(request, credentials: BusCreateSerializer):
     )
 
 @api.get("/bus/list/", auth=[jwt_auth], guards=[IsAuthenticated()])
+@cached_response("buses")
 async def list_buses(request):
     """
     List all buses in the organization.
@@ -250,10 +259,7 @@ async def list_buses(request):
             error="Organization context missing"
         )
     
-    buses = []
-    async for bus in Bus.objects.filter(organization=organization):
-        bus_serialized = BusSerializer.fields("list").from_model(bus)
-        buses.append(bus_serialized)
+    buses = [BusSerializer.fields("list").from_model(bus) for bus in await aget_buses(organization)]
     return response(
         status=200,
         message="Buses retrieved successfully",
@@ -279,7 +285,15 @@ async def delete_bus(request, bus_slug: str):
             data=None
         )
 
+async def buses_available_on(organization, weekday: int) -> list:
+    """Buses whose preferred days include `weekday` (1=Monday, 7=Sunday), filtered by the database."""
+    query = Bus.objects.filter(organization=organization).alias(
+        runs_today=F('weekday_mask').bitand(weekday_mask([weekday]))
+    ).filter(runs_today__gt=0).order_by('bus_number')
+    return [BusSerializer.fields("list").from_model(bus) async for bus in query]
+
 @api.get("/bus/available/", auth=[jwt_auth], guards=[IsAuthenticated()])
+@cached_response("buses", vary=lambda request: date.today().isoweekday())
 async def get_available_buses(request):
     """
     Returns buses available today based on their preferred days.
@@ -298,15 +312,42 @@ async def get_available_buses(request):
     # Get current day of week (Monday=0, Sunday=6 in Python, so we add 1 to match our 1-7 system)
     current_day = datetime.now().weekday() + 1  # Monday=1, Sunday=7
     
-    # Get buses that have today in their preferred_days
-    available_buses = []
-    async for bus in Bus.objects.filter(organization=organization):
-        if current_day in bus.preferred_days:
-            bus_serialized = BusSerializer.fields("list").from_model(bus)
-            available_buses.append(bus_serialized)
+    return response(
+        status=200,
+        message="Available buses retrieved successfully",
+        data=await buses_available_on(organization, current_day)
+    )
+
+@api.get("/bus/available/{day}/", auth=[jwt_auth], guards=[IsAuthenticated()])
+@cached_response("buses")
+async def get_buses_for_day(request, day: str):
+    """
+    Returns buses running on the given date (YYYY-MM-DD), so the booking
+    screen can resolve availability for the shipment's `day`.
+    """
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    
+    try:
+        requested_day = date.fromisoformat(day)
+    except ValueError:
+        return response(
+            status=400,
+            message="Invalid date",
+            error="Day must be an ISO date (YYYY-MM-DD)"
+        )
     
     return response(
         status=200,
         message="Available buses retrieved successfully",
-        data=available_buses
+        data={
+            "day": requested_day.isoformat(),
+            "weekday": requested_day.isoweekday(),
+            "buses": await buses_available_on(organization, requested_day.isoweekday())
+        }
     )
\ No newline at end of file
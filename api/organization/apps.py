@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class OrganizationConfig(AppConfig):
     name = 'organization'
+
+    def ready(self):
+        from organization import signals  # noqa: F401
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from core.cache import TieredCache, MISSING
+from organization.models import Organization, Branch, Bus
+
+# Resolved tenants keyed by subdomain. Unknown subdomains are cached as None
+# (for a shorter time) so a bad Host header cannot hammer the database.
+tenant_cache = TieredCache(
+    "tenant",
+    remote_ttl=settings.TENANT_CACHE_TTL,
+    local_ttl=settings.TENANT_CACHE_LOCAL_TTL,
+)
+
+# Related tenant data keyed by "<organization_id>:owner" / ":branches" / ":buses",
+# only loaded for routes that ask for it (see organization/tenant.py).
+tenant_related_cache = TieredCache(
+    "tenant_related",
+    remote_ttl=settings.TENANT_CACHE_TTL,
+    local_ttl=settings.TENANT_CACHE_LOCAL_TTL,
+)
+
+
+# The only user columns tenant routes read; cached users never carry the
+# password hash or other credentials
+OWNER_FIELDS = ('id', 'username', 'email')
+
+
+async def fetch_organization(subdomain: str) -> Organization | None:
+    try:
+        return await Organization.objects.aget(subdomain=subdomain)
+    except Organization.DoesNotExist:
+        return None
+
+
+async def fetch_owner(organization: Organization) -> User | None:
+    if not organization.owner_id:
+        return None
+    return await User.objects.only(*OWNER_FIELDS).filter(pk=organization.owner_id).afirst()
+
+
+async def fetch_branches(organization: Organization) -> list[Branch]:
+    branches = Branch.objects.select_related('owner').only(
+        *(field.name for field in Branch._meta.concrete_fields),
+        *(f'owner__{name}' for name in OWNER_FIELDS),
+    )
+    return [branch async for branch in branches.filter(organization_id=organization.id)]
+
+
+async def fetch_buses(organization: Organization) -> list[Bus]:
+    return [bus async for bus in Bus.objects.filter(organization_id=organization.id)]
+
+
+async def aget_organization(subdomain: str | None) -> Organization | None:
+    """
+    Resolve the organization row for a subdomain, going to the database only on
+    a cache miss. Related rows are not loaded here.
+    """
+    if not subdomain:
+        return None
+
+    organization = await tenant_cache.aget(subdomain)
+    if organization is not MISSING:
+        return organization
+
+    organization = await fetch_organization(subdomain)
+    if organization is None:
+        await tenant_cache.aset(subdomain, None, ttl=settings.TENANT_CACHE_NEGATIVE_TTL)
+    else:
+        await tenant_cache.aset(subdomain, organization)
+    return organization
+
+
+async def aget_owner(organization: Organization) -> User | None:
+    key = f"{organization.id}:owner"
+    owner = await tenant_related_cache.aget(key)
+    if owner is MISSING:
+        owner = await fetch_owner(organization)
+        await tenant_related_cache.aset(key, owner)
+    return owner
+
+
+async def aget_branches(organization: Organization) -> list[Branch]:
+    key = f"{organization.id}:branches"
+    branches = await tenant_related_cache.aget(key)
+    if branches is MISSING:
+        branches = await fetch_branches(organization)
+        await tenant_related_cache.aset(key, branches)
+    return branches
+
+
+async def aget_buses(organization: Organization) -> list[Bus]:
+    key = f"{organization.id}:buses"
+    buses = await tenant_related_cache.aget(key)
+    if buses is MISSING:
+        buses = await fetch_buses(organization)
+        await tenant_related_cache.aset(key, buses)
+    return buses
+
+
+def invalidate_organization(*subdomains: str):
+    for subdomain in subdomains:
+        if subdomain:
+            tenant_cache.delete(subdomain)
+
+
+def invalidate_owner(*organization_ids: int):
+    for organization_id in organization_ids:
+        tenant_related_cache.delete(f"{organization_id}:owner")
+
+
+def invalidate_branches(*organization_ids: int):
+    for organization_id in organization_ids:
+        tenant_related_cache.delete(f"{organization_id}:branches")
+
+
+def invalidate_buses(*organization_ids: int):
+    for organization_id in organization_ids:
+        tenant_related_cache.delete(f"{organization_id}:buses")
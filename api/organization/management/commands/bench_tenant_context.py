@@ -0,0 +1,96 @@
+import inspect
+import time
+from importlib import import_module
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from organization.cache import fetch_organization, fetch_owner, fetch_branches
+from organization.middleware import OrganizationMiddleware
+from organization.models import Organization
+from organization.tenant import TenantScope, require_tenant
+
+# APIs mounted behind OrganizationMiddleware
+TENANT_APIS = ('organization.api', 'shipment.api', 'analytics.api', 'Messaging.api')
+
+
+def route_scopes():
+    """(route, scope) for every tenant route, read from the scope its handler declares with require_tenant."""
+    dependencies = {require_tenant(scope): scope for scope in TenantScope}
+    for module in TENANT_APIS:
+        for method, path, handler_id, handler in import_module(module).api._routes:
+            skipped = getattr(handler, '__bolt_skip_middleware__', set())
+            if skipped & {'*', OrganizationMiddleware, OrganizationMiddleware.__name__}:
+                continue
+            declared = [
+                dependencies[parameter.default.dependency]
+                for parameter in inspect.signature(handler).parameters.values()
+                if getattr(parameter.default, 'dependency', None) in dependencies
+            ]
+            yield f"{method:<6} {path}", max(declared, default=TenantScope.ID)
+
+
+def load_eager(subdomain):
+    """What OrganizationMiddleware used to load for every request."""
+    organization = Organization.objects.select_related("owner").prefetch_related('branches__owner').get(subdomain=subdomain)
+    branches = list(organization.branches.all())
+    owners = {branch.owner_id for branch in branches if branch.owner_id}
+    # organization + owner come back as one joined row
+    return 1 + len(branches) + len(owners)
+
+
+async def load_scoped(subdomain, scope):
+    """What a route declaring `scope` loads on a cold tenant cache."""
+    organization = await fetch_organization(subdomain)
+    rows = 1
+    if scope >= TenantScope.OWNER:
+        rows += 1 if await fetch_owner(organization) else 0
+    if scope >= TenantScope.BRANCHES:
+        # branch owners are joined into the branch rows
+        rows += len(await fetch_branches(organization))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare tenant queries and rows fetched per route: eager branch prefetch vs. the scope each route declares. "
+        "Times cover tenant loading on a cold cache only, not the handlers, so they estimate the middleware's share."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('subdomain', help="Subdomain of the organization to measure")
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def measure(self, load, iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            rows = load()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            load()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+        return len(ctx.captured_queries), rows, elapsed_ms
+
+    def handle(self, *args, **options):
+        subdomain = options['subdomain']
+        iterations = options['iterations']
+        if not Organization.objects.filter(subdomain=subdomain).exists():
+            raise CommandError(f"Organization '{subdomain}' not found")
+
+        before = self.measure(lambda: load_eager(subdomain), iterations)
+        scoped = {
+            scope: self.measure(lambda: async_to_sync(load_scoped)(subdomain, scope), iterations)
+            for scope in TenantScope
+        }
+
+        self.stdout.write("Tenant loading per route on a cold cache (estimate; handler work not included)")
+        self.stdout.write(f"{'route':<50} {'scope':<9} {'queries':>15} {'rows':>15} {'ms':>17}")
+        for route, scope in route_scopes():
+            after = scoped[scope]
+            self.stdout.write(
+                f"{route:<50} {scope.name:<9} "
+                f"{before[0]:>6} -> {after[0]:<6} "
+                f"{before[1]:>6} -> {after[1]:<6} "
+                f"{before[2]:>7.2f} -> {after[2]:<7.2f}"
+            )
@@ -1,4 +1,5 @@
-from organization.models import Organization
+from organization.cache import aget_organization
+from organization.tenant import LazyTenant
 from django.http import JsonResponse
 from django_bolt.middleware import BaseMiddleware
 from django_bolt.middleware_response import MiddlewareResponse
@@ -39,15 +40,13 @@ class OrganizationMiddleware(BaseMiddleware):
         host = host.split(':')[0]
         # Extract the leftmost subdomain (before the first dot)
         subdomain = host.split('.')[0] if host.count('.') >= 2 else None                        
-        organization = None
-        try:
-            organization = await Organization.objects.select_related("owner").prefetch_related('branches__owner').aget(subdomain=subdomain)
-            request.state['organization'] = organization
-        except Organization.DoesNotExist:            
+        organization = await aget_organization(subdomain)
+        request.state['organization'] = organization
+        request.state['tenant'] = LazyTenant(organization) if organization else None
+        if organization is None:
             # Allow admin routes to proceed even if organization is not found
             if request.path.startswith("/admin"):
                 return await self.get_response(request)
-            request.state['organization'] = None
             response = MiddlewareResponse(status_code=404, headers={"Content-Type": "application/json"}, body=b'{"status": "error", "message": "Organization not found"}')
             return response        
         response = await self.get_response(request)                                
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class ConcurrentAddIndex(AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on PostgreSQL, so writes are not locked out; a plain AddIndex elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('organization', '0008_branch_current_operational_date_and_more'),
+    ]
+
+    operations = [
+        ConcurrentAddIndex(
+            model_name='branch',
+            index=models.Index(fields=['organization', 'slug'], name='branch_org_slug_idx'),
+        ),
+        ConcurrentAddIndex(
+            model_name='bus',
+            index=models.Index(fields=['organization', 'slug'], name='bus_org_slug_idx'),
+        ),
+    ]
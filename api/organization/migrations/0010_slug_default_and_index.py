@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:00
+
+import core.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0009_branch_bus_slug_indexes'),
+    ]
+
+    # Existing slugs are kept as they are: branch and organization owner
+    # usernames are their slugs, and old and new formats resolve through the
+    # same index.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='branch',
+            name='branch_org_slug_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='bus',
+            name='bus_org_slug_idx',
+        ),
+        migrations.AlterField(
+            model_name='organization',
+            name='slug',
+            field=models.CharField(db_index=True, default=core.utils.generate_unique_hash, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='branch',
+            name='slug',
+            field=models.CharField(db_index=True, default=core.utils.generate_unique_hash, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='bus',
+            name='slug',
+            field=models.CharField(db_index=True, default=core.utils.generate_unique_hash, max_length=32),
+        ),
+    ]
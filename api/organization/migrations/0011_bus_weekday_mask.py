@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+def fill_weekday_mask(apps, schema_editor):
+    Bus = apps.get_model('organization', 'Bus')
+    buses = list(Bus.objects.only('id', 'preferred_days'))
+    for bus in buses:
+        bus.weekday_mask = sum(1 << (int(day) - 1) for day in set(bus.preferred_days or []) if 1 <= int(day) <= 7)
+    Bus.objects.bulk_update(buses, ['weekday_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0010_slug_default_and_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bus',
+            name='weekday_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_weekday_mask, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from core.models import BaseModel
+from core.utils import generate_unique_hash
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password, check_password
@@ -11,7 +12,7 @@ class Organization(BaseModel):
     subdomain = models.CharField(max_length=100, unique=True)
     description = models.TextField(null=True, blank=True)
     metadata = models.JSONField(null=True, blank=True)    
-    slug = models.CharField(max_length=32)
+    slug = models.CharField(max_length=32, default=generate_unique_hash, db_index=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='organization')
     
     class Meta:
@@ -39,16 +40,64 @@ class Branch(BaseModel):
     def __str__(self):
         return f"{self.title} - {self.organization.title}"
 
+def weekday_mask(days) -> int:
+    """Bitmask of weekdays (1=Monday ... 7=Sunday): bit 0 is Monday."""
+    mask = 0
+    for day in days or ():
+        if 1 <= int(day) <= 7:
+            mask |= 1 << (int(day) - 1)
+    return mask
+
+class BusQuerySet(models.QuerySet):
+    """
+    Keeps `weekday_mask` in step with `preferred_days` on the writes that skip
+    `Bus.save()`: bulk_create, bulk_update and update (and their async
+    variants). Raw SQL that changes preferred_days must set the mask too.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for bus in objs:
+            bus.weekday_mask = weekday_mask(bus.preferred_days)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'preferred_days' in fields:
+            for bus in objs:
+                bus.weekday_mask = weekday_mask(bus.preferred_days)
+            if 'weekday_mask' not in fields:
+                fields.append('weekday_mask')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if 'preferred_days' in kwargs and 'weekday_mask' not in kwargs:
+            days = kwargs['preferred_days']
+            if not isinstance(days, (list, tuple)):
+                raise ValueError("Updating preferred_days with an expression needs an explicit weekday_mask")
+            kwargs['weekday_mask'] = weekday_mask(days)
+        return super().update(**kwargs)
+
 class Bus(BaseModel):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='buses')
     bus_number = models.CharField(max_length=50)
     preferred_days = models.JSONField(default=list, help_text="List of preferred days (1=Monday, 7=Sunday)")
+    # preferred_days as a bitmask the database can filter on; kept in sync by
+    # save() and by BusQuerySet's bulk writes
+    weekday_mask = models.PositiveSmallIntegerField(default=0, editable=False)
     description = models.TextField(null=True, blank=True)
     metadata = models.JSONField(null=True, blank=True)
+
+    objects = BusQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural = "Buses"
         unique_together = [['organization', 'bus_number']]
         
+    def save(self, *args, **kwargs):
+        self.weekday_mask = weekday_mask(self.preferred_days)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Bus {self.bus_number} - {self.organization.title}"
\ No newline at end of file
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from core.principal import branch_cache
+from core.response_cache import invalidate_tags
+from organization.cache import invalidate_organization, invalidate_owner, invalidate_branches, invalidate_buses
+from organization.models import Organization, Branch, Bus
+
+
+@receiver(pre_save, sender=Organization)
+def remember_previous_subdomain(sender, instance, **kwargs):
+    # A subdomain change must also evict the entry cached under the old name
+    instance._previous_subdomain = None
+    if instance.pk:
+        instance._previous_subdomain = Organization.objects.filter(pk=instance.pk).values_list('subdomain', flat=True).first()
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_on_organization_change(sender, instance, **kwargs):
+    invalidate_organization(instance.subdomain, getattr(instance, '_previous_subdomain', None))
+    invalidate_owner(instance.pk)
+    invalidate_branches(instance.pk)
+    invalidate_buses(instance.pk)
+    invalidate_tags(instance.pk, "organization", "branches", "buses")
+
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_on_branch_change(sender, instance, **kwargs):
+    invalidate_branches(instance.organization_id)
+    branch_cache.delete(instance.pk)
+    invalidate_tags(instance.organization_id, "branches")
+
+
+@receiver(post_save, sender=Bus)
+@receiver(post_delete, sender=Bus)
+def invalidate_on_bus_change(sender, instance, **kwargs):
+    invalidate_buses(instance.organization_id)
+    invalidate_tags(instance.organization_id, "buses")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_on_owner_change(sender, instance, **kwargs):
+    invalidate_owner(*Organization.objects.filter(owner_id=instance.pk).values_list('id', flat=True))
+    branch_organization_ids = list(Branch.objects.filter(owner_id=instance.pk).values_list('organization_id', flat=True).distinct())
+    invalidate_branches(*branch_organization_ids)
+    for organization_id in branch_organization_ids:
+        invalidate_tags(organization_id, "branches")
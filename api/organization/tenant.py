@@ -0,0 +1,75 @@
+import copy
+from enum import IntEnum
+from functools import lru_cache
+
+from django_bolt.exceptions import HTTPException
+
+from organization.cache import aget_owner, aget_branches
+from organization.models import Organization
+
+
+class TenantScope(IntEnum):
+    """How much tenant data a route needs. Each scope includes the ones below it."""
+    ID = 0          # organization row only (id, slug, subdomain, ...)
+    OWNER = 1       # + organization.owner
+    BRANCHES = 2    # + organization.branches with their owners
+
+
+class LazyTenant:
+    """
+    Tenant attached to every request by OrganizationMiddleware. Only the
+    organization row is resolved up front; owner and branches are loaded
+    through the tenant cache the first time a route asks for them.
+    """
+
+    def __init__(self, organization: Organization):
+        self.organization = organization
+        self._scope = TenantScope.ID
+
+    @property
+    def id(self):
+        return self.organization.id
+
+    @property
+    def slug(self):
+        return self.organization.slug
+
+    async def load(self, scope: TenantScope = TenantScope.ID) -> Organization:
+        if scope <= self._scope:
+            return self.organization
+
+        if self._scope == TenantScope.ID:
+            # The row comes from a process-wide cache, so never attach related
+            # data to the shared instance.
+            self.organization = copy.copy(self.organization)
+
+        if scope >= TenantScope.OWNER and self._scope < TenantScope.OWNER:
+            owner = await aget_owner(self.organization)
+            Organization._meta.get_field('owner').set_cached_value(self.organization, owner)
+
+        if scope >= TenantScope.BRANCHES:
+            branches = await aget_branches(self.organization)
+            queryset = self.organization.branches.all()
+            queryset._result_cache = list(branches)
+            queryset._prefetch_done = True
+            self.organization._prefetched_objects_cache = {'branches': queryset}
+
+        self._scope = scope
+        return self.organization
+
+
+@lru_cache(maxsize=None)
+def require_tenant(scope: TenantScope = TenantScope.ID):
+    """
+    Dependency declaring how much tenant data a route needs, e.g.
+    `organization=Depends(require_tenant(TenantScope.BRANCHES))`.
+    Routes that only need the organization id can keep reading
+    `request.state["organization"]`.
+    """
+    async def dependency(request):
+        tenant = request.state.get("tenant")
+        if tenant is None:
+            raise HTTPException(status_code=404, detail="Organization not found")
+        return await tenant.load(scope)
+    dependency.__name__ = f"require_tenant_{scope.name.lower()}"
+    return dependency
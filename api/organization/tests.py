@@ -1,3 +1,102 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+import msgspec
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from core import response_cache
+from organization.api import buses_available_on, get_buses_for_day
+from organization.cache import aget_branches, aget_owner, tenant_related_cache
+from organization.models import Organization, Branch, Bus, weekday_mask
+
+
+class BusWeekdayMaskTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Mask Org", subdomain="mask")
+
+    def test_save_sets_the_mask(self):
+        bus = Bus.objects.create(organization=self.organization, bus_number="GJ-01", preferred_days=[1, 7])
+        self.assertEqual(bus.weekday_mask, 0b1000001)
+
+    def test_bulk_writes_keep_the_mask_in_step(self):
+        Bus.objects.bulk_create([Bus(organization=self.organization, bus_number="GJ-01", preferred_days=[2])])
+        bus = Bus.objects.get(bus_number="GJ-01")
+        self.assertEqual(bus.weekday_mask, weekday_mask([2]))
+
+        Bus.objects.filter(pk=bus.pk).update(preferred_days=[3, 4])
+        bus.refresh_from_db()
+        self.assertEqual(bus.weekday_mask, weekday_mask([3, 4]))
+
+        bus.preferred_days = [6]
+        Bus.objects.bulk_update([bus], ['preferred_days'])
+        bus.refresh_from_db()
+        self.assertEqual(bus.weekday_mask, weekday_mask([6]))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bus-availability-tests"}})
+class BusAvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Fleet Org", subdomain="fleet")
+        for bus_number, days in (("GJ-WEEKDAYS", [1, 2, 3, 4, 5]), ("GJ-WEEKEND", [6, 7]), ("GJ-SUNDAY", [7]), ("GJ-IDLE", [])):
+            Bus.objects.create(organization=cls.organization, bus_number=bus_number, preferred_days=days)
+        other = Organization.objects.create(title="Other Org", subdomain="other-fleet")
+        Bus.objects.create(organization=other, bus_number="GJ-OTHER", preferred_days=[1, 2, 3, 4, 5, 6, 7])
+
+    def setUp(self):
+        response_cache.response_cache.remote.clear()
+        response_cache.response_cache.local.clear()
+        response_cache._tag_versions.clear()
+
+    def bus_numbers(self, weekday):
+        return [bus.bus_number for bus in async_to_sync(buses_available_on)(self.organization, weekday)]
+
+    def buses_for_day(self, day):
+        request = SimpleNamespace(headers={}, state={"organization": self.organization})
+        return async_to_sync(get_buses_for_day)(request, day=day)
+
+    def test_only_buses_running_that_weekday_are_listed(self):
+        self.assertEqual(self.bus_numbers(3), ["GJ-WEEKDAYS"])
+        self.assertEqual(self.bus_numbers(7), ["GJ-SUNDAY", "GJ-WEEKEND"])
+
+    def test_dates_across_the_week_boundary(self):
+        # 2026-10-18 is a Sunday, 2026-10-19 the Monday after it
+        sunday = msgspec.json.decode(self.buses_for_day("2026-10-18").content)["data"]
+        monday = msgspec.json.decode(self.buses_for_day("2026-10-19").content)["data"]
+
+        self.assertEqual(sunday["weekday"], 7)
+        self.assertEqual([bus["bus_number"] for bus in sunday["buses"]], ["GJ-SUNDAY", "GJ-WEEKEND"])
+        self.assertEqual(monday["weekday"], 1)
+        self.assertEqual([bus["bus_number"] for bus in monday["buses"]], ["GJ-WEEKDAYS"])
+
+    def test_invalid_date_is_rejected(self):
+        result = self.buses_for_day("2026-13-01")
+        self.assertEqual(result.status_code, 400)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tenant-cache-tests"}})
+class TenantCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username="owner", email="owner@example.com", password="s3cret-pass")
+        cls.organization = Organization.objects.create(title="Cache Org", subdomain="cache", owner=owner)
+        Branch.objects.create(organization=cls.organization, title="Surat", owner=owner)
+
+    def setUp(self):
+        tenant_related_cache.local.clear()
+        tenant_related_cache.remote.clear()
+
+    def test_cached_users_carry_no_credentials(self):
+        owner = async_to_sync(aget_owner)(self.organization)
+        branch_owner = async_to_sync(aget_branches)(self.organization)[0].owner
+
+        for user in (owner, branch_owner):
+            self.assertEqual((user.username, user.email), ("owner", "owner@example.com"))
+            self.assertIn("password", user.get_deferred_fields())
+        cached = tenant_related_cache.remote.get(tenant_related_cache.make_key(f"{self.organization.id}:owner"))
+        self.assertNotIn("password", vars(cached))
@@ -1,6 +1,35 @@
 from django.contrib import admin
+
+from analytics.rollup import record_shipment_created, record_shipment_deleted, record_shipment_edited
 from .models import Shipment, ShipmentHistory
 # Register your models here.
 
-admin.site.register(Shipment)
+# Columns that decide a shipment's rollup bucket and revenue (analytics/rollup.py)
+ROLLUP_FIELDS = ('organization', 'source_branch', 'destination_branch', 'day', 'current_status', 'payment_mode', 'price')
+
+
+@admin.register(Shipment)
+class ShipmentAdmin(admin.ModelAdmin):
+    """Keeps the daily rollup in step with edits and deletes made here."""
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            record_shipment_created(obj)
+            return
+        previous = Shipment.objects.select_for_update().only(*ROLLUP_FIELDS).get(pk=obj.pk)
+        super().save_model(request, obj, form, change)
+        record_shipment_edited(previous, obj)
+
+    def delete_model(self, request, obj):
+        previous = Shipment.objects.select_for_update().only(*ROLLUP_FIELDS).get(pk=obj.pk)
+        super().delete_model(request, obj)
+        record_shipment_deleted(previous)
+
+    def delete_queryset(self, request, queryset):
+        previous = list(queryset.select_for_update().only(*ROLLUP_FIELDS))
+        super().delete_queryset(request, queryset)
+        record_shipment_deleted(*previous)
+
+
 admin.site.register(ShipmentHistory)
@@ -1,25 +1,140 @@
 from django_bolt import BoltAPI, Depends
-from core.utils import response, get_current_user, jwt_auth
+from core.utils import response, get_current_user, jwt_auth, make_etag, is_not_modified, not_modified
 from organization.middleware import OrganizationMiddleware
-from .serializers import ShipmentSerializer, ShipmentCreateSerializer, ShipmentStatusUpdateSerializer
-from .models import Shipment, ShipmentHistory, ShipmentStatus, generate_tracking_id
-from organization.models import Branch, Bus
+from .serializers import ShipmentSerializer, ShipmentCreateSerializer, ShipmentStatusUpdateSerializer, ShipmentBulkStatusUpdateSerializer
+from .models import DeletedShipment, Shipment, ShipmentHistory, ShipmentStatus
+from .tracking import agenerate_tracking_id, normalize_tracking_id
+from .importer import ShipmentImporter, read_rows, IMPORT_FORMATS
+from organization.cache import aget_branches, aget_buses
 from organization.serializers import BusSerializer
-from core.sms_service import async_send_sms
 from core.constants import (
     SENDER_SHIPMENT_CREATED_TEMPLATE,
     RECEIVER_SHIPMENT_CREATED_TEMPLATE,
     ADMIN_SHIPMENT_CREATED_TEMPLATE
 )
-from Messaging.models import Message
-from django.db.models import Q
+from Messaging.outbox import enqueue_notifications
+from analytics.rollup import record_shipment_created, record_status_change, record_status_changes
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q, Count, Max
 from django.utils import timezone
-from datetime import datetime, timedelta
+from decimal import Decimal
+import csv
+import io
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 from django_bolt.auth import IsAuthenticated, HasPermission
+from core.pagination import keyset_page
+from django.conf import settings
+from .cache import aget_tracking, invalidate_tracking
+from .events import publish_shipment_event, publish_bulk_status_event, SHIPMENT_CREATED, SHIPMENT_STATUS_CHANGED
 
 # Protected Routes - uses OrganizationMiddleware to get organization from subdomain
 api = BoltAPI(django_middleware=False, middleware=[OrganizationMiddleware], prefix="/api")
 
+@transaction.atomic
+def book_shipment(notifications=(), sms=(), **fields):
+    """
+    Insert a shipment, its first history entry, its analytics rollup delta and
+    its outbox notifications (staff `(user_id, content)` and customer
+    `(phone, content)` pairs) in one transaction, and push a `shipment.created`
+    event once it commits.
+    Returns the shipment with its history attached, ready to serialize.
+    """
+    shipment = Shipment(**fields)
+    shipment.set_last_event(shipment.source_branch.title, "Shipment booked successfully.")
+    shipment.save(force_insert=True)
+    history = ShipmentHistory.objects.create(
+        shipment=shipment,
+        status=ShipmentStatus.BOOKED,
+        location=shipment.last_location,
+        remarks=shipment.last_remarks
+    )
+    record_shipment_created(shipment)
+    enqueue_notifications(shipment.organization, messages=notifications, sms=sms)
+    publish_shipment_event(SHIPMENT_CREATED, shipment)
+    attach_history(shipment, [history])
+    return shipment
+
+def attach_history(shipment, entries):
+    """Serve `shipment.history.all()` from `entries` instead of a query."""
+    queryset = shipment.history.all()
+    queryset._result_cache = list(entries)
+    queryset._prefetch_done = True
+    shipment._prefetched_objects_cache = {'history': queryset}
+
+@transaction.atomic
+def transition_shipment(shipment, status, location, remarks=None):
+    """
+    Change a shipment's status and its denormalized latest event, record the
+    history entry and move its rollup bucket in one transaction.
+    """
+    previous_status = Shipment.objects.select_for_update().values_list('current_status', flat=True).get(pk=shipment.pk)
+    shipment.current_status = status
+    shipment.set_last_event(location, remarks)
+    # Only the columns this transition owns; the caller's instance may be stale
+    shipment.save(update_fields=['current_status', 'last_location', 'last_event_at', 'last_remarks', 'updated_at'])
+    ShipmentHistory.objects.create(
+        shipment=shipment,
+        status=status,
+        location=location,
+        remarks=remarks
+    )
+    record_status_change(shipment, previous_status)
+    publish_shipment_event(SHIPMENT_STATUS_CHANGED, shipment, previous_status=previous_status, location=location)
+    return shipment
+
+# A bus load is dispatched from its source branch and received at its destination
+BULK_BRANCH_SIDE = {
+    ShipmentStatus.BOOKED: 'source_branch',
+    ShipmentStatus.IN_TRANSIT: 'source_branch',
+    ShipmentStatus.ARRIVED: 'destination_branch',
+}
+
+@transaction.atomic
+def bulk_transition_shipments(query, status, location, remarks=None) -> tuple[list, list]:
+    """
+    Move every shipment in `query` to `status` (and its latest event to
+    `location`) with one UPDATE, one history INSERT and one rollup delta per
+    bucket, in one transaction.
+    Returns (updated, unchanged) shipments.
+    """
+    shipments = list(query.select_for_update(of=('self',)).select_related(
+        'source_branch', 'destination_branch'
+    ).only(
+        'id', 'tracking_id', 'current_status', 'organization_id', 'day', 'payment_mode', 'price',
+        'source_branch__slug', 'destination_branch__slug'
+    ).order_by('id'))
+    updated = [shipment for shipment in shipments if shipment.current_status != status]
+    unchanged = [shipment for shipment in shipments if shipment.current_status == status]
+    if not updated:
+        return updated, unchanged
+
+    now = timezone.now()
+    Shipment.objects.filter(pk__in=[shipment.pk for shipment in updated]).update(
+        current_status=status,
+        updated_at=now,
+        last_location=location,
+        last_remarks=remarks,
+        last_event_at=now
+    )
+    ShipmentHistory.objects.bulk_create([
+        ShipmentHistory(shipment=shipment, status=status, location=location, remarks=remarks)
+        for shipment in updated
+    ])
+    changes = []
+    for shipment in updated:
+        changes.append((shipment, shipment.current_status))
+        shipment.current_status = status
+        shipment.updated_at = now
+        shipment.set_last_event(location, remarks, now)
+    record_status_changes(changes)
+
+    # update() sends no post_save, so evict the tracking entries here
+    tracking_ids = [shipment.tracking_id for shipment in updated]
+    transaction.on_commit(lambda: invalidate_tracking(*tracking_ids))
+    publish_bulk_status_event(updated, status, location)
+    return updated, unchanged
+
 @api.post("/shipment/create/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
 async def create_shipment(request, credentials: ShipmentCreateSerializer, user=Depends(get_current_user)):
     organization = request.state.get("organization")
@@ -31,7 +146,7 @@ async def create_shipment(request, credentials: ShipmentCreateSerializer, user=D
         )
     
     # Get source branch from authenticated user (branch admin's branch)
-    source_branch = await user.branch.afirst()
+    source_branch = await user.abranch()
     if not source_branch:
         return response(
             status=403,
@@ -47,28 +162,27 @@ async def create_shipment(request, credentials: ShipmentCreateSerializer, user=D
             error="Branch does not belong to this organization"
         )
     
-    # Get destination branch
-    try:
-        destination_branch = await Branch.objects.select_related('organization', 'owner').aget(
-            slug=credentials.destination_branch_slug,
-            organization=organization
-        )
-    except Branch.DoesNotExist:
+    # Destination branch and bus come from the tenant cache
+    destination_branch = next(
+        (branch for branch in await aget_branches(organization) if branch.slug == credentials.destination_branch_slug),
+        None
+    )
+    if destination_branch is None:
         return response(
             status=404,
             message="Destination branch not found",
             error="Invalid destination branch slug"
         )
     
+    # All buses for the organization (not just today's available ones)
+    # Frontend will handle highlighting buses available today
+    buses = await aget_buses(organization)
+    
     # Get bus if bus_slug is provided
     bus = None
     if credentials.bus_slug:
-        try:
-            bus = await Bus.objects.aget(
-                slug=credentials.bus_slug,
-                organization=organization
-            )
-        except Bus.DoesNotExist:
+        bus = next((bus for bus in buses if bus.slug == credentials.bus_slug), None)
+        if bus is None:
             return response(
                 status=404,
                 message="Bus not found",
@@ -77,10 +191,9 @@ async def create_shipment(request, credentials: ShipmentCreateSerializer, user=D
     
     # Generate tracking ID based on destination branch prefix (first letter)
     prefix = destination_branch.title[0].upper() if destination_branch.title else "X"
-    shipment_tracking_id = generate_tracking_id(prefix)
+    shipment_tracking_id = await agenerate_tracking_id(prefix)
     
     # Parse day field or default to branch operational date
-    from datetime import datetime
     if credentials.day:
         try:
             shipment_day = datetime.fromisoformat(credentials.day).date()
@@ -89,8 +202,34 @@ async def create_shipment(request, credentials: ShipmentCreateSerializer, user=D
     else:
         shipment_day = source_branch.current_operational_date
     
-    # Create the shipment
-    shipment = await Shipment.objects.acreate(
+    # Notifications go to the outbox with the shipment; `manage.py drain_outbox` delivers them
+    template_data = {
+        "tracking_id": shipment_tracking_id,
+        "sender_name": credentials.sender_name,
+        "receiver_name": credentials.receiver_name,
+        "source": source_branch.title,
+        "destination": destination_branch.title
+    }
+    notifications = []
+    # Notify Organization Admin
+    if organization.owner_id:
+        notifications.append((organization.owner_id, ADMIN_SHIPMENT_CREATED_TEMPLATE.format(**template_data)))
+    # Notify Branch Admin (the creator) if different from Org Admin
+    if organization.owner_id != user.id:
+        notifications.append((user.id, f"Successfully booked shipment {shipment_tracking_id} to {destination_branch.title}."))
+    # Notify Receiving Branch Admin
+    if destination_branch.owner_id and destination_branch.owner_id != user.id:
+        notifications.append((destination_branch.owner_id, f"Incoming shipment {shipment_tracking_id} from {source_branch.title} is on its way!"))
+    # SMS to the sender and the receiver
+    sms = [
+        (credentials.sender_phone, SENDER_SHIPMENT_CREATED_TEMPLATE.format(**template_data)),
+        (credentials.receiver_phone, RECEIVER_SHIPMENT_CREATED_TEMPLATE.format(**template_data)),
+    ]
+    
+    # One transaction: shipment, history, rollup, outbox
+    shipment = await sync_to_async(book_shipment)(
+        notifications=notifications,
+        sms=sms,
         tracking_id=shipment_tracking_id,
         organization=organization,
         source_branch=source_branch,
@@ -101,98 +240,176 @@ async def create_shipment(request, credentials: ShipmentCreateSerializer, user=D
         receiver_name=credentials.receiver_name,
         receiver_phone=credentials.receiver_phone,
         description=credentials.description,
-        price=credentials.price,
+        price=Decimal(str(credentials.price)).quantize(Decimal('0.01')),
         payment_mode=credentials.payment_mode,
         current_status=ShipmentStatus.BOOKED,
         day=shipment_day
     )
     
-    # Create initial history entry
-    await ShipmentHistory.objects.acreate(
-        shipment=shipment,
-        status=ShipmentStatus.BOOKED,
-        location=shipment.source_branch.title,
-        remarks="Shipment booked successfully."
-    )
-    
-    # Fetch shipment with related data
-    shipment_with_related = await Shipment.objects.select_related(
-        'source_branch__owner',
-        'destination_branch__owner',
-        'organization',
-        'bus'
-    ).prefetch_related('history').aget(pk=shipment.pk)
-    
-    shipment_serialized = ShipmentSerializer.fields("detail").from_model(shipment_with_related)
+    # Serialize from the objects already in hand rather than re-reading them
+    shipment_serialized = ShipmentSerializer.fields("detail").from_model(shipment)
     
-    # Get all buses for the organization (not just today's available ones)
-    # Frontend will handle highlighting buses available today
-    from datetime import datetime
-    current_day = datetime.now().weekday() + 1  # Monday=1, Sunday=7
-    all_buses = []
-    async for bus in Bus.objects.filter(organization=organization):
-        bus_serialized = BusSerializer.fields("list").from_model(bus)
-        all_buses.append(bus_serialized)
-    
-    # Add all buses to response data
     response_data = {
         "shipment": shipment_serialized,
-        "available_buses": all_buses  # All buses, frontend will filter/highlight
+        "available_buses": [BusSerializer.fields("list").from_model(bus) for bus in buses]  # All buses, frontend will filter/highlight
     }
     
-    # Send SMS and Record Messaging
-    try:
-        tracking_link = f"http://localhost:3000/track/{shipment.tracking_id}"
-        
-        # Prepare Data for Templates
-        template_data = {
-            "tracking_id": shipment.tracking_id,
-            "sender_name": shipment.sender_name,
-            "receiver_name": shipment.receiver_name,
-            "source": shipment.source_branch.title,
-            "destination": shipment.destination_branch.title
-        }
-        
-        # Notify Organization Admin
-        admin_msg = ADMIN_SHIPMENT_CREATED_TEMPLATE.format(**template_data)
-        if organization.owner:
-            await Message.objects.acreate(
-                organization=organization,
-                user=organization.owner,
-                content=admin_msg
-            )
-            
-        # Notify Branch Admin (the creator) if different from Org Admin
-        if organization.owner_id != user.id:
-            await Message.objects.acreate(
-                organization=organization,
-                user=user,
-                content=f"Successfully booked shipment {shipment.tracking_id} to {shipment.destination_branch.title}."
-            )
-
-        # Notify Receiving Branch Admin
-        if destination_branch.owner_id and destination_branch.owner_id != user.id:
-            await Message.objects.acreate(
-                organization=organization,
-                user=destination_branch.owner,
-                content=f"Incoming shipment {shipment.tracking_id} from {shipment.source_branch.title} is on its way!"
-            )
-        
-    except Exception as e:
-        # Don't fail the request if messaging fails
-        print(f"Messaging/SMS Sending failed: {e}")
-    
     return response(
         status=201,
         message="Shipment booked successfully",
         data=response_data
     )
 
+# Shipment lists are paginated by (created_at, id) cursor
+LIST_PAGE_SIZE = 50
+MAX_LIST_PAGE_SIZE = 200
+
+# Delta sync (`since`): rows updated up to SYNC_OVERLAP before the watermark are
+# returned again, so a transaction that committed late is not skipped. Clients
+# upsert `results` and drop the tracking ids in `removed` (deleted, out of the
+# status filter, or out of the 7-day window). Rows whose branch or bus changed
+# are sent again. Deltas larger than MAX_DELTA_SIZE ask for a full reload.
+SYNC_OVERLAP = timedelta(seconds=5)
+MAX_DELTA_SIZE = 500
+LIST_WINDOW = timedelta(days=7)
+
+def list_window_start(at=None) -> date:
+    """First day shown by the shipment lists."""
+    return (at or timezone.now()).astimezone(dt_timezone.utc).date() - LIST_WINDOW
+
+def recent_shipments(organization):
+    """Shipments of the last 7 days, with only the relations the "list" field set renders."""
+    return Shipment.objects.select_related(
+        'source_branch',
+        'destination_branch',
+        'bus'
+    ).filter(
+        organization=organization,
+        day__gte=list_window_start()
+    )
+
+def parse_status_filter(status: str | None) -> list[str]:
+    """Comma separated statuses; raises ValueError for unknown ones."""
+    if not status:
+        return []
+    statuses = [value.strip() for value in status.split(',') if value.strip()]
+    valid_statuses = [choice[0] for choice in ShipmentStatus.choices]
+    invalid = [value for value in statuses if value not in valid_statuses]
+    if invalid:
+        raise ValueError(f"Status must be one of: {', '.join(valid_statuses)}")
+    return statuses
+
+async def shipment_list_page(query, cursor: str | None, page_size: int) -> dict:
+    page_size = min(max(page_size, 1), MAX_LIST_PAGE_SIZE)
+    shipments, next_cursor, prev_cursor = await keyset_page(query, cursor, page_size)
+    return {
+        "results": [ShipmentSerializer.fields("list").from_model(shipment) for shipment in shipments],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+
+def parse_watermark(since: str) -> datetime:
+    """ISO timestamp from a previous `watermark`; raises ValueError otherwise."""
+    watermark = datetime.fromisoformat(since.replace(' ', '+'))
+    if timezone.is_naive(watermark):
+        watermark = timezone.make_aware(watermark, dt_timezone.utc)
+    return watermark
+
+async def shipment_delta(query, since: str, organization_id, statuses=(), related_latest=None) -> dict:
+    """
+    Shipments of `query` created or updated since the watermark, oldest change
+    first, and the tracking ids to drop. `query` is not filtered by status, so
+    rows that left `statuses` can be reported as removed.
+    """
+    watermark = parse_watermark(since)
+    start = watermark - SYNC_OVERLAP
+    window_start, previous_window_start = list_window_start(), list_window_start(watermark)
+    changed = Q(updated_at__gte=start)
+    if related_latest is not None and related_latest >= start:
+        # A branch or bus renamed since the watermark changes how its rows render
+        changed |= (
+            Q(source_branch__updated_at__gte=start)
+            | Q(destination_branch__updated_at__gte=start)
+            | Q(bus__updated_at__gte=start)
+        )
+        watermark = max(watermark, related_latest)
+    shipments = [
+        shipment async for shipment in query.filter(changed).order_by('updated_at', 'id')[:MAX_DELTA_SIZE + 1]
+    ]
+    removed = [
+        tracking_id async for tracking_id in DeletedShipment.objects.filter(
+            organization_id=organization_id, deleted_at__gte=start
+        ).values_list('tracking_id', flat=True)[:MAX_DELTA_SIZE + 1]
+    ]
+    if previous_window_start < window_start:
+        # Rows that aged out of the window since the watermark
+        removed += [
+            tracking_id async for tracking_id in Shipment.objects.filter(
+                organization_id=organization_id, day__gte=previous_window_start, day__lt=window_start
+            ).values_list('tracking_id', flat=True)[:MAX_DELTA_SIZE + 1]
+        ]
+    if len(shipments) + len(removed) > MAX_DELTA_SIZE:
+        return {"results": [], "removed": [], "watermark": None, "reset": True}
+    if shipments:
+        watermark = max(watermark, shipments[-1].updated_at)
+    return {
+        "results": [
+            ShipmentSerializer.fields("list").from_model(shipment)
+            for shipment in shipments if not statuses or shipment.current_status in statuses
+        ],
+        "removed": removed + [
+            shipment.tracking_id for shipment in shipments if statuses and shipment.current_status not in statuses
+        ],
+        "watermark": watermark.isoformat(),
+        "reset": False
+    }
+
+async def shipment_list_response(request, query, scope, message: str, cursor: str | None, page_size: int, since: str | None, statuses=()):
+    """
+    Page or delta of `query` filtered to `statuses`, with a weak ETag over the
+    window, (row count, latest update) of the filtered list and the latest
+    update of the branches and buses it shows: a repeated request for an
+    unchanged list costs one aggregate query and returns 304 with no body.
+    """
+    listed = query.filter(current_status__in=statuses) if statuses else query
+    state = await listed.order_by().aaggregate(
+        total=Count('id'),
+        latest=Max('updated_at'),
+        source_latest=Max('source_branch__updated_at'),
+        destination_latest=Max('destination_branch__updated_at'),
+        bus_latest=Max('bus__updated_at'),
+    )
+    related_latest = max(
+        (state[key] for key in ('source_latest', 'destination_latest', 'bus_latest') if state[key] is not None),
+        default=None
+    )
+    etag = make_etag(*scope, list_window_start(), state['total'], state['latest'], related_latest, cursor, page_size, since)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    if since:
+        organization = request.state["organization"]
+        data = await shipment_delta(query, since, organization.id, statuses, related_latest)
+    else:
+        data = await shipment_list_page(listed, cursor, page_size)
+        # Watermark for the first delta sync after a full load
+        data["watermark"] = state['latest'].isoformat() if state['latest'] else None
+
+    return response(
+        status=200,
+        message=message,
+        data=data,
+        headers={"ETag": etag}
+    )
+
 @api.get("/shipment/list/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_organization_admin")])
-async def list_shipments_organization(request):
+async def list_shipments_organization(request, cursor: str | None = None, page_size: int = LIST_PAGE_SIZE, status: str | None = None, since: str | None = None):
     """
-    List all shipments for the organization.
+    List shipments of the last 7 days for the organization, newest first.
     For organization admins - returns all shipments in the organization.
+    Query params: cursor (from a previous page), page_size, status (comma separated),
+    since (a previous `watermark`; returns only shipments changed after it).
+    Honours If-None-Match with a 304.
     """
     organization = request.state.get("organization")
     if not organization:
@@ -202,33 +419,24 @@ async def list_shipments_organization(request):
             error="Organization context missing"
         )
     
-    # Get shipments for the last 7 days only for the active list
-    seven_days_ago = timezone.now().date() - timedelta(days=7)
-    
-    shipments = []
-    async for shipment in Shipment.objects.select_related(
-        'source_branch__owner',
-        'destination_branch__owner',
-        'organization',
-        'bus'
-    ).prefetch_related('history').filter(
-        organization=organization,
-        day__gte=seven_days_ago
-    ).order_by('-created_at'):
-        shipment_serialized = ShipmentSerializer.fields("list").from_model(shipment)
-        shipments.append(shipment_serialized)
+    query = recent_shipments(organization)
     
-    return response(
-        status=200,
-        message="Shipments fetched successfully",
-        data=shipments
-    )
+    try:
+        statuses = parse_status_filter(status)
+        return await shipment_list_response(
+            request, query, ("organization", organization.id, status),
+            "Shipments fetched successfully", cursor, page_size, since, statuses
+        )
+    except ValueError as e:
+        return response(status=400, message="Invalid filters", error=str(e))
 
 @api.get("/shipment/branch/list/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
-async def list_shipments_branch(request, user=Depends(get_current_user)):
+async def list_shipments_branch(request, cursor: str | None = None, page_size: int = LIST_PAGE_SIZE, status: str | None = None, direction: str | None = None, since: str | None = None, user=Depends(get_current_user)):
     """
-    List shipments for a specific branch.
+    List shipments of the last 7 days for a specific branch, newest first.
     For branch admins - returns shipments where branch is source or destination.
+    Query params: cursor, page_size, status (comma separated), direction ("incoming" or "outgoing"),
+    since (a previous `watermark`). Honours If-None-Match with a 304.
     """
     organization = request.state.get("organization")
     if not organization:
@@ -239,8 +447,7 @@ async def list_shipments_branch(request, user=Depends(get_current_user)):
         )
     
     # Get branch from authenticated user
-    branch = await user.branch.afirst()
-    if not branch:
+    if not user.branch_id:
         return response(
             status=403,
             message="Branch access denied",
@@ -248,38 +455,40 @@ async def list_shipments_branch(request, user=Depends(get_current_user)):
         )
     
     # Verify branch belongs to the organization
-    if branch.organization_id != organization.id:
+    if user.organization_id != organization.id:
         return response(
             status=403,
             message="Branch access denied",
             error="Branch does not belong to this organization"
         )
     
-    # Filter shipments where branch is source or destination AND within last 7 days
-    seven_days_ago = timezone.now().date() - timedelta(days=7)
-    
-    shipments = []
-    async for shipment in Shipment.objects.select_related(
-        'source_branch__owner',
-        'destination_branch__owner',
-        'organization',
-        'bus'
-    ).prefetch_related('history').filter(
-        Q(source_branch=branch) | Q(destination_branch=branch),
-        organization=organization,
-        day__gte=seven_days_ago
-    ).order_by('-created_at'):
-        shipment_serialized = ShipmentSerializer.fields("list").from_model(shipment)
-        shipments.append(shipment_serialized)
+    # Filter shipments where branch is source and/or destination
+    query = recent_shipments(organization)
+    if direction == "incoming":
+        query = query.filter(destination_branch_id=user.branch_id)
+    elif direction == "outgoing":
+        query = query.filter(source_branch_id=user.branch_id)
+    elif direction:
+        return response(
+            status=400,
+            message="Invalid filters",
+            error="Direction must be one of: incoming, outgoing"
+        )
+    else:
+        query = query.filter(Q(source_branch_id=user.branch_id) | Q(destination_branch_id=user.branch_id))
     
-    return response(
-        status=200,
-        message="Branch shipments fetched successfully",
-        data=shipments
-    )
+    try:
+        statuses = parse_status_filter(status)
+        return await shipment_list_response(
+            request, query, ("branch", user.branch_id, direction, status),
+            "Branch shipments fetched successfully", cursor, page_size, since, statuses
+        )
+    except ValueError as e:
+        return response(status=400, message="Invalid filters", error=str(e))
 
 @api.get("/shipment/{tracking_id}/", auth=[jwt_auth], guards=[IsAuthenticated()])
 async def retrieve_shipment(request, tracking_id: str, user=Depends(get_current_user)):
+    tracking_id = normalize_tracking_id(tracking_id)
     organization = request.state.get("organization")
     if not organization:
         return response(
@@ -306,10 +515,9 @@ async def retrieve_shipment(request, tracking_id: str, user=Depends(get_current_
         )
     
     # Check branch permissions if user is branch admin
-    branch = await user.branch.afirst()
-    if branch:
+    if user.branch_id:
         # Branch admin can only see shipments related to their branch
-        if shipment.source_branch_id != branch.id and shipment.destination_branch_id != branch.id:
+        if shipment.source_branch_id != user.branch_id and shipment.destination_branch_id != user.branch_id:
             return response(
                 status=403,
                 message="Access denied",
@@ -326,6 +534,7 @@ async def retrieve_shipment(request, tracking_id: str, user=Depends(get_current_
 
 @api.patch("/shipment/{tracking_id}/update-status/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
 async def update_shipment_status(request, tracking_id: str, credentials: ShipmentStatusUpdateSerializer, user=Depends(get_current_user)):
+    tracking_id = normalize_tracking_id(tracking_id)
     organization = request.state.get("organization")
     if not organization:
         return response(
@@ -335,7 +544,7 @@ async def update_shipment_status(request, tracking_id: str, credentials: Shipmen
         )
     
     # Get branch from authenticated user
-    branch = await user.branch.afirst()
+    branch = await user.abranch()
     if not branch:
         return response(
             status=403,
@@ -377,17 +586,8 @@ async def update_shipment_status(request, tracking_id: str, credentials: Shipmen
             error=f"Status must be one of: {', '.join(valid_statuses)}"
         )
     
-    # Update status
-    shipment.current_status = credentials.status
-    await shipment.asave()
-    
-    # Create history entry with branch location
-    await ShipmentHistory.objects.acreate(
-        shipment=shipment,
-        status=credentials.status,
-        location=branch.title,
-        remarks=credentials.remarks
-    )
+    # Update status and create history entry with branch location
+    await sync_to_async(transition_shipment)(shipment, credentials.status, branch.title, credentials.remarks)
     
     # Fetch updated shipment with related data
     shipment_with_related = await Shipment.objects.select_related(
@@ -405,34 +605,187 @@ async def update_shipment_status(request, tracking_id: str, credentials: Shipmen
         data=shipment_serialized
     )
 
-@api.get("/shipment/track/{tracking_id}/")
-async def track_shipment(request, tracking_id: str):
+@api.post("/shipment/bulk-status/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
+async def bulk_update_shipment_status(request, credentials: ShipmentBulkStatusUpdateSerializer, user=Depends(get_current_user)):
+    """
+    Move many shipments to one status in a single request: either the scanned
+    `tracking_ids`, or every shipment on `bus_slug` for `day` that this branch
+    dispatches (BOOKED, IN_TRANSIT) or receives (ARRIVED).
+    Returns the outcome per tracking ID: "updated", "unchanged" or "not_found".
+    """
     organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
     
-    # Allow public tracking - organization is optional (from subdomain)
-    query = Shipment.objects.select_related(
-        'source_branch__owner',
-        'destination_branch__owner',
-        'organization',
-        'bus'
-    ).prefetch_related('history').filter(tracking_id=tracking_id)
+    branch = await user.abranch()
+    if not branch:
+        return response(
+            status=403,
+            message="Branch access denied",
+            error="User does not have an associated branch"
+        )
+    
+    if branch.organization_id != organization.id:
+        return response(
+            status=403,
+            message="Branch access denied",
+            error="Branch does not belong to this organization"
+        )
+    
+    valid_statuses = [choice[0] for choice in ShipmentStatus.choices]
+    if credentials.status not in valid_statuses:
+        return response(
+            status=400,
+            message="Invalid status",
+            error=f"Status must be one of: {', '.join(valid_statuses)}"
+        )
+    
+    query = Shipment.objects.filter(organization=organization)
+    tracking_ids = list(dict.fromkeys(normalize_tracking_id(tracking_id) for tracking_id in credentials.tracking_ids))
+    if tracking_ids:
+        # Only shipments this branch sends or receives
+        query = query.filter(tracking_id__in=tracking_ids).filter(
+            Q(source_branch_id=branch.id) | Q(destination_branch_id=branch.id)
+        )
+    elif credentials.bus_slug:
+        bus = next((bus for bus in await aget_buses(organization) if bus.slug == credentials.bus_slug), None)
+        if bus is None:
+            return response(
+                status=404,
+                message="Bus not found",
+                error="Invalid bus slug"
+            )
+        try:
+            day = datetime.fromisoformat(credentials.day).date() if credentials.day else branch.current_operational_date
+        except ValueError:
+            return response(
+                status=400,
+                message="Invalid day",
+                error="Day must be an ISO date (YYYY-MM-DD)"
+            )
+        query = query.filter(bus=bus, day=day, **{f"{BULK_BRANCH_SIDE[credentials.status]}_id": branch.id})
+    else:
+        return response(
+            status=400,
+            message="Nothing to update",
+            error="Pass tracking_ids, or bus_slug (and optionally day)"
+        )
+    
+    updated, unchanged = await sync_to_async(bulk_transition_shipments)(query, credentials.status, branch.title, credentials.remarks)
+    
+    results = {shipment.tracking_id: "updated" for shipment in updated}
+    results.update((shipment.tracking_id, "unchanged") for shipment in unchanged)
+    for tracking_id in tracking_ids:
+        results.setdefault(tracking_id, "not_found")
+    
+    return response(
+        status=200,
+        message=f"{len(updated)} shipments updated to {credentials.status}",
+        data={
+            "status": credentials.status,
+            "updated": len(updated),
+            "unchanged": len(unchanged),
+            "not_found": len(results) - len(updated) - len(unchanged),
+            "results": results
+        }
+    )
+
+@api.post("/shipment/import/", auth=[jwt_auth], guards=[IsAuthenticated(), HasPermission("organization.is_branch_admin")])
+async def import_shipments(request, format: str | None = None, sms: bool = True, user=Depends(get_current_user)):
+    """
+    Book shipments from the caller's branch in bulk, e.g. after working
+    offline. The body is CSV (with a header row) or NDJSON, one shipment per
+    row with the fields of a booking; `format` defaults from the Content-Type.
+    Invalid rows are reported and skipped. Set `sms=false` to skip customer SMS.
+    """
+    organization = request.state.get("organization")
+    if not organization:
+        return response(
+            status=404,
+            message="Organization not found",
+            error="Organization context missing"
+        )
+    
+    source_branch = await user.abranch()
+    if not source_branch:
+        return response(
+            status=403,
+            message="Branch access denied",
+            error="User does not have an associated branch"
+        )
+    
+    if source_branch.organization_id != organization.id:
+        return response(
+            status=403,
+            message="Branch access denied",
+            error="Branch does not belong to this organization"
+        )
     
-    if organization:
-        query = query.filter(organization=organization)
+    import_format = format or ('ndjson' if 'ndjson' in (request.headers.get("content-type") or '') else 'csv')
+    if import_format not in IMPORT_FORMATS:
+        return response(
+            status=400,
+            message="Invalid format",
+            error=f"Format must be one of: {', '.join(IMPORT_FORMATS)}"
+        )
     
+    importer = ShipmentImporter(
+        organization,
+        source_branch,
+        await aget_branches(organization),
+        await aget_buses(organization),
+        send_sms=sms,
+        user_id=user.id
+    )
+    stream = io.TextIOWrapper(io.BytesIO(request.body), encoding='utf-8-sig', newline='')
     try:
-        shipment = await query.aget()
-    except Shipment.DoesNotExist:
+        report = await sync_to_async(importer.run)(read_rows(stream, import_format))
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Chunks before the unreadable part are already booked
+        return response(status=400, message="Unreadable file", error=str(e), data=importer.report.as_dict())
+    
+    return response(
+        status=200,
+        message=f"Imported {len(report.created)} shipments, {report.failed} rows failed",
+        data=report.as_dict()
+    )
+
+@api.get("/shipment/track/{tracking_id}/")
+async def track_shipment(request, tracking_id: str):
+    """
+    Public tracking. Served from the tracking cache (shipment/cache.py), which
+    booking and status updates keep current, and marked cacheable for
+    TRACKING_MAX_AGE seconds so a reverse proxy can absorb bursts.
+    """
+    organization = request.state.get("organization")
+    tracking_id = normalize_tracking_id(tracking_id)
+    
+    # Allow public tracking - organization is optional (from subdomain)
+    entry = await aget_tracking(tracking_id)
+    if entry is None or (organization and entry["organization_id"] != organization.id):
         return response(
             status=404,
             message="Shipment not found",
             error="Invalid tracking ID"
         )
     
-    shipment_serialized = ShipmentSerializer.fields("detail").from_model(shipment)
+    etag = entry["etag"]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.TRACKING_MAX_AGE}, stale-while-revalidate={settings.TRACKING_MAX_AGE * 3}",
+        # The subdomain decides whether the shipment is visible
+        "Vary": "Host"
+    }
+    if is_not_modified(request, etag):
+        return not_modified(etag, headers)
     
     return response(
         status=200,
         message="Tracking info fetched",
-        data=shipment_serialized
+        data=entry["payload"],
+        headers=headers
     )
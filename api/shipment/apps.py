@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ShipmentConfig(AppConfig):
     name = 'shipment'
+
+    def ready(self):
+        from shipment import signals  # noqa: F401
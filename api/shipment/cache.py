@@ -0,0 +1,64 @@
+import msgspec
+from django.conf import settings
+
+from core.cache import TieredCache, MISSING
+from core.utils import make_etag
+from .models import Shipment
+from .serializers import ShipmentSerializer
+
+# Serialized public tracking payloads keyed by tracking_id, as
+# {"organization_id": ..., "etag": ..., "payload": ...}. Unknown ids are cached as None for
+# TRACKING_CACHE_NEGATIVE_TTL. Every write evicts the entry once it commits
+# (shipment/signals.py); writing the payload through instead could let a slower
+# request store an older status over a newer one.
+tracking_cache = TieredCache(
+    "tracking",
+    remote_ttl=settings.TRACKING_CACHE_TTL,
+    local_ttl=settings.TRACKING_CACHE_LOCAL_TTL,
+    local_maxsize=10000,
+)
+
+
+def tracking_entry(shipment: Shipment, serialized=None) -> dict:
+    """Cache entry for a shipment loaded with the relations of the "detail" field set."""
+    if serialized is None:
+        serialized = ShipmentSerializer.fields("detail").from_model(shipment)
+    return {
+        "organization_id": shipment.organization_id,
+        "etag": make_etag(shipment.tracking_id, shipment.updated_at.isoformat(), len(serialized.history)),
+        "payload": msgspec.to_builtins(serialized),
+    }
+
+
+async def fetch_tracking(tracking_id: str) -> dict | None:
+    try:
+        shipment = await Shipment.objects.select_related(
+            'source_branch__owner',
+            'destination_branch__owner',
+            'organization',
+            'bus'
+        ).prefetch_related('history').aget(tracking_id=tracking_id)
+    except Shipment.DoesNotExist:
+        return None
+    return tracking_entry(shipment)
+
+
+async def aget_tracking(tracking_id: str) -> dict | None:
+    """Tracking entry for `tracking_id`, going to the database only on a cache miss."""
+    entry = await tracking_cache.aget(tracking_id)
+    if entry is not MISSING:
+        return entry
+
+    entry = await fetch_tracking(tracking_id)
+    await tracking_cache.aset(
+        tracking_id,
+        entry,
+        ttl=None if entry is not None else settings.TRACKING_CACHE_NEGATIVE_TTL
+    )
+    return entry
+
+
+def invalidate_tracking(*tracking_ids: str) -> None:
+    for tracking_id in tracking_ids:
+        if tracking_id:
+            tracking_cache.delete(tracking_id)
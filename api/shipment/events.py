@@ -0,0 +1,50 @@
+from collections import defaultdict
+
+from core.events import publish_on_commit, organization_channel, branch_channel
+
+SHIPMENT_CREATED = "shipment.created"
+SHIPMENT_STATUS_CHANGED = "shipment.status_changed"
+SHIPMENTS_CREATED = "shipments.created"
+SHIPMENTS_STATUS_CHANGED = "shipments.status_changed"
+
+
+def shipment_channels(shipment) -> list[str]:
+    """The organization and both branches of a shipment."""
+    organization_id = shipment.organization_id
+    return [
+        organization_channel(organization_id),
+        branch_channel(organization_id, shipment.source_branch_id),
+        branch_channel(organization_id, shipment.destination_branch_id),
+    ]
+
+
+def shipment_event_data(shipment, **extra) -> dict:
+    """Enough to add or update a row in a shipment list; relations must already be loaded."""
+    return {
+        "tracking_id": shipment.tracking_id,
+        "status": shipment.current_status,
+        "source_branch": shipment.source_branch.slug,
+        "destination_branch": shipment.destination_branch.slug,
+        "day": str(shipment.day),
+        "updated_at": shipment.updated_at.isoformat(),
+        **extra,
+    }
+
+
+def publish_shipment_event(event_type: str, shipment, **extra):
+    """Publish a shipment event once the current transaction commits."""
+    publish_on_commit(shipment_channels(shipment), event_type, shipment_event_data(shipment, **extra))
+
+
+def publish_shipments_event(event_type: str, shipments, **data):
+    """One event per channel listing that channel's tracking ids, instead of one event per shipment."""
+    tracking_ids = defaultdict(list)
+    for shipment in shipments:
+        for channel in shipment_channels(shipment):
+            tracking_ids[channel].append(shipment.tracking_id)
+    for channel, ids in tracking_ids.items():
+        publish_on_commit([channel], event_type, {**data, "tracking_ids": ids})
+
+
+def publish_bulk_status_event(shipments, status: str, location: str):
+    publish_shipments_event(SHIPMENTS_STATUS_CHANGED, shipments, status=status, location=location)
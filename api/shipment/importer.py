@@ -0,0 +1,209 @@
+"""
+Bulk booking from CSV or NDJSON (POST /shipment/import/, `manage.py import_shipments`).
+
+Each row has the fields of `ShipmentCreateSerializer` and is validated with it
+(CSV values are converted from strings). Destination branches and buses are
+resolved from maps built once per import, tracking ids come from the block
+allocator, and valid rows are booked IMPORT_CHUNK_SIZE at a time: one
+transaction per chunk with bulk INSERTs for shipments, history and outbox
+notifications plus one rollup delta per bucket. Notifications match
+`create_shipment`: in-app messages to the organization admin and the
+destination branch owner and, unless disabled, SMS to senders and receivers;
+the importing user gets the report instead of one message per shipment. Invalid rows are reported by row number
+and skipped; if a chunk fails in the database, its rows are retried one by one
+so a single bad row cannot sink the others.
+"""
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import msgspec
+from django.db import DatabaseError, transaction
+
+from analytics.rollup import record_shipment_created
+from core.constants import (
+    ADMIN_SHIPMENT_CREATED_TEMPLATE, SENDER_SHIPMENT_CREATED_TEMPLATE, RECEIVER_SHIPMENT_CREATED_TEMPLATE
+)
+from Messaging.outbox import enqueue_notifications
+from .events import publish_shipments_event, SHIPMENTS_CREATED
+from .models import Shipment, ShipmentHistory, ShipmentStatus, PaymentMode
+from .serializers import ShipmentCreateSerializer
+from .tracking import generate_tracking_id
+
+IMPORT_CHUNK_SIZE = 1000
+# Errors beyond this many are counted but not listed
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_REMARKS = "Shipment booked by import."
+
+
+def read_rows(stream, import_format: str):
+    """
+    Yield `(row_number, ShipmentCreateSerializer)` for valid rows and
+    `(row_number, error)` for invalid ones from a text stream. Rows are numbered
+    from 1, not counting the CSV header.
+    """
+    if import_format == 'ndjson':
+        decoder = msgspec.json.Decoder(ShipmentCreateSerializer)
+        for row_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, decoder.decode(line)
+            except msgspec.DecodeError as e:
+                yield row_number, str(e)
+        return
+
+    for row_number, row in enumerate(csv.DictReader(stream), 1):
+        # Blank cells fall back to the schema defaults
+        values = {field: value.strip() for field, value in row.items() if field and value and value.strip()}
+        try:
+            yield row_number, msgspec.convert(values, ShipmentCreateSerializer, strict=False)
+        except msgspec.ValidationError as e:
+            yield row_number, str(e)
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = []
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "created": len(self.created),
+            "failed": self.failed,
+            # [row, tracking_id] pairs, so labels can be printed for the right parcels
+            "shipments": self.created,
+            "errors": self.errors,
+        }
+
+
+class ShipmentImporter:
+    """Books rows for one source branch; not thread-safe, create one per import."""
+
+    def __init__(self, organization, source_branch, branches, buses, send_sms: bool = True,
+                 chunk_size: int = IMPORT_CHUNK_SIZE, user_id: int | None = None):
+        self.organization = organization
+        self.source_branch = source_branch
+        # The importing user, who is not notified about their own bookings
+        self.user_id = user_id
+        self.destinations = {branch.slug: branch for branch in branches if branch.organization_id == organization.id}
+        self.buses = {bus.slug: bus for bus in buses if bus.organization_id == organization.id}
+        self.send_sms = send_sms
+        self.chunk_size = chunk_size
+        self.report = ImportReport()
+
+    def build(self, credentials: ShipmentCreateSerializer) -> Shipment:
+        """Unsaved shipment for a row; raises ValueError for anything the schema cannot check."""
+        destination = self.destinations.get(credentials.destination_branch_slug)
+        if destination is None:
+            raise ValueError(f"Unknown destination branch: {credentials.destination_branch_slug}")
+        bus = None
+        if credentials.bus_slug:
+            bus = self.buses.get(credentials.bus_slug)
+            if bus is None:
+                raise ValueError(f"Unknown bus: {credentials.bus_slug}")
+        if credentials.payment_mode not in PaymentMode.values:
+            raise ValueError(f"Payment mode must be one of: {', '.join(PaymentMode.values)}")
+        try:
+            day = date.fromisoformat(credentials.day) if credentials.day else self.source_branch.current_operational_date
+            price = Decimal(str(credentials.price)).quantize(Decimal('0.01'))
+        except (ValueError, InvalidOperation) as e:
+            raise ValueError(f"Invalid day or price: {e}")
+
+        prefix = destination.title[0].upper() if destination.title else "X"
+        shipment = Shipment(
+            tracking_id=generate_tracking_id(prefix),
+            organization=self.organization,
+            source_branch=self.source_branch,
+            destination_branch=destination,
+            bus=bus,
+            sender_name=credentials.sender_name,
+            sender_phone=credentials.sender_phone,
+            receiver_name=credentials.receiver_name,
+            receiver_phone=credentials.receiver_phone,
+            description=credentials.description,
+            price=price,
+            payment_mode=credentials.payment_mode,
+            current_status=ShipmentStatus.BOOKED,
+            day=day,
+        )
+        shipment.set_last_event(self.source_branch.title, IMPORT_REMARKS)
+        return shipment
+
+    def run(self, rows) -> ImportReport:
+        """Book every valid row of `rows` (from `read_rows`)."""
+        chunk = []
+        for row_number, row in rows:
+            if isinstance(row, str):
+                self.report.error(row_number, row)
+                continue
+            try:
+                chunk.append((row_number, self.build(row)))
+            except ValueError as e:
+                self.report.error(row_number, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self.flush(chunk)
+                chunk = []
+        if chunk:
+            self.flush(chunk)
+        return self.report
+
+    def flush(self, chunk):
+        try:
+            self.insert(chunk)
+        except DatabaseError:
+            # Find the offending rows; the rest still go in
+            for row_number, shipment in chunk:
+                shipment.pk = None
+                shipment._state.adding = True
+                try:
+                    self.insert([(row_number, shipment)])
+                except DatabaseError as e:
+                    self.report.error(row_number, str(e))
+                else:
+                    self.report.created.append([row_number, shipment.tracking_id])
+        else:
+            self.report.created.extend([row_number, shipment.tracking_id] for row_number, shipment in chunk)
+
+    @transaction.atomic
+    def insert(self, chunk):
+        shipments = Shipment.objects.bulk_create([shipment for _, shipment in chunk])
+        ShipmentHistory.objects.bulk_create([
+            ShipmentHistory(
+                shipment=shipment,
+                status=ShipmentStatus.BOOKED,
+                location=shipment.last_location,
+                remarks=shipment.last_remarks
+            )
+            for shipment in shipments
+        ])
+        record_shipment_created(*shipments)
+        messages = []
+        sms = []
+        for shipment in shipments:
+            template_data = {
+                "tracking_id": shipment.tracking_id,
+                "sender_name": shipment.sender_name,
+                "receiver_name": shipment.receiver_name,
+                "source": self.source_branch.title,
+                "destination": shipment.destination_branch.title
+            }
+            if self.organization.owner_id:
+                messages.append((self.organization.owner_id, ADMIN_SHIPMENT_CREATED_TEMPLATE.format(**template_data)))
+            owner_id = shipment.destination_branch.owner_id
+            if owner_id and owner_id != self.user_id:
+                messages.append((owner_id, f"Incoming shipment {shipment.tracking_id} from {self.source_branch.title} is on its way!"))
+            if self.send_sms:
+                sms.append((shipment.sender_phone, SENDER_SHIPMENT_CREATED_TEMPLATE.format(**template_data)))
+                sms.append((shipment.receiver_phone, RECEIVER_SHIPMENT_CREATED_TEMPLATE.format(**template_data)))
+        enqueue_notifications(self.organization, messages=messages, sms=sms)
+        publish_shipments_event(SHIPMENTS_CREATED, shipments)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from organization.models import Branch, Bus
+from shipment.importer import ShipmentImporter, read_rows, IMPORT_CHUNK_SIZE, IMPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = "Book shipments for a branch from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header row) or NDJSON file, one shipment per row")
+        parser.add_argument('--branch', required=True, help="Slug of the source branch")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults from the file extension")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help=f"Rows per transaction (default: {IMPORT_CHUNK_SIZE})")
+        parser.add_argument('--no-sms', action='store_true', help="Do not queue SMS to senders and receivers")
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.select_related('organization').get(slug=options['branch'])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch '{options['branch']}' not found")
+        organization = branch.organization
+        import_format = options['format'] or ('ndjson' if options['path'].endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        importer = ShipmentImporter(
+            organization,
+            branch,
+            Branch.objects.filter(organization=organization),
+            Bus.objects.filter(organization=organization),
+            send_sms=not options['no_sms'],
+            chunk_size=options['chunk_size'],
+        )
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = importer.run(read_rows(stream, import_format))
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f"... and {report.failed - len(report.errors)} more errors")
+        rate = len(report.created) / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(report.created)} shipments ({report.failed} rows failed) in {elapsed:.1f}s, {rate:.0f} rows/min"
+        ))
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class ConcurrentAddIndex(AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on PostgreSQL, so writes are not locked out; a plain AddIndex elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('organization', '0009_branch_bus_slug_indexes'),
+        ('shipment', '0004_merge_20260131_0758'),
+    ]
+
+    operations = [
+        ConcurrentAddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['organization', '-created_at', '-id'], name='shipment_org_created_idx'),
+        ),
+        ConcurrentAddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['organization', 'day'], name='shipment_org_day_idx'),
+        ),
+        ConcurrentAddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['source_branch', '-created_at', '-id'], name='shipment_src_created_idx'),
+        ),
+        ConcurrentAddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['destination_branch', '-created_at', '-id'], name='shipment_dst_created_idx'),
+        ),
+        ConcurrentAddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['organization', 'updated_at'], name='shipment_org_updated_idx'),
+        ),
+        ConcurrentAddIndex(
+            model_name='shipmenthistory',
+            index=models.Index(fields=['shipment', '-created_at', '-id'], name='history_shipment_created_idx'),
+        ),
+    ]
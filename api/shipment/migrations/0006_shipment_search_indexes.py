@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:00
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class PostgresRunSQL(migrations.RunSQL):
+    """RunSQL that is skipped on databases other than PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+# Search indexes (analytics/search.py). They use PostgreSQL-only operator
+# classes, so they stay out of model state: a table remake on SQLite would
+# otherwise try to re-create them.
+SEARCH_INDEXES = {
+    'shipment_tracking_prefix_idx': "btree (tracking_id varchar_pattern_ops)",
+    'shipment_tracking_trgm_idx': "gin (tracking_id gin_trgm_ops)",
+    'shipment_sender_trgm_idx': "gin (sender_name gin_trgm_ops)",
+    'shipment_receiver_trgm_idx': "gin (receiver_name gin_trgm_ops)",
+}
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('shipment', '0005_shipment_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ] + [
+        PostgresRunSQL(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON shipment_shipment USING {definition}",
+            f"DROP INDEX CONCURRENTLY IF EXISTS {name}",
+        )
+        for name, definition in SEARCH_INDEXES.items()
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+def create_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE SEQUENCE IF NOT EXISTS shipment_tracking_block_seq START 1")
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP SEQUENCE IF EXISTS shipment_tracking_block_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment', '0006_shipment_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingIdBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:00
+
+import core.utils
+from django.db import migrations, models
+
+
+class AlterFieldIndexConcurrently(migrations.AlterField):
+    """
+    On PostgreSQL, build the indexes `db_index=True` adds (btree and LIKE) with
+    CREATE INDEX CONCURRENTLY, under Django's names, so writes are not locked
+    out; a plain AlterField elsewhere.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        column = model._meta.get_field(self.name).column
+        table = model._meta.db_table
+        quote = schema_editor.quote_name
+        for suffix, opclass in (("", ""), ("_like", " varchar_pattern_ops")):
+            name = schema_editor._create_index_name(table, [column], suffix=suffix)
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} ON {quote(table)} ({quote(column)}{opclass})"
+            )
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('shipment', '0007_tracking_id_blocks'),
+    ]
+
+    operations = [
+        AlterFieldIndexConcurrently(
+            model_name='shipment',
+            name='slug',
+            field=models.CharField(db_index=True, default=core.utils.generate_unique_hash, max_length=32),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_last_event(apps, schema_editor):
+    Shipment = apps.get_model('shipment', 'Shipment')
+    ShipmentHistory = apps.get_model('shipment', 'ShipmentHistory')
+    latest = ShipmentHistory.objects.filter(shipment=OuterRef('pk')).order_by('-created_at', '-id')
+    Shipment.objects.update(
+        last_location=Subquery(latest.values('location')[:1]),
+        last_remarks=Subquery(latest.values('remarks')[:1]),
+        last_event_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment', '0008_shipment_slug_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='last_location',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='last_remarks',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_last_event, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-17 18:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+SEQUENCE_NAME = 'shipment_tracking_block_seq'
+
+
+def to_ranges(apps, schema_editor):
+    """Blocks were numbered and multiplied by each process's block size; continue past the last one."""
+    block_size = settings.TRACKING_ID_BLOCK_SIZE
+    if schema_editor.connection.vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value FROM {SEQUENCE_NAME}")
+            last_block = cursor.fetchone()[0]
+        # nextval now returns the end of a block of INCREMENT BY numbers
+        schema_editor.execute(
+            f"ALTER SEQUENCE {SEQUENCE_NAME} INCREMENT BY {block_size} RESTART WITH {(last_block + 2) * block_size}"
+        )
+        return
+
+    TrackingIdBlock = apps.get_model('shipment', 'TrackingIdBlock')
+    last = TrackingIdBlock.objects.order_by('-pk').first()
+    TrackingIdBlock.objects.all().delete()
+    if last is not None:
+        TrackingIdBlock.objects.create(start=0, size=(last.pk + 1) * block_size)
+
+
+def to_block_numbers(apps, schema_editor):
+    block_size = settings.TRACKING_ID_BLOCK_SIZE
+    if schema_editor.connection.vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value FROM {SEQUENCE_NAME}")
+            end = cursor.fetchone()[0]
+        schema_editor.execute(
+            f"ALTER SEQUENCE {SEQUENCE_NAME} INCREMENT BY 1 RESTART WITH {-(-end // block_size) + 1}"
+        )
+        return
+
+    TrackingIdBlock = apps.get_model('shipment', 'TrackingIdBlock')
+    last = TrackingIdBlock.objects.order_by('-start').first()
+    TrackingIdBlock.objects.all().delete()
+    if last is not None:
+        TrackingIdBlock.objects.create(pk=-(-(last.start + last.size) // block_size), start=0, size=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment', '0009_shipment_last_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trackingidblock',
+            name='start',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='trackingidblock',
+            name='size',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(to_ranges, to_block_numbers),
+        migrations.AlterField(
+            model_name='trackingidblock',
+            name='start',
+            field=models.BigIntegerField(unique=True),
+        ),
+    ]
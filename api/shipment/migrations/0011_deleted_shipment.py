@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment', '0010_tracking_id_block_ranges'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedShipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization_id', models.BigIntegerField()),
+                ('tracking_id', models.CharField(max_length=20)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization_id', 'deleted_at'], name='deleted_shipment_org_idx')],
+            },
+        ),
+    ]
@@ -6,11 +6,11 @@ from django.db import models
 from django.utils import timezone
 from core.models import BaseModel
 from organization.models import Organization, Branch, Bus
-import random
-import string
+from . import tracking
 
 def generate_tracking_id(prefix="TRK"):
-    return f"{prefix}-{''.join(random.choices(string.digits, k=6))}"
+    """Collision-free tracking id, see shipment/tracking.py."""
+    return tracking.generate_tracking_id(prefix)
 
 class ShipmentStatus(models.TextChoices):
     BOOKED = 'BOOKED', 'Booked'
@@ -41,9 +41,49 @@ class Shipment(BaseModel):
     current_status = models.CharField(max_length=20, choices=ShipmentStatus.choices, default=ShipmentStatus.BOOKED)
     day = models.DateField(default=timezone.now)
     
+    # Copy of the latest history entry, written in the same transaction as it,
+    # so lists and tracking summaries need no history query
+    last_location = models.CharField(max_length=255, null=True, blank=True)
+    last_remarks = models.TextField(null=True, blank=True)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Organization lists and analytics pages: keyset on (created_at, id)
+            models.Index(fields=['organization', '-created_at', '-id'], name='shipment_org_created_idx'),
+            # Day ranges: 7-day list window, list ETags, analytics filters
+            models.Index(fields=['organization', 'day'], name='shipment_org_day_idx'),
+            # Branch lists and branch analytics (source OR destination)
+            models.Index(fields=['source_branch', '-created_at', '-id'], name='shipment_src_created_idx'),
+            models.Index(fields=['destination_branch', '-created_at', '-id'], name='shipment_dst_created_idx'),
+            # Delta sync (`since` watermark)
+            models.Index(fields=['organization', 'updated_at'], name='shipment_org_updated_idx'),
+            # Search indexes (analytics/search.py) are PostgreSQL only and kept
+            # out of model state; see migration 0006.
+        ]
+    
     def __str__(self):
         return f"{self.tracking_id} ({self.sender_name} -> {self.receiver_name})"
 
+    def set_last_event(self, location, remarks=None, at=None):
+        """Record the event a history entry is being written for; the caller saves both."""
+        self.last_location = location
+        self.last_remarks = remarks
+        self.last_event_at = at or timezone.now()
+
+    @property
+    def latest_event(self):
+        """The latest history entry, rebuilt from the denormalized fields without a query."""
+        if self.last_event_at is None:
+            return None
+        return ShipmentHistory(
+            shipment_id=self.pk,
+            status=self.current_status,
+            location=self.last_location,
+            remarks=self.last_remarks,
+            created_at=self.last_event_at
+        )
+
 class ShipmentHistory(models.Model):
     shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='history')
     status = models.CharField(max_length=20, choices=ShipmentStatus.choices)
@@ -54,6 +94,37 @@ class ShipmentHistory(models.Model):
     class Meta:
         verbose_name_plural = "Shipment Histories"
         ordering = ['-created_at']
+        indexes = [
+            # History per shipment, newest first (detail and tracking views)
+            models.Index(fields=['shipment', '-created_at', '-id'], name='history_shipment_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.shipment.tracking_id} - {self.status} at {self.location}"
+
+class TrackingIdBlock(models.Model):
+    """
+    Ranges of tracking numbers, [start, start + size), handed out on databases
+    without sequences; on PostgreSQL `shipment_tracking_block_seq` is used instead.
+    """
+    start = models.BigIntegerField(unique=True)
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class DeletedShipment(models.Model):
+    """
+    Tombstone of a deleted shipment, so a list delta sync (`since`) can tell
+    clients to drop it. Written by shipment/signals.py; a plain organization id
+    rather than a foreign key, so it survives the cascade that deleted it.
+    """
+    organization_id = models.BigIntegerField()
+    tracking_id = models.CharField(max_length=20)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization_id', 'deleted_at'], name='deleted_shipment_org_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.shipment.tracking_id} - {self.status} at {self.location}"
\ No newline at end of file
+        return f"{self.tracking_id} deleted at {self.deleted_at}"
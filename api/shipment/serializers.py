@@ -33,6 +33,7 @@ class ShipmentSerializer(Serializer):
     destination_branch: Annotated[BranchMinimalSerializer, Nested(BranchMinimalSerializer)]
     bus: Annotated[BusMinimalSerializer | None, Nested(BusMinimalSerializer)] = None
     history: Annotated[list[ShipmentHistorySerializer], Nested(ShipmentHistorySerializer, many=True)]
+    latest_event: Annotated[ShipmentHistorySerializer | None, Nested(ShipmentHistorySerializer)] = None  # list views only, from Shipment.last_* (no history query)
     created_at: str
     day: str  # DateField serializes as ISO date string (YYYY-MM-DD)
     
@@ -42,7 +43,7 @@ class ShipmentSerializer(Serializer):
                 "slug", "tracking_id", "sender_name", "sender_phone",
                 "receiver_name", "receiver_phone", "description",
                 "price", "payment_mode", "current_status",
-                "source_branch", "destination_branch", "bus", "history", "created_at", "day"
+                "source_branch", "destination_branch", "bus", "latest_event", "created_at", "day"
             ],
             "detail": [
                 "slug", "tracking_id", "sender_name", "sender_phone", 
@@ -68,3 +69,11 @@ class ShipmentCreateSerializer(Serializer):
 class ShipmentStatusUpdateSerializer(Serializer):
     status: str
     remarks: str | None = None
+
+class ShipmentBulkStatusUpdateSerializer(Serializer):
+    status: str
+    remarks: str | None = None
+    # Either scanned tracking IDs, or a bus and day (defaults to the branch operational date)
+    tracking_ids: Annotated[list[str], Meta(max_length=1000)] = []
+    bus_slug: str | None = None
+    day: str | None = None  # ISO date string (YYYY-MM-DD)
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from shipment.cache import invalidate_tracking
+from shipment.models import DeletedShipment, Shipment, ShipmentHistory
+
+# List deltas reset at the start of each UTC day (shipment/api.py), so older
+# tombstones are never read
+TOMBSTONE_TTL = timedelta(days=2)
+
+
+# Evict after commit, so a concurrent reader cannot re-cache the old row
+# between the delete and the commit.
+
+@receiver(post_save, sender=Shipment)
+@receiver(post_delete, sender=Shipment)
+def invalidate_on_shipment_change(sender, instance, **kwargs):
+    tracking_id = instance.tracking_id
+    transaction.on_commit(lambda: invalidate_tracking(tracking_id))
+
+
+@receiver(post_save, sender=ShipmentHistory)
+@receiver(post_delete, sender=ShipmentHistory)
+def invalidate_on_history_change(sender, instance, **kwargs):
+    if ShipmentHistory._meta.get_field('shipment').is_cached(instance):
+        tracking_id = instance.shipment.tracking_id
+    else:
+        tracking_id = Shipment.objects.filter(pk=instance.shipment_id).values_list('tracking_id', flat=True).first()
+    transaction.on_commit(lambda: invalidate_tracking(tracking_id))
+
+
+@receiver(post_delete, sender=Shipment)
+def record_tombstone(sender, instance, **kwargs):
+    DeletedShipment.objects.filter(
+        organization_id=instance.organization_id, deleted_at__lt=timezone.now() - TOMBSTONE_TTL
+    ).delete()
+    DeletedShipment.objects.create(organization_id=instance.organization_id, tracking_id=instance.tracking_id)
@@ -1,3 +1,628 @@
-from django.test import TestCase
+import json
+import io
+import random
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from analytics.api import build_analytics_data, build_shipment_query
+from analytics.models import DailyShipmentRollup
+from analytics.rollup import rebuild_rollup
+from analytics.search import ranked_search
+from analytics.serializers import AnalyticsFilterSerializer
+from core.principal import Principal, branch_cache
+from Messaging.api import inbox, inbox_page, unread_count
+from Messaging.models import Message, NotificationOutbox, OutboxChannel
+from organization.cache import tenant_cache, tenant_related_cache
+from organization.models import Organization, Branch, Bus, weekday_mask
+from shipment.api import (
+    bulk_transition_shipments, create_shipment, recent_shipments, shipment_list_page, shipment_list_response,
+    transition_shipment,
+)
+from shipment.cache import aget_tracking, fetch_tracking, tracking_cache
+from shipment.importer import ShipmentImporter, read_rows
+from shipment.models import Shipment, ShipmentHistory, ShipmentStatus, PaymentMode
+from shipment.serializers import ShipmentCreateSerializer
+from shipment.tracking import (
+    ALPHABET, SEQUENCE_NAME, TrackingIdAllocator, allocator as tracking_allocator, encode_tracking_number,
+    is_valid_code, normalize_tracking_id, generate_tracking_id
+)
+
+# Seed size: enough organizations and days that one tenant's slice of a table
+# is small, as in production, so the planner has a reason to prefer an index.
+ORGANIZATIONS = 40
+BRANCHES_PER_ORGANIZATION = 6
+SHIPMENTS_PER_ORGANIZATION = 1000
+DAYS = 180
+
+FIRST_NAMES = [f"{syllable}{ending}" for syllable in ("Ra", "Su", "Ma", "Ki", "De", "Ha", "Pri", "Ani", "Vi", "Jo") for ending in ("mesh", "nita", "ran", "shan", "vya")]
+LAST_NAMES = [f"{prefix}{suffix}" for prefix in ("Pat", "Sha", "Des", "Mehta", "Jo", "Tri", "Bha", "Chau", "Ka", "Nai") for suffix in ("el", "rma", "ai", "shi", "vedi")]
+
+# Tables where a sequential scan means a missing or unusable index
+LARGE_TABLES = {
+    Shipment._meta.db_table,
+    ShipmentHistory._meta.db_table,
+    Message._meta.db_table,
+    DailyShipmentRollup._meta.db_table,
+}
+
+
+def seq_scans(plan: dict):
+    """Relation names read by a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Query plans are checked against PostgreSQL")
+class QueryPlanTests(TestCase):
+    """
+    Runs the queries behind each hot endpoint against a seeded database and
+    fails if any of them plans a sequential scan on a large table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(42)
+        today = timezone.now().date()
+
+        organizations = Organization.objects.bulk_create([
+            Organization(title=f"Org {i}", subdomain=f"org{i}", slug=f"org{i}")
+            for i in range(ORGANIZATIONS)
+        ])
+        users = User.objects.bulk_create([
+            User(username=f"branch-{o.pk}-{i}")
+            for o in organizations for i in range(BRANCHES_PER_ORGANIZATION)
+        ])
+        branches = Branch.objects.bulk_create([
+            Branch(organization=o, title=f"Branch {i}", slug=f"b{o.pk}-{i}", owner=users[n * BRANCHES_PER_ORGANIZATION + i])
+            for n, o in enumerate(organizations) for i in range(BRANCHES_PER_ORGANIZATION)
+        ])
+        buses = Bus.objects.bulk_create([
+            Bus(organization=o, bus_number=f"GJ-{o.pk}-{i}", slug=f"bus{o.pk}-{i}", preferred_days=[1, 3, 5], weekday_mask=weekday_mask([1, 3, 5]))
+            for o in organizations for i in range(3)
+        ])
+
+        shipments = []
+        for n, organization in enumerate(organizations):
+            org_branches = branches[n * BRANCHES_PER_ORGANIZATION:(n + 1) * BRANCHES_PER_ORGANIZATION]
+            org_buses = buses[n * 3:(n + 1) * 3]
+            for i in range(SHIPMENTS_PER_ORGANIZATION):
+                source, destination = rng.sample(org_branches, 2)
+                shipments.append(Shipment(
+                    tracking_id=f"T{organization.pk}-{i}",
+                    slug=f"s{organization.pk}-{i}",
+                    organization=organization,
+                    source_branch=source,
+                    destination_branch=destination,
+                    bus=rng.choice(org_buses),
+                    sender_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    sender_phone="9000000000",
+                    receiver_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    receiver_phone="9000000001",
+                    price=Decimal(rng.randint(50, 2000)),
+                    payment_mode=rng.choice(PaymentMode.values),
+                    current_status=rng.choice(ShipmentStatus.values),
+                    day=today - timedelta(days=rng.randrange(DAYS)),
+                ))
+        shipments = Shipment.objects.bulk_create(shipments, batch_size=2000)
+
+        ShipmentHistory.objects.bulk_create([
+            ShipmentHistory(shipment=shipment, status=status, location=shipment.source_branch.title)
+            for shipment in shipments for status in (ShipmentStatus.BOOKED, shipment.current_status)
+        ], batch_size=5000)
+        Message.objects.bulk_create([
+            Message(organization=shipment.organization, user_id=shipment.source_branch.owner_id, content=shipment.tracking_id)
+            for shipment in shipments
+        ], batch_size=5000)
+
+        with connection.cursor() as cursor:
+            # Spread creation times over the shipment day, as real bookings are
+            cursor.execute(
+                f"UPDATE {Shipment._meta.db_table} "
+                f"SET created_at = day::timestamptz + (id % 86400) * interval '1 second', "
+                f"updated_at = day::timestamptz + (id % 86400) * interval '1 second'"
+            )
+        rebuild_rollup()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.organization = organizations[0]
+        cls.branch = branches[0]
+        cls.shipment = Shipment.objects.filter(organization=cls.organization).first()
+
+    def assertNoSeqScans(self, run):
+        """Run `run` (a coroutine function), then EXPLAIN every SELECT it issued."""
+        with CaptureQueriesContext(connection) as context:
+            async_to_sync(run)()
+        selects = [query["sql"] for query in context.captured_queries if query["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects, "No queries were captured")
+
+        with connection.cursor() as cursor:
+            for sql in selects:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scanned = LARGE_TABLES.intersection(seq_scans(plan[0]["Plan"]))
+                self.assertFalse(scanned, f"Sequential scan on {', '.join(sorted(scanned))}:\n{sql}")
+
+    def list_request(self):
+        return SimpleNamespace(headers={}, state={"organization": self.organization})
+
+    def test_organization_shipment_list(self):
+        async def run():
+            await shipment_list_response(
+                self.list_request(), recent_shipments(self.organization), ("organization", self.organization.id),
+                "", None, 50, None
+            )
+        self.assertNoSeqScans(run)
+
+    def test_branch_shipment_list(self):
+        async def run():
+            query = recent_shipments(self.organization).filter(
+                Q(source_branch_id=self.branch.id) | Q(destination_branch_id=self.branch.id)
+            )
+            await shipment_list_response(self.list_request(), query, ("branch", self.branch.id), "", None, 50, None)
+        self.assertNoSeqScans(run)
+
+    def test_shipment_list_delta(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        async def run():
+            await shipment_list_response(
+                self.list_request(), recent_shipments(self.organization), ("organization", self.organization.id),
+                "", None, 50, since
+            )
+        self.assertNoSeqScans(run)
+
+    def test_tracking(self):
+        async def run():
+            await fetch_tracking(self.shipment.tracking_id)
+        self.assertNoSeqScans(run)
+
+    def test_organization_analytics(self):
+        filters = AnalyticsFilterSerializer(start_date=(timezone.now().date() - timedelta(days=30)).isoformat())
+
+        async def run():
+            query = build_shipment_query(self.organization, filters)
+            await build_analytics_data(self.organization, filters, query)
+        self.assertNoSeqScans(run)
+
+    def test_organization_analytics_raw_summary(self):
+        # A price filter forces the summary onto raw shipments instead of the rollup
+        filters = AnalyticsFilterSerializer(
+            start_date=(timezone.now().date() - timedelta(days=30)).isoformat(),
+            payment_mode=PaymentMode.SENDER_PAYS,
+            min_price=100,
+        )
+
+        async def run():
+            query = build_shipment_query(self.organization, filters)
+            await build_analytics_data(self.organization, filters, query)
+        self.assertNoSeqScans(run)
+
+    def test_branch_analytics(self):
+        filters = AnalyticsFilterSerializer()
+
+        async def run():
+            query = build_shipment_query(self.organization, filters, user_branch=self.branch.id)
+            await build_analytics_data(self.organization, filters, query, user_branch=self.branch.id)
+        self.assertNoSeqScans(run)
+
+    def test_messages(self):
+        async def run():
+            query = inbox(self.organization, self.branch.owner_id)
+            page = await inbox_page(query, None, 50)
+            await inbox_page(query, page["next_cursor"], 50)
+            await unread_count(self.organization, self.branch.owner_id)
+        self.assertNoSeqScans(run)
+
+    def test_analytics_search_by_name(self):
+        filters = AnalyticsFilterSerializer(search=self.shipment.sender_name)
+
+        async def run():
+            query = build_shipment_query(self.organization, filters)
+            await build_analytics_data(self.organization, filters, query)
+        self.assertNoSeqScans(run)
+
+    def test_ranked_search(self):
+        async def run():
+            for term in (self.shipment.tracking_id[:4], self.shipment.receiver_name):
+                [shipment async for shipment in ranked_search(Shipment.objects.filter(organization=self.organization), term)]
+        self.assertNoSeqScans(run)
+
+
+class ShipmentSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Search Org", subdomain="search")
+        source = Branch.objects.create(organization=cls.organization, title="Surat")
+        destination = Branch.objects.create(organization=cls.organization, title="Ahmedabad")
+        cls.shipment = Shipment.objects.create(
+            organization=cls.organization, source_branch=source, destination_branch=destination,
+            sender_name="Ramesh Patel", sender_phone="9000000000",
+            receiver_name="Sunita Shah", receiver_phone="9000000001", price=Decimal("100.00"),
+        )
+
+    def search(self, term):
+        async def run():
+            return [shipment async for shipment in ranked_search(Shipment.objects.filter(organization=self.organization), term)]
+        return async_to_sync(run)()
+
+    def test_tracking_id_matches_by_prefix_or_code(self):
+        tracking_id = self.shipment.tracking_id
+        self.assertEqual(self.search(tracking_id[:2].lower()), [self.shipment])
+        # The code alone, without the destination prefix
+        self.assertEqual(self.search(tracking_id[2:7]), [self.shipment])
+
+    def test_short_terms_only_match_the_start_of_an_id(self):
+        self.assertEqual(self.search(self.shipment.tracking_id[3:5]), [])
+
+
+# Round trips for a booking once the tenant, branch and bus caches are warm:
+# SAVEPOINT, INSERT shipment, INSERT history, upsert rollup, INSERT outbox, RELEASE
+BOOKING_QUERY_BUDGET = 6
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BookingQueryBudgetTests(TestCase):
+    """Keeps create_shipment on its low-query path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username="budget-owner")
+        cls.organization = Organization.objects.create(title="Budget Org", subdomain="budget", owner=cls.owner)
+        cls.clerk = User.objects.create(username="budget-clerk")
+        cls.receiver = User.objects.create(username="budget-receiver")
+        cls.source = Branch.objects.create(organization=cls.organization, title="Surat", owner=cls.clerk)
+        cls.destination = Branch.objects.create(organization=cls.organization, title="Ahmedabad", owner=cls.receiver)
+        cls.bus = Bus.objects.create(organization=cls.organization, bus_number="GJ-05-1234", preferred_days=[1, 2, 3, 4, 5])
+
+    def setUp(self):
+        for cache in (tenant_cache, tenant_related_cache, branch_cache):
+            cache.local.clear()
+
+    def book(self):
+        request = SimpleNamespace(headers={}, state={"organization": self.organization})
+        user = Principal(
+            user_id=self.clerk.id,
+            branch_id=self.source.id,
+            organization_id=self.organization.id,
+            permissions=frozenset({"organization.is_branch_admin"}),
+        )
+        credentials = ShipmentCreateSerializer(
+            sender_name="Ramesh Patel",
+            sender_phone="9000000000",
+            receiver_name="Sunita Shah",
+            receiver_phone="9000000001",
+            price=250.0,
+            destination_branch_slug=self.destination.slug,
+            bus_slug=self.bus.slug,
+        )
+        return async_to_sync(create_shipment)(request, credentials, user=user)
+
+    def test_booking_stays_within_query_budget(self):
+        # The first booking warms the caches and creates the rollup bucket
+        self.assertEqual(self.book().status_code, 201)
+
+        with CaptureQueriesContext(connection) as context:
+            result = self.book()
+
+        self.assertEqual(result.status_code, 201)
+        self.assertLessEqual(
+            len(context), BOOKING_QUERY_BUDGET,
+            "\n".join(query["sql"] for query in context.captured_queries)
+        )
+        # Three staff messages and two SMS per booking, left for the outbox worker
+        outbox = NotificationOutbox.objects.filter(organization=self.organization)
+        self.assertEqual(outbox.filter(channel=OutboxChannel.MESSAGE).count(), 6)
+        self.assertEqual(outbox.filter(channel=OutboxChannel.SMS).count(), 4)
+        self.assertFalse(Message.objects.filter(organization=self.organization).exists())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ShipmentListSyncTests(TestCase):
+    """ETags and `since` deltas notice every way a row can change or leave the list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Sync Org", subdomain="sync")
+        cls.source = Branch.objects.create(organization=cls.organization, title="Surat")
+        cls.destination = Branch.objects.create(organization=cls.organization, title="Vadodara")
+        cls.bus = Bus.objects.create(organization=cls.organization, bus_number="GJ-06-1111", preferred_days=[1, 2, 3, 4, 5])
+        today = timezone.now().date()
+        cls.on_bus, cls.walk_in, cls.aged = Shipment.objects.bulk_create([
+            Shipment(
+                organization=cls.organization, source_branch=cls.source, destination_branch=cls.destination,
+                bus=bus, sender_name="Ramesh Patel", sender_phone="9000000000",
+                receiver_name="Sunita Shah", receiver_phone="9000000001", price=Decimal(100),
+                payment_mode=PaymentMode.values[0], current_status=ShipmentStatus.BOOKED, day=day,
+            )
+            for bus, day in ((cls.bus, today), (None, today), (None, today - timedelta(days=8)))
+        ])
+        two_days_ago = timezone.now() - timedelta(days=2)
+        for model in (Shipment, Branch, Bus):
+            model.objects.filter(organization=cls.organization).update(updated_at=two_days_ago)
+
+    def list(self, since=None, statuses=(), etag=None):
+        request = SimpleNamespace(headers={"if-none-match": etag} if etag else {}, state={"organization": self.organization})
+        return async_to_sync(shipment_list_response)(
+            request, recent_shipments(self.organization), ("organization", self.organization.id),
+            "", None, 50, since, statuses
+        )
+
+    def etag(self, statuses=()):
+        return self.list(statuses=statuses).headers["ETag"]
+
+    def delta(self, since, statuses=()):
+        data = self.list(since=since, statuses=statuses).data["data"]
+        self.assertFalse(data["reset"])
+        return {shipment.tracking_id for shipment in data["results"]}, set(data["removed"])
+
+    def test_renaming_a_bus_changes_the_etag_and_resends_its_rows(self):
+        etag, watermark = self.etag(), timezone.now().isoformat()
+        self.assertEqual(self.list(etag=etag).status_code, 304)
+
+        self.bus.bus_number = "GJ-06-2222"
+        self.bus.save()
+
+        self.assertEqual(self.list(etag=etag).status_code, 200)
+        self.assertEqual(self.delta(watermark), ({self.on_bus.tracking_id}, set()))
+
+    def test_deleted_shipments_are_removed(self):
+        etag, watermark = self.etag(), timezone.now().isoformat()
+
+        self.walk_in.delete()
+
+        self.assertEqual(self.list(etag=etag).status_code, 200)
+        self.assertEqual(self.delta(watermark), (set(), {self.walk_in.tracking_id}))
+
+    def test_shipments_leaving_the_status_filter_are_removed(self):
+        statuses = [ShipmentStatus.BOOKED]
+        etag, watermark = self.etag(statuses), timezone.now().isoformat()
+
+        transition_shipment(self.on_bus, ShipmentStatus.IN_TRANSIT, self.source.title)
+
+        self.assertEqual(self.list(statuses=statuses, etag=etag).status_code, 200)
+        self.assertEqual(self.delta(watermark, statuses), (set(), {self.on_bus.tracking_id}))
+        self.assertEqual(self.delta(watermark), ({self.on_bus.tracking_id}, set()))
+
+    def test_shipments_leaving_the_window_are_removed(self):
+        yesterday = (timezone.now() - timedelta(days=1)).isoformat()
+
+        self.assertEqual(self.delta(yesterday), (set(), {self.aged.tracking_id}))
+        self.assertEqual(self.delta(timezone.now().isoformat()), (set(), set()))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BulkStatusTests(TestCase):
+    """A bus load moves in a fixed number of queries, whatever its size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(title="Bulk Org", subdomain="bulk")
+        cls.source = Branch.objects.create(organization=cls.organization, title="Surat")
+        cls.destination = Branch.objects.create(organization=cls.organization, title="Ahmedabad")
+        cls.bus = Bus.objects.create(organization=cls.organization, bus_number="GJ-05-1234", preferred_days=[1, 2, 3, 4, 5])
+        Shipment.objects.bulk_create([
+            Shipment(
+                organization=cls.organization, source_branch=cls.source, destination_branch=cls.destination,
+                bus=cls.bus, sender_name="Ramesh Patel", sender_phone="9000000000",
+                receiver_name="Sunita Shah", receiver_phone="9000000001", price=Decimal(100 + i),
+                payment_mode=PaymentMode.values[i % 2], current_status=ShipmentStatus.BOOKED,
+                day=timezone.now().date(),
+            )
+            for i in range(60)
+        ])
+        rebuild_rollup(cls.organization.id)
+
+    def rollup(self):
+        return sorted(DailyShipmentRollup.objects.filter(organization=self.organization).exclude(shipment_count=0).values_list(
+            'status', 'payment_mode', 'shipment_count', 'revenue'
+        ))
+
+    def test_bus_load_moves_in_constant_queries(self):
+        query = Shipment.objects.filter(organization=self.organization, bus=self.bus)
+
+        with CaptureQueriesContext(connection) as context:
+            updated, unchanged = bulk_transition_shipments(query, ShipmentStatus.IN_TRANSIT, self.source.title)
+
+        self.assertEqual((len(updated), len(unchanged)), (60, 0))
+        self.assertLessEqual(len(context), 12, "\n".join(query["sql"] for query in context.captured_queries))
+        self.assertFalse(query.exclude(current_status=ShipmentStatus.IN_TRANSIT).exists())
+        self.assertEqual(ShipmentHistory.objects.filter(shipment__bus=self.bus, status=ShipmentStatus.IN_TRANSIT).count(), 60)
+
+        # The incremental rollup matches a rebuild from raw shipments
+        incremental = self.rollup()
+        rebuild_rollup(self.organization.id)
+        self.assertEqual(incremental, self.rollup())
+
+    def test_repeated_scan_is_unchanged(self):
+        ids = list(Shipment.objects.filter(organization=self.organization).values_list('pk', flat=True)[:5])
+        query = Shipment.objects.filter(pk__in=ids)
+        bulk_transition_shipments(query, ShipmentStatus.ARRIVED, self.destination.title)
+
+        updated, unchanged = bulk_transition_shipments(query, ShipmentStatus.ARRIVED, self.destination.title)
+
+        self.assertEqual((len(updated), len(unchanged)), (0, 5))
+        self.assertEqual(ShipmentHistory.objects.filter(status=ShipmentStatus.ARRIVED).count(), 5)
+
+    def test_single_transition_keeps_concurrent_edits(self):
+        shipment = Shipment.objects.filter(organization=self.organization).first()
+        Shipment.objects.filter(pk=shipment.pk).update(receiver_phone="9999999999")
+
+        transition_shipment(shipment, ShipmentStatus.IN_TRANSIT, self.source.title, "Loaded")
+
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.current_status, shipment.receiver_phone), (ShipmentStatus.IN_TRANSIT, "9999999999"))
+        self.assertEqual((shipment.last_location, shipment.last_remarks), (self.source.title, "Loaded"))
+
+    def test_status_change_evicts_the_cached_tracking_payload(self):
+        shipment = Shipment.objects.filter(organization=self.organization).first()
+        tracking_cache.local.clear()
+        tracking_cache.remote.clear()
+        tracking_status = lambda: async_to_sync(aget_tracking)(shipment.tracking_id)["payload"]["current_status"]
+        self.assertEqual(tracking_status(), ShipmentStatus.BOOKED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_shipment(shipment, ShipmentStatus.IN_TRANSIT, self.source.title)
+
+        self.assertEqual(tracking_status(), ShipmentStatus.IN_TRANSIT)
+
+    def test_lists_show_the_latest_event_without_reading_history(self):
+        query = Shipment.objects.filter(organization=self.organization, bus=self.bus)
+        bulk_transition_shipments(query, ShipmentStatus.IN_TRANSIT, self.source.title, "Loaded")
+
+        with CaptureQueriesContext(connection) as context:
+            page = async_to_sync(shipment_list_page)(query.select_related('source_branch', 'destination_branch', 'bus'), None, 10)
+
+        self.assertEqual(len(context), 1)
+        latest = page["results"][0].latest_event
+        self.assertEqual((latest.status, latest.location, latest.remarks), (ShipmentStatus.IN_TRANSIT, self.source.title, "Loaded"))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ShipmentImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="import-admin")
+        cls.receiving_owner = User.objects.create(username="import-receiver")
+        cls.organization = Organization.objects.create(title="Import Org", subdomain="import", owner=cls.admin)
+        cls.source = Branch.objects.create(organization=cls.organization, title="Surat")
+        cls.destination = Branch.objects.create(organization=cls.organization, title="Ahmedabad", owner=cls.receiving_owner)
+        cls.bus = Bus.objects.create(organization=cls.organization, bus_number="GJ-05-1234", preferred_days=[1, 2, 3, 4, 5])
+
+    def run_import(self, text, import_format, user_id=None):
+        importer = ShipmentImporter(
+            self.organization, self.source, [self.source, self.destination], [self.bus], chunk_size=2, user_id=user_id
+        )
+        return importer.run(read_rows(io.StringIO(text), import_format))
+
+    def test_csv_rows_are_booked_and_bad_rows_reported(self):
+        header = "sender_name,sender_phone,receiver_name,receiver_phone,price,destination_branch_slug,bus_slug,day\n"
+        rows = [
+            f"Ramesh Patel,9000000000,Sunita Shah,9000000001,250,{self.destination.slug},{self.bus.slug},2026-10-17",
+            f"Ramesh Patel,9000000000,Sunita Shah,9000000001,120.50,{self.destination.slug},,",
+            f"Ramesh Patel,123,Sunita Shah,9000000001,120,{self.destination.slug},,",
+            "Ramesh Patel,9000000000,Sunita Shah,9000000001,120,nowhere,,",
+            f"Ramesh Patel,9000000000,Sunita Shah,9000000001,99,{self.destination.slug},,",
+        ]
+
+        report = self.run_import(header + "\n".join(rows), "csv")
+
+        self.assertEqual([row for row, _ in report.created], [1, 2, 5])
+        self.assertEqual([error["row"] for error in report.errors], [3, 4])
+        shipments = Shipment.objects.filter(organization=self.organization)
+        self.assertEqual(shipments.count(), 3)
+        self.assertEqual(ShipmentHistory.objects.filter(shipment__in=shipments).count(), 3)
+        self.assertEqual(
+            DailyShipmentRollup.objects.filter(organization=self.organization).aggregate(total=Sum('shipment_count'))['total'], 3
+        )
+        self.assertEqual(NotificationOutbox.objects.filter(organization=self.organization, channel=OutboxChannel.SMS).count(), 6)
+        # Same in-app notifications as a single booking: the admin and the receiving branch
+        messages = NotificationOutbox.objects.filter(organization=self.organization, channel=OutboxChannel.MESSAGE)
+        self.assertEqual(messages.filter(user=self.admin).count(), 3)
+        self.assertEqual(messages.filter(user=self.receiving_owner, content__startswith="Incoming shipment").count(), 3)
+
+    def test_importing_user_is_not_notified_of_their_own_bookings(self):
+        good = {
+            "sender_name": "Ramesh Patel", "sender_phone": "9000000000",
+            "receiver_name": "Sunita Shah", "receiver_phone": "9000000001",
+            "price": 250, "destination_branch_slug": self.destination.slug,
+        }
+
+        self.run_import(json.dumps(good), "ndjson", user_id=self.receiving_owner.id)
+
+        messages = NotificationOutbox.objects.filter(organization=self.organization, channel=OutboxChannel.MESSAGE)
+        self.assertEqual(list(messages.values_list('user_id', flat=True)), [self.admin.id])
+
+    def test_ndjson_rows_are_validated_with_the_booking_schema(self):
+        good = {
+            "sender_name": "Ramesh Patel", "sender_phone": "9000000000",
+            "receiver_name": "Sunita Shah", "receiver_phone": "9000000001",
+            "price": 250, "destination_branch_slug": self.destination.slug,
+        }
+        lines = [json.dumps(good), json.dumps({**good, "price": -1}), "{not json", "", json.dumps(good)]
+
+        report = self.run_import("\n".join(lines), "ndjson")
+
+        self.assertEqual([row for row, _ in report.created], [1, 5])
+        self.assertEqual([error["row"] for error in report.errors], [2, 3])
+        self.assertEqual(len({tracking_id for _, tracking_id in report.created}), 2)
+
+
+class TrackingIdTests(SimpleTestCase):
+
+    def test_codes_are_unique_and_fixed_length(self):
+        codes = {encode_tracking_number(number) for number in range(1000, 51000)}
+        self.assertEqual(len(codes), 50000)
+        self.assertEqual({len(code) for code in codes}, {8})
+
+    def test_check_character_catches_single_substitutions(self):
+        code = encode_tracking_number(123456789)
+        self.assertTrue(is_valid_code(code))
+        for position in range(len(code)):
+            for char in ALPHABET:
+                if char != code[position]:
+                    self.assertFalse(is_valid_code(code[:position] + char + code[position + 1:]))
+
+    def test_normalization_keeps_prefix(self):
+        self.assertEqual(normalize_tracking_id(" o-7kd3qxim "), "O-7KD3QX1M")
+
+
+class TrackingIdAllocationTests(TestCase):
+
+    def setUp(self):
+        # Blocks reserved by earlier tests were rolled back with them
+        tracking_allocator.reset()
+
+    def test_allocated_ids_are_distinct(self):
+        ids = [generate_tracking_id("A") for _ in range(2500)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(tracking_id.startswith("A-") and is_valid_code(tracking_id[2:]) for tracking_id in ids))
+
+    def test_block_reserved_in_a_rolled_back_transaction_is_dropped(self):
+        first, second = TrackingIdAllocator(block_size=10), TrackingIdAllocator(block_size=10)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                first.allocate()
+                raise RuntimeError("booking failed")
+
+        numbers = [second.allocate() for _ in range(5)] + [first.allocate() for _ in range(5)]
+
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+    def allocator(self, block_size: int) -> TrackingIdAllocator:
+        """An allocator reserving blocks of `block_size`, wherever the database keeps that size."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER SEQUENCE {SEQUENCE_NAME} INCREMENT BY {block_size}")
+        return TrackingIdAllocator(block_size=block_size)
+
+    def test_blocks_of_different_sizes_do_not_overlap(self):
+        large = self.allocator(1000)
+        numbers = [large.allocate()]
+        # A smaller block reserved while the large one is still being used up;
+        # numbering blocks by index would start it inside the large block
+        small = self.allocator(999)
+        numbers += [small.allocate() for _ in range(30)]
+        numbers += [large.allocate() for _ in range(999)]
+        larger = self.allocator(5000)
+        numbers += [larger.allocate() for _ in range(10)]
+        numbers += [small.allocate() for _ in range(30)]
+        numbers += [large.allocate() for _ in range(10)]
+
+        self.assertEqual(len(set(numbers)), len(numbers))
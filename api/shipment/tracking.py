@@ -0,0 +1,223 @@
+"""
+Tracking id allocation.
+
+Ids look like `A-7KD3QX9M`: the destination prefix, seven Crockford base32
+characters and a check character. Each process reserves a block of numbers
+with one `nextval` on a PostgreSQL sequence (other databases insert a
+`TrackingIdBlock` row instead) and hands them out from memory, so ids never
+collide, need no retry and cost one round trip per block. Numbers are permuted before encoding so consecutive bookings do not get
+guessable neighbouring ids.
+
+Blocks are ranges of numbers, not block indices, and their size is kept in the
+database: on PostgreSQL it is the sequence's INCREMENT BY (set from
+TRACKING_ID_BLOCK_SIZE by migration 0010) and `nextval` returns the end of a
+fresh block, so changing the increment can never overlap earlier blocks; other
+databases store each block's start and size. Processes configured with
+different block sizes therefore never hand out the same number. Unlike
+`nextval`, a `TrackingIdBlock` row is rolled back with the transaction that
+inserted it, so a block reserved inside one is only used by that transaction
+until it commits (`PendingBlock`).
+
+Crockford base32 has no I, L, O or U, and `normalize_tracking_id` maps the
+usual misreadings back, so ids survive being read out over the phone. The
+check character (Luhn mod 32) catches any single mistyped character and
+most swaps of adjacent ones.
+"""
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+
+from core.utils import CROCKFORD_ALPHABET as ALPHABET
+
+CODE_LENGTH = 7
+BITS = CODE_LENGTH * 5  # 34 billion ids before the code needs another character
+MASK = (1 << BITS) - 1
+SEQUENCE_NAME = "shipment_tracking_block_seq"
+
+# Misreadings accepted on input
+_NORMALIZE = str.maketrans({"O": "0", "I": "1", "L": "1"})
+
+
+def permute(number: int) -> int:
+    """Bijection on [0, 2**BITS): odd multiplications and xor-shifts, each invertible."""
+    x = (number * 0x2545F4914F) & MASK
+    x ^= x >> 17
+    x = (x * 0x5DEECE66D) & MASK
+    x ^= x >> 13
+    return x
+
+
+def check_character(code: str) -> str:
+    """Luhn mod 32 check character for `code`."""
+    total = 0
+    factor = 2
+    for char in reversed(code):
+        addend = factor * ALPHABET.index(char)
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[-total % 32]
+
+
+def is_valid_code(code: str) -> bool:
+    """True when the last character of `code` is its check character."""
+    return (
+        len(code) == CODE_LENGTH + 1
+        and all(char in ALPHABET for char in code)
+        and check_character(code[:-1]) == code[-1]
+    )
+
+
+def encode_tracking_number(number: int) -> str:
+    if not 0 <= number <= MASK:
+        raise ValueError(f"Tracking number {number} out of range")
+    x = permute(number)
+    code = "".join(ALPHABET[(x >> shift) & 31] for shift in range(BITS - 5, -1, -5))
+    return code + check_character(code)
+
+
+def normalize_tracking_id(value: str) -> str:
+    """Upper-case and map O/I/L to 0/1 in the code part, leaving the prefix alone."""
+    value = (value or "").strip().upper()
+    prefix, dash, code = value.rpartition("-")
+    if not dash:
+        return value
+    return f"{prefix}-{code.translate(_NORMALIZE)}"
+
+
+def clean_prefix(prefix: str | None) -> str:
+    prefix = (prefix or "").upper()
+    return prefix if prefix.isascii() and prefix.isalnum() else "X"
+
+
+class PendingBlock:
+    """
+    Commit hook for a block whose `TrackingIdBlock` row was inserted inside a
+    transaction. If the transaction rolls back, Django drops the hook along
+    with the row and the block must not be used again.
+    """
+
+    def __init__(self):
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.committed = False
+        transaction.on_commit(self)
+
+    def __call__(self):
+        self.committed = True
+
+    def usable(self) -> bool:
+        if self.committed:
+            return True
+        # Only the reserving transaction, on its own connection, may use it
+        return (
+            connections[DEFAULT_DB_ALIAS] is self.connection
+            and any(hook is self for _, hook, _ in self.connection.run_on_commit)
+        )
+
+
+def reserve_block(size: int) -> tuple[int, int, PendingBlock | None]:
+    """
+    `(start, size, pending)` of a range of numbers no other process has or will
+    get; `pending` is set while the reservation is not yet committed. On
+    PostgreSQL the size is the sequence's increment and `size` is ignored.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(%s), seqincrement FROM pg_sequence WHERE seqrelid = %s::regclass",
+                [SEQUENCE_NAME, SEQUENCE_NAME]
+            )
+            end, size = cursor.fetchone()
+            return end - size, size, None
+    from shipment.models import TrackingIdBlock
+
+    while True:
+        try:
+            with transaction.atomic():
+                last = TrackingIdBlock.objects.order_by('-start').first()
+                start = last.start + last.size if last else 0
+                TrackingIdBlock.objects.create(start=start, size=size)
+        except IntegrityError:
+            # Another process took this start first
+            continue
+        return start, size, PendingBlock() if connection.in_atomic_block else None
+
+
+class TrackingIdAllocator:
+    """Hands out numbers from the current block; thread-safe and fork-aware."""
+
+    def __init__(self, block_size: int | None = None):
+        # Requested size; on PostgreSQL the sequence decides
+        self.block_size = block_size or settings.TRACKING_ID_BLOCK_SIZE
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the current block; the next number comes from a new one."""
+        self._pid = None
+        self._next = 0
+        self._end = 0
+        self._pending = None
+
+    def _take(self) -> int | None:
+        # A forked worker must not keep using its parent's block
+        if self._pid != os.getpid() or self._next >= self._end:
+            return None
+        if self._pending is not None:
+            if not self._pending.usable():
+                return None
+            if self._pending.committed:
+                self._pending = None
+        number = self._next
+        self._next += 1
+        return number
+
+    def _refill(self, block: tuple[int, int, PendingBlock | None]):
+        start, size, self._pending = block
+        self._pid = os.getpid()
+        self._next = start
+        self._end = start + size
+
+    def _allocate_from(self, block) -> int:
+        with self._lock:
+            number = self._take()
+            if number is None:
+                self._refill(block)
+                number = self._take()
+            return number
+
+    def allocate(self) -> int:
+        with self._lock:
+            number = self._take()
+            if number is None:
+                self._refill(reserve_block(self.block_size))
+                number = self._take()
+            return number
+
+    async def aallocate(self) -> int:
+        """Like `allocate`, touching the database (in a thread) only when the block runs out."""
+        with self._lock:
+            number = self._take()
+            pending = self._pending is not None
+        if number is not None:
+            return number
+        if pending:
+            # The block belongs to an open transaction on the sync thread
+            return await sync_to_async(self.allocate)()
+        block = await sync_to_async(reserve_block)(self.block_size)
+        if block[2] is not None:
+            return await sync_to_async(self._allocate_from)(block)
+        return self._allocate_from(block)
+
+
+allocator = TrackingIdAllocator()
+
+
+def generate_tracking_id(prefix="TRK") -> str:
+    return f"{clean_prefix(prefix)}-{encode_tracking_number(allocator.allocate())}"
+
+
+async def agenerate_tracking_id(prefix="TRK") -> str:
+    return f"{clean_prefix(prefix)}-{encode_tracking_number(await allocator.aallocate())}"
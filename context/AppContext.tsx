@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect, ReactNode, useCallback } from 'react';
+import React, { createContext, useContext, useState, useEffect, ReactNode, useCallback, useRef } from 'react';
 import { User, Office, Parcel, ParcelStatus, TrackingEvent, UserRole, NotificationLog, PaymentMode, Bus } from '../types';
 import { fetchHealth, fetchBranches, loginOrganization, loginBranch, logoutUser, createApiClient } from '../services/apiService';
 import { jwtDecode } from 'jwt-decode';
@@ -7,6 +7,12 @@ import { useNavigate } from 'react-router-dom';
 
 
 
+export interface ParcelFilters {
+  status?: ParcelStatus[];
+  // Branch lists only
+  direction?: 'incoming' | 'outgoing';
+}
+
 interface AppContextType {
   currentUser: User | null;
   organization: any | null;
@@ -28,7 +34,11 @@ interface AppContextType {
   fetchBuses: () => Promise<void>;
   createParcel: (parcel: any) => Promise<{ success: boolean, message: string, data?: any }>;
   updateParcelStatus: (trackingId: string, newStatus: ParcelStatus, note?: string) => Promise<{ success: boolean, message: string }>;
-  fetchParcels: () => Promise<void>;
+  parcelFilters: ParcelFilters;
+  hasMoreParcels: boolean;
+  loadingMoreParcels: boolean;
+  fetchParcels: (userOverride?: User, filters?: ParcelFilters) => Promise<void>;
+  loadMoreParcels: () => Promise<void>;
   trackShipment: (id: string) => Promise<{ success: boolean, data?: Parcel, message?: string }>;
   getShipmentDetails: (id: string) => Promise<{ success: boolean, data?: Parcel, message?: string }>;
   getOfficeName: (id: string) => string;
@@ -41,6 +51,50 @@ const MOCK_OFFICES: Office[] = [];
 
 const MOCK_USERS: User[] = [];
 
+// "list" field set carries only the latest status event; details load the full history
+const mapParcel = (s: any): Parcel => ({
+  slug: s.slug,
+  trackingId: s.tracking_id,
+  senderName: s.sender_name,
+  senderPhone: s.sender_phone,
+  receiverName: s.receiver_name,
+  receiverPhone: s.receiver_phone,
+  // Backend returns nested branch objects: { slug, title }
+  sourceOfficeId: s.source_branch?.slug || s.source_branch,
+  destinationOfficeId: s.destination_branch?.slug || s.destination_branch,
+  sourceOfficeTitle: s.source_branch?.title || '',
+  destinationOfficeTitle: s.destination_branch?.title || '',
+  description: s.description || '',
+  paymentMode: s.payment_mode as PaymentMode,
+  price: Number(s.price),
+  currentStatus: s.current_status as ParcelStatus,
+  bus: s.bus ? {
+    slug: s.bus.slug,
+    busNumber: s.bus.bus_number,
+    preferredDays: s.bus.preferred_days || [],
+    description: s.bus.description
+  } : undefined,
+  history: (s.latest_event ? [s.latest_event] : []).map((h: any) => ({
+    status: h.status as ParcelStatus,
+    timestamp: new Date(h.created_at).getTime(),
+    location: h.location,
+    note: h.remarks || ''
+  })),
+  createdAt: s.created_at,
+  day: s.day || s.created_at?.split('T')[0] // Use day field, fallback to created_at date
+});
+
+const parcelListPath = (user: User, filters: ParcelFilters, cursor?: string | null) => {
+  // Filtering happens on the server so every page holds only matching shipments
+  const path = user.role === UserRole.SUPER_ADMIN ? '/shipment/list' : '/shipment/branch/list';
+  const params = new URLSearchParams();
+  if (filters.status && filters.status.length) params.set('status', filters.status.join(','));
+  if (filters.direction && user.role !== UserRole.SUPER_ADMIN) params.set('direction', filters.direction);
+  if (cursor) params.set('cursor', cursor);
+  const query = params.toString();
+  return query ? `${path}?${query}` : path;
+};
+
 export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) => {
   const [currentUser, setCurrentUser] = useState<User | null>(null);
   const [organization, setOrganization] = useState<any | null>(null);
@@ -48,6 +102,10 @@ export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
   const [currentBranch, setCurrentBranch] = useState<Office | null>(null);
   const [buses, setBuses] = useState<Bus[]>([]);
   const [parcels, setParcels] = useState<Parcel[]>([]);
+  const [parcelFilters, setParcelFilters] = useState<ParcelFilters>({});
+  const [parcelsCursor, setParcelsCursor] = useState<string | null>(null);
+  const [loadingMoreParcels, setLoadingMoreParcels] = useState(false);
+  const parcelsRequest = useRef(0);
   const [notifications, setNotifications] = useState<NotificationLog[]>([]);
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
@@ -97,7 +155,9 @@ export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
     }
   }, [api]);
 
-  const fetchParcels = useCallback(async (userOverride?: User) => {
+  // Lists are cursor paginated: { results, next_cursor, prev_cursor }. Only the
+  // first page is loaded up front; loadMoreParcels follows next_cursor.
+  const fetchParcels = useCallback(async (userOverride?: User, filters?: ParcelFilters) => {
     const userToUse = userOverride || currentUser;
     // Don't fetch if user is not logged in
     if (!userToUse) {
@@ -105,60 +165,48 @@ export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
       return;
     }
 
-    try {
-      // Use different endpoints based on user role
-      const endpoint = userToUse.role === UserRole.SUPER_ADMIN
-        ? '/shipment/list/'
-        : '/shipment/branch/list/';
+    const activeFilters = filters || parcelFilters;
+    setParcelFilters(activeFilters);
+    // A load-more still in flight belongs to the previous list
+    const request = ++parcelsRequest.current;
 
-      console.log("Fetching parcels from:", endpoint, "for user:", userToUse.role);
-      const data = await api.get(endpoint.replace(/\/$/, ""));
+    try {
+      const data = await api.get(parcelListPath(userToUse, activeFilters));
+      if (request !== parcelsRequest.current) return;
       console.log("Parcels API response:", data);
 
       if (data.status === 200 && data.data) {
-        // Backend now returns full fields in "list" field set
-        const mapped: Parcel[] = data.data.map((s: any) => ({
-          slug: s.slug,
-          trackingId: s.tracking_id,
-          senderName: s.sender_name,
-          senderPhone: s.sender_phone,
-          receiverName: s.receiver_name,
-          receiverPhone: s.receiver_phone,
-          // Backend returns nested branch objects: { slug, title }
-          sourceOfficeId: s.source_branch?.slug || s.source_branch,
-          destinationOfficeId: s.destination_branch?.slug || s.destination_branch,
-          sourceOfficeTitle: s.source_branch?.title || '',
-          destinationOfficeTitle: s.destination_branch?.title || '',
-          description: s.description || '',
-          paymentMode: s.payment_mode as PaymentMode,
-          price: Number(s.price),
-          currentStatus: s.current_status as ParcelStatus,
-          bus: s.bus ? {
-            slug: s.bus.slug,
-            busNumber: s.bus.bus_number,
-            preferredDays: s.bus.preferred_days || [],
-            description: s.bus.description
-          } : undefined,
-          history: (s.history || []).map((h: any) => ({
-            status: h.status as ParcelStatus,
-            timestamp: new Date(h.created_at).getTime(),
-            location: h.location,
-            note: h.remarks || ''
-          })),
-          createdAt: s.created_at,
-          day: s.day || s.created_at?.split('T')[0] // Use day field, fallback to created_at date
-        }));
-        console.log("Mapped parcels:", mapped);
-        setParcels(mapped);
+        setParcels(data.data.results.map(mapParcel));
+        setParcelsCursor(data.data.next_cursor || null);
       } else {
         console.warn("Unexpected response status or missing data:", data);
         setParcels([]);
+        setParcelsCursor(null);
       }
     } catch (e: any) {
       console.error("Failed to fetch shipments:", e);
       setParcels([]);
+      setParcelsCursor(null);
+    }
+  }, [api, currentUser, parcelFilters]);
+
+  const loadMoreParcels = useCallback(async () => {
+    if (!currentUser || !parcelsCursor || loadingMoreParcels) return;
+    const request = parcelsRequest.current;
+    setLoadingMoreParcels(true);
+    try {
+      const data = await api.get(parcelListPath(currentUser, parcelFilters, parcelsCursor));
+      if (request !== parcelsRequest.current) return;
+      if (data.status === 200 && data.data) {
+        setParcels(prev => [...prev, ...data.data.results.map(mapParcel)]);
+        setParcelsCursor(data.data.next_cursor || null);
+      }
+    } catch (e: any) {
+      console.error("Failed to fetch more shipments:", e);
+    } finally {
+      setLoadingMoreParcels(false);
     }
-  }, [api, currentUser]);
+  }, [api, currentUser, parcelFilters, parcelsCursor, loadingMoreParcels]);
 
 
   useEffect(() => {
@@ -370,6 +418,9 @@ export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
     localStorage.removeItem('access_token');
     localStorage.removeItem('refresh_token');
     setCurrentUser(null);
+    setParcels([]);
+    setParcelFilters({});
+    setParcelsCursor(null);
     navigate('/');
   }, [navigate]);
 
@@ -612,7 +663,11 @@ export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
       addBus,
       deleteBus,
       fetchBuses,
+      parcelFilters,
+      hasMoreParcels: parcelsCursor !== null,
+      loadingMoreParcels,
       fetchParcels,
+      loadMoreParcels,
       createParcel,
       updateParcelStatus,
       trackShipment: async (id: string) => {
@@ -136,9 +136,21 @@ export const getBranchAnalytics = (filters: any) => {
 };
 
 // Messaging APIs
-export const fetchMessages = () => {
+// The inbox is cursor paginated: { results, next_cursor, prev_cursor }
+export const fetchMessages = (cursor?: string) => {
     const api = createApiClient();
-    return api.get('/messages/');
+    return api.get(cursor ? `/messages/?cursor=${encodeURIComponent(cursor)}` : '/messages/');
+};
+
+export const fetchUnreadCount = () => {
+    const api = createApiClient();
+    return api.get('/messages/unread_count/');
+};
+
+// Marks the given messages read, or every unread message when no ids are passed
+export const markMessagesAsRead = (ids?: number[]) => {
+    const api = createApiClient();
+    return api.post('/messages/read/', ids ? { ids } : { all: true });
 };
 
 export const markMessageAsRead = (messageId: number) => {
@@ -5,9 +5,16 @@ import { ArrowRight, Package, Truck, CheckCircle, Clock, TrendingUp, Zap, Map, S
 import { useNavigate } from 'react-router-dom';
 
 export const Dashboard: React.FC = () => {
-  const { parcels, currentUser, organization, fetchParcels, offices, currentBranch, processDayEnd, updateParcelStatus } = useApp();
+  const { parcels, currentUser, organization, fetchParcels, parcelFilters, offices, currentBranch, processDayEnd, updateParcelStatus } = useApp();
   const navigate = useNavigate();
 
+  // Stats cover every status and direction; drop filters left over from the manifest
+  useEffect(() => {
+    if (parcelFilters.status || parcelFilters.direction) {
+      fetchParcels(undefined, {});
+    }
+  }, []);
+
 
   // Filter parcels by role and date (use operational date for branches)
   const getWorkingDate = () => {
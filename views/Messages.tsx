@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { fetchMessages, markMessageAsRead } from '../services/apiService';
+import { fetchMessages, fetchUnreadCount, markMessageAsRead, markMessagesAsRead } from '../services/apiService';
 import { MessageSquare, Bell, CheckCircle2, Clock, Inbox } from 'lucide-react';
 
 interface Message {
@@ -11,14 +11,29 @@ interface Message {
 
 export const Messages: React.FC = () => {
     const [messages, setMessages] = useState<Message[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [unreadCount, setUnreadCount] = useState(0);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const loadUnreadCount = async () => {
+        try {
+            const response = await fetchUnreadCount();
+            if (response.status === 200 && response.data) {
+                setUnreadCount(response.data.unread_count);
+            }
+        } catch (error) {
+            console.error("Failed to fetch unread count:", error);
+        }
+    };
 
     const loadMessages = async () => {
         setLoading(true);
         try {
             const response = await fetchMessages();
-            if (response.status === 200) {
-                setMessages(response.data);
+            if (response.status === 200 && response.data) {
+                setMessages(response.data.results);
+                setNextCursor(response.data.next_cursor);
             }
         } catch (error) {
             console.error("Failed to fetch messages:", error);
@@ -27,8 +42,25 @@ export const Messages: React.FC = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const response = await fetchMessages(nextCursor);
+            if (response.status === 200 && response.data) {
+                setMessages(prev => [...prev, ...response.data.results]);
+                setNextCursor(response.data.next_cursor);
+            }
+        } catch (error) {
+            console.error("Failed to fetch more messages:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         loadMessages();
+        loadUnreadCount();
     }, []);
 
     const handleMarkAsRead = async (id: number) => {
@@ -36,12 +68,25 @@ export const Messages: React.FC = () => {
             const response = await markMessageAsRead(id);
             if (response.status === 200) {
                 setMessages(prev => prev.map(m => m.id === id ? { ...m, is_read: true } : m));
+                loadUnreadCount();
             }
         } catch (error) {
             console.error("Failed to mark message as read:", error);
         }
     };
 
+    const handleMarkAllAsRead = async () => {
+        try {
+            const response = await markMessagesAsRead();
+            if (response.status === 200 && response.data) {
+                setMessages(prev => prev.map(m => ({ ...m, is_read: true })));
+                setUnreadCount(response.data.unread_count);
+            }
+        } catch (error) {
+            console.error("Failed to mark all messages as read:", error);
+        }
+    };
+
     return (
         <div className="space-y-8 animate-in fade-in duration-700">
             <div className="flex items-center justify-between mb-2">
@@ -52,8 +97,17 @@ export const Messages: React.FC = () => {
                 <div className="flex items-center gap-3">
                     <div className="bg-orange-500/10 text-orange-600 px-4 py-2 rounded-2xl text-xs font-bold border border-orange-500/20 flex items-center gap-2">
                         <Bell className="w-4 h-4" />
-                        {messages.filter(m => !m.is_read).length} Unread
+                        {unreadCount} Unread
                     </div>
+                    {unreadCount > 0 && (
+                        <button
+                            onClick={handleMarkAllAsRead}
+                            className="px-4 py-2 bg-slate-50 hover:bg-emerald-50 text-slate-500 hover:text-emerald-600 rounded-2xl text-xs font-bold border border-slate-100 hover:border-emerald-100 flex items-center gap-2 transition-all"
+                        >
+                            <CheckCircle2 className="w-4 h-4" />
+                            Mark all read
+                        </button>
+                    )}
                 </div>
             </div>
 
@@ -110,6 +164,15 @@ export const Messages: React.FC = () => {
                             }`}></div>
                         </div>
                     ))}
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="mx-auto px-6 py-3 bg-white hover:bg-orange-50 text-slate-500 hover:text-orange-600 rounded-2xl text-xs font-bold uppercase tracking-wider border border-slate-100 transition-all disabled:opacity-50"
+                        >
+                            {loadingMore ? 'Loading...' : 'Load older messages'}
+                        </button>
+                    )}
                 </div>
             ) : (
                 <div className="text-center py-20 bg-white rounded-[3rem] border border-slate-100 shadow-sm">
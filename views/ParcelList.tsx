@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { useApp } from '../context/AppContext';
 import { ParcelStatus, UserRole, Parcel } from '../types';
 import { Truck, MapPin, CheckCircle, ArrowRight, Printer, Package } from 'lucide-react';
@@ -7,29 +7,23 @@ import { useNavigate } from 'react-router-dom';
 
 // Component to manage and list parcels with status transition actions
 export const ParcelList: React.FC = () => {
-   const { parcels, currentUser, updateParcelStatus, getOfficeName, offices, fetchParcels } = useApp();
+   const { parcels, currentUser, updateParcelStatus, getOfficeName, offices, fetchParcels, parcelFilters, hasMoreParcels, loadingMoreParcels, loadMoreParcels } = useApp();
    const navigate = useNavigate();
    const myOfficeId = currentUser?.officeId;
    const isSuper = currentUser?.role === UserRole.SUPER_ADMIN;
-   
-   // Debug logging
-   useEffect(() => {
-     console.log("ParcelList - parcels:", parcels);
-     console.log("ParcelList - currentUser:", currentUser);
-     console.log("ParcelList - myOfficeId:", myOfficeId);
-     console.log("ParcelList - isSuper:", isSuper);
-   }, [parcels, currentUser, myOfficeId, isSuper]);
-      const myParcels = parcels.filter(p => {
-      // For office admins, we trust the backend to have only sent relevant parcels.
-      // We still filter for Super Admin just in case, but they see everything anyway.
-      if (isSuper) return true;
-      
-      // Safety check: only show if branch is source or destination (should always be true from backend anyway)
-      // but use slug-based matching now that myOfficeId is correctly set to slug in AppContext
-      return p.sourceOfficeId === myOfficeId || p.destinationOfficeId === myOfficeId;
-    });
-   
-   console.log("ParcelList - myParcels count:", myParcels.length, "total parcels:", parcels.length);
+
+   // The backend scopes branch lists to this branch and applies the filters,
+   // so every loaded page is already what the manifest shows
+   const myParcels = parcels;
+   const activeStatus = parcelFilters.status?.[0] || '';
+   const activeDirection = parcelFilters.direction || '';
+
+   const applyFilters = (status: string, direction: string) => {
+      fetchParcels(undefined, {
+         status: status ? [status as ParcelStatus] : undefined,
+         direction: direction ? direction as 'incoming' | 'outgoing' : undefined
+      });
+   };
 
    const [selectedParcel, setSelectedParcel] = useState<Parcel | null>(null);
 
@@ -117,10 +111,34 @@ export const ParcelList: React.FC = () => {
             </div>
             <div className="relative z-10 bg-slate-900 text-white px-6 py-4 rounded-2xl flex flex-col items-center justify-center min-w-[140px] shadow-lg shadow-slate-900/20">
                <span className="text-[10px] font-bold text-slate-400 uppercase tracking-widest mb-1">Active Packets</span>
-               <span className="text-3xl font-brand font-bold">{myParcels.length}</span>
+               <span className="text-3xl font-brand font-bold">{myParcels.length}{hasMoreParcels ? '+' : ''}</span>
             </div>
          </div>
 
+         <div className="flex flex-wrap gap-3">
+            <select
+               value={activeStatus}
+               onChange={(e) => applyFilters(e.target.value, activeDirection)}
+               className="px-4 py-2 rounded-xl border border-slate-200 bg-white text-xs font-bold uppercase tracking-widest text-slate-600"
+            >
+               <option value="">All statuses</option>
+               <option value={ParcelStatus.BOOKED}>Booked</option>
+               <option value={ParcelStatus.IN_TRANSIT}>In transit</option>
+               <option value={ParcelStatus.ARRIVED}>Arrived</option>
+            </select>
+            {!isSuper && (
+               <select
+                  value={activeDirection}
+                  onChange={(e) => applyFilters(activeStatus, e.target.value)}
+                  className="px-4 py-2 rounded-xl border border-slate-200 bg-white text-xs font-bold uppercase tracking-widest text-slate-600"
+               >
+                  <option value="">Incoming and outgoing</option>
+                  <option value="incoming">Incoming</option>
+                  <option value="outgoing">Outgoing</option>
+               </select>
+            )}
+         </div>
+
          <div className="bg-white border border-slate-200 rounded-[2.5rem] overflow-hidden shadow-xl">
             {myParcels.length === 0 ? (
                <div className="py-32 text-center">
@@ -206,6 +224,17 @@ export const ParcelList: React.FC = () => {
                </table>
                </div>
             )}
+            {hasMoreParcels && (
+               <div className="p-6 flex justify-center border-t border-slate-100">
+                  <button
+                     onClick={loadMoreParcels}
+                     disabled={loadingMoreParcels}
+                     className="px-6 py-3 bg-white hover:bg-orange-50 text-slate-500 hover:text-orange-600 rounded-2xl text-xs font-bold uppercase tracking-wider border border-slate-100 transition-all disabled:opacity-50"
+                  >
+                     {loadingMoreParcels ? 'Loading...' : 'Load more shipments'}
+                  </button>
+               </div>
+            )}
          </div>
 
          {selectedParcel && (